@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark suite for Travel Booker.
+
+Starts the local stand-in OpenAI API and mock booking sites (standins.py),
+points the parser at them and measures, at several concurrency levels:
+
+    parse        parse_flight_request / parse_hotel_request from a thread pool
+    parse_async  parse_flight_requests_async / parse_hotel_requests_async
+    book         book_flight_async / book_hotel_async through a BrowserPool of
+                 stand-in contexts. The flows simulate their site steps with
+                 fixed delays and load no pages, so this measures the fixed flow
+                 overhead plus pool hand-offs, not site latency
+    startup      CLI cold-start time (see startup.py)
+
+For each run it records throughput, p50/p95/p99 latency, errors and RSS, and
+can write everything as JSON and compare it with a baseline from another commit.
+No API key or network access is needed.
+
+Usage:
+    python benchmarks/run.py --levels 1,8,32 --output bench.json
+    python benchmarks/run.py --baseline bench.json --threshold 0.2
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import shutil
+import asyncio
+import argparse
+import datetime
+import platform
+import tempfile
+import subprocess
+import concurrent.futures
+from typing import Dict, Any, List, Optional, Callable
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+from standins import StandInServer, fetch
+
+WORKLOADS = ("parse", "parse_async", "book", "startup")
+
+
+def rss_mb() -> Dict[str, Optional[float]]:
+    """
+    Return the current and peak resident set size of this process in MiB.
+    """
+    current = peak = None
+    try:
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in KiB elsewhere
+        peak = maxrss / 2 ** 20 if sys.platform == "darwin" else maxrss / 2 ** 10
+    except ImportError:
+        pass
+    return {"rss_mb": current, "peak_rss_mb": peak}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Request texts carry a run tag so no run is served from the in-memory parse cache of an earlier one
+def flight_request(i: int, run: str) -> str:
+    day = datetime.date(2030, 1, 1) + datetime.timedelta(days=i % 365)
+    return f"Book a flight from Helsinki to Riga on {day.isoformat()} (ref {run}-{i})"
+
+
+def hotel_request(i: int, run: str) -> str:
+    day = datetime.date(2030, 1, 1) + datetime.timedelta(days=i % 365)
+    return f"Book a hotel in Riga from {day.isoformat()} to {(day + datetime.timedelta(days=2)).isoformat()} (ref {run}-{i})"
+
+
+def summarize(workload: str, concurrency: int, latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    from travel_booker.utils.stats import LatencyHistogram
+
+    histogram = LatencyHistogram()
+    for seconds in latencies:
+        histogram.record(seconds)
+    summary = histogram.summary()
+    operations = len(latencies)
+    result = {
+        "workload": workload,
+        "concurrency": concurrency,
+        "operations": operations,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 4),
+        "throughput_per_second": round(operations / elapsed, 2) if elapsed else 0.0,
+        "p50_seconds": round(summary["p50"], 5),
+        "p95_seconds": round(summary["p95"], 5),
+        "p99_seconds": round(summary["p99"], 5),
+    }
+    result.update(rss_mb())
+    return result
+
+
+def bench_parse(concurrency: int, count: int) -> Dict[str, Any]:
+    """
+    Parse `count` requests with the blocking API from `concurrency` threads.
+    """
+    from travel_booker.core.ai_parser import parse_flight_request, parse_hotel_request
+
+    def one(i: int) -> Any:
+        started = time.perf_counter()
+        parse = parse_flight_request if i % 2 == 0 else parse_hotel_request
+        result = parse(flight_request(i, f"p{concurrency}") if i % 2 == 0 else hotel_request(i, f"p{concurrency}"))
+        return time.perf_counter() - started, result is None
+
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(one, range(count)))
+    elapsed = time.perf_counter() - started
+    return summarize("parse", concurrency, [seconds for seconds, _ in outcomes],
+                     sum(1 for _, failed in outcomes if failed), elapsed)
+
+
+def caller_counters() -> Dict[str, int]:
+    from travel_booker.core.ai_parser import parse_latency_stats
+
+    stats = parse_latency_stats()
+    return {key: stats[key] for key in ("calls", "failures", "rejected", "retries", "hedges", "hedge_wins")}
+
+
+def bench_parse_async(concurrency: int, count: int) -> Dict[str, Any]:
+    """
+    Parse `count` requests with the async batch API, `concurrency` calls in flight.
+    """
+    from travel_booker.core.ai_parser import parse_flight_requests_async, parse_hotel_requests_async
+
+    async def timed(parse: Callable, request: str) -> Any:
+        started = time.perf_counter()
+        outcome = (await parse([request], 1))[0]
+        return time.perf_counter() - started, outcome["result"] is None
+
+    async def run() -> List[Any]:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(i: int) -> Any:
+            async with semaphore:
+                if i % 2 == 0:
+                    return await timed(parse_flight_requests_async, flight_request(i, f"a{concurrency}"))
+                return await timed(parse_hotel_requests_async, hotel_request(i, f"a{concurrency}"))
+
+        return await asyncio.gather(*(one(i) for i in range(count)))
+
+    started = time.perf_counter()
+    outcomes = asyncio.run(run())
+    elapsed = time.perf_counter() - started
+    return summarize("parse_async", concurrency, [seconds for seconds, _ in outcomes],
+                     sum(1 for _, failed in outcomes if failed), elapsed)
+
+
+def bench_book(concurrency: int, count: int, base_url: str) -> Dict[str, Any]:
+    """
+    Book `count` distinct flights and hotels through a pool of `concurrency` stand-in contexts.
+
+    Only launching a context loads a mock page. The booking flows borrow the
+    contexts but simulate their site steps with fixed delays, so the latencies
+    are the flows' fixed overhead and pool waits, not page loads.
+    """
+    from travel_booker.browser_automation.browser_pool import BrowserPool
+    from travel_booker.browser_automation.flight_booker import book_flight_async
+    from travel_booker.browser_automation.hotel_booker import book_hotel_async
+
+    class MockSiteContext:
+        """
+        Stand-in browser context handed to the booking flows.
+        """
+
+    async def create_context() -> MockSiteContext:
+        context = MockSiteContext()
+        await fetch(f"{base_url}/finnair/search")
+        return context
+
+    async def reset_context(context: MockSiteContext) -> None:
+        return None
+
+    async def close_context(context: MockSiteContext) -> None:
+        return None
+
+    async def memory_probe(context: MockSiteContext) -> float:
+        return 0.0
+
+    async def run() -> List[Any]:
+        pool = BrowserPool(size=concurrency, create_context=create_context, close_context=close_context,
+                           reset_context=reset_context, memory_probe=memory_probe)
+        await pool.start()
+        try:
+            async def one(i: int) -> Any:
+                started = time.perf_counter()
+                day = datetime.date(2030, 1, 1) + datetime.timedelta(days=i)
+                if i % 2 == 0:
+                    result = await book_flight_async(
+                        {"origin": "Helsinki", "destination": "Riga", "date": day.isoformat()}, pool
+                    )
+                else:
+                    result = await book_hotel_async(
+                        {"location": "Riga", "check_in_date": day.isoformat(),
+                         "check_out_date": (day + datetime.timedelta(days=2)).isoformat()}, pool
+                    )
+                return time.perf_counter() - started, result is None
+
+            return await asyncio.gather(*(one(i) for i in range(count)))
+        finally:
+            await pool.close()
+
+    started = time.perf_counter()
+    outcomes = asyncio.run(run())
+    elapsed = time.perf_counter() - started
+    return summarize("book", concurrency, [seconds for seconds, _ in outcomes],
+                     sum(1 for _, failed in outcomes if failed), elapsed)
+
+
+def bench_startup(runs: int) -> List[Dict[str, Any]]:
+    from startup import measure_command
+
+    return [
+        {key: value for key, value in measure_command(command, runs).items() if key != "slowest_imports"}
+        for command in (None, "book-flight", "batch")
+    ]
+
+
+def compare(results: Dict[str, Any], baseline_path: str, threshold: float) -> List[str]:
+    """
+    Compare results to a baseline file and return the regressions found.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(entry["workload"], entry["concurrency"]): entry for entry in baseline.get("results", [])}
+    regressions = []
+    for entry in results["results"]:
+        old = previous.get((entry["workload"], entry["concurrency"]))
+        if old is None:
+            continue
+        name = f"{entry['workload']} x{entry['concurrency']}"
+        if entry["throughput_per_second"] < old["throughput_per_second"] * (1 - threshold):
+            regressions.append(f"{name}: throughput {entry['throughput_per_second']:.1f}/s "
+                               f"(baseline {old['throughput_per_second']:.1f}/s)")
+        if entry["p95_seconds"] > old["p95_seconds"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {entry['p95_seconds'] * 1000:.1f} ms "
+                               f"(baseline {old['p95_seconds'] * 1000:.1f} ms)")
+    old_startup = {entry["command"]: entry for entry in baseline.get("startup", [])}
+    for entry in results.get("startup", []):
+        old = old_startup.get(entry["command"])
+        if old and entry["median_seconds"] > old["median_seconds"] * (1 + threshold):
+            regressions.append(f"startup {entry['command']}: {entry['median_seconds'] * 1000:.1f} ms "
+                               f"(baseline {old['median_seconds'] * 1000:.1f} ms)")
+    return regressions
+
+
+def configure_environment(base_url: str) -> None:
+    """
+    Point the parser at the stand-in server and turn off caching and shortcuts,
+    so every parse is a real (local) API round trip.
+
+    Bookings are stored in a temporary directory, removed at exit, and no
+    checkpoints are written, so a run leaves nothing in the user's data directory.
+    """
+    os.environ["OPENAI_API_KEY"] = "sk-benchmark"
+    os.environ["OPENAI_BASE_URL"] = f"{base_url}/v1"
+    os.environ["TRAVEL_BOOKER_PARSE_CACHE"] = "0"
+    os.environ["TRAVEL_BOOKER_FAST_PARSE_MIN_CONFIDENCE"] = "2"
+    os.environ["TRAVEL_BOOKER_IDEMPOTENCY_WINDOW"] = "0"
+    os.environ["TRAVEL_BOOKER_SEARCH_CACHE"] = "0"
+    os.environ["TRAVEL_BOOKER_CHECKPOINTS"] = "0"
+    data_dir = tempfile.mkdtemp(prefix="travel-booker-bench-")
+    # Registered before the booking store's own exit hook, so it runs after the store is flushed
+    atexit.register(shutil.rmtree, data_dir, True)
+    os.environ["TRAVEL_BOOKER_DB_PATH"] = os.path.join(data_dir, "bookings.db")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--workloads", default=",".join(WORKLOADS), help="Comma-separated workloads to run")
+    parser.add_argument("--requests", type=int, default=128, help="Parse requests per level")
+    parser.add_argument("--bookings", type=int, default=0, help="Bookings per level (default: 2 x level)")
+    parser.add_argument("--latency", type=float, default=0.2, help="Stand-in OpenAI latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Maximum extra uniform latency in seconds")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="Share of responses that get --tail-latency extra")
+    parser.add_argument("--tail-latency", type=float, default=2.0, help="Extra latency of slow outliers in seconds")
+    parser.add_argument("--site-latency", type=float, default=0.05, help="Mock site page latency in seconds")
+    parser.add_argument("--startup-runs", type=int, default=3, help="Interpreter launches per startup command")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Fail on regressions against this results file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed regression vs. baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.levels.split(",") if level.strip()]
+    workloads = [name.strip() for name in args.workloads.split(",") if name.strip()]
+    unknown = set(workloads) - set(WORKLOADS)
+    if unknown:
+        parser.error(f"unknown workloads: {', '.join(sorted(unknown))}")
+
+    server = StandInServer(args.latency, args.jitter, args.tail_rate, args.tail_latency, args.site_latency).start()
+    configure_environment(server.base_url)
+
+    from travel_booker.core.ai_parser import use_mock_data
+
+    if use_mock_data():
+        print("Error: a .env file sets a mock OPENAI_API_KEY, which bypasses the stand-in server.")
+        return 1
+
+    results: Dict[str, Any] = {
+        "commit": git_commit(),
+        "python": sys.version,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "results": [],
+    }
+    try:
+        for level in levels:
+            for workload in workloads:
+                before = caller_counters()
+                if workload == "parse":
+                    entry = bench_parse(level, args.requests)
+                elif workload == "parse_async":
+                    entry = bench_parse_async(level, args.requests)
+                elif workload == "book":
+                    entry = bench_book(level, args.bookings or 2 * level, server.base_url)
+                else:
+                    continue
+                # Retries, hedges and breaker rejections of the parse calls made by this run
+                after = caller_counters()
+                entry["parse_calls"] = {key: after[key] - before[key] for key in after}
+                results["results"].append(entry)
+                print(f"{entry['workload']:<12} x{entry['concurrency']:<4} {entry['throughput_per_second']:9.1f}/s"
+                      f"   p50 {entry['p50_seconds'] * 1000:8.1f} ms   p95 {entry['p95_seconds'] * 1000:8.1f} ms"
+                      f"   p99 {entry['p99_seconds'] * 1000:8.1f} ms   errors {entry['errors']}"
+                      f"   hedges {entry['parse_calls']['hedges']}   rss {entry['rss_mb'] or 0:.0f} MiB")
+    finally:
+        server.stop()
+
+    if "startup" in workloads:
+        results["startup"] = bench_startup(args.startup_runs)
+        for entry in results["startup"]:
+            print(f"startup      {entry['command']:<12} median {entry['median_seconds'] * 1000:8.1f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+"""
+Local stand-ins for OpenAI and the booking sites, for benchmarks.
+
+StandInServer is a small asyncio HTTP/1.1 server (keep-alive, no external
+dependencies) running on its own thread. It serves:
+
+    POST /v1/chat/completions   OpenAI-compatible chat completions. The answer is
+                                built from the request with the local fast-path
+                                parser, so results are valid booking details.
+    GET  /finnair/<page>        Mock Finnair pages (search, select, passengers, confirm)
+    GET  /booking/<page>        Mock Booking.com pages (search, select, guests, confirm)
+
+Every response is delayed by `latency` seconds plus uniform jitter of up to
+`jitter` seconds. With probability `tail_rate`, `tail_latency` is added on top
+to simulate slow outliers.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import threading
+from typing import Dict, Any, Optional, Tuple, Set
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from travel_booker.core.fast_parser import fast_parse_flight, fast_parse_hotel
+
+FLIGHT_DEFAULTS = {"origin": "Helsinki", "destination": "Riga", "date": "2030-03-28", "num_adults": 1, "num_children": 0}
+HOTEL_DEFAULTS = {
+    "location": "Riga", "check_in_date": "2030-03-28", "check_out_date": "2030-03-30",
+    "num_adults": 1, "num_children": 0, "room_type": "standard",
+}
+
+SITE_PAGES = {
+    "finnair": ("search", "select", "passengers", "confirm"),
+    "booking": ("search", "select", "guests", "confirm"),
+}
+
+_PAGE_TEMPLATE = """<!DOCTYPE html>
+<html><head><title>{site} - {page}</title></head>
+<body><main id="{page}"><h1>{site} {page}</h1>{body}</main></body></html>
+"""
+
+
+def _mock_page(site: str, page: str) -> bytes:
+    if page == "search":
+        body = "".join(f'<div class="result" data-option="{i}">Option {i} <button>Select</button></div>' for i in range(20))
+    elif page == "confirm":
+        body = f'<p class="booking-reference">{os.urandom(3).hex().upper()}</p>'
+    else:
+        body = '<form><input name="first_name"><input name="last_name"><input name="email"><button>Continue</button></form>'
+    return _PAGE_TEMPLATE.format(site=site, page=page, body=body).encode("utf-8")
+
+
+def _completion(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build an OpenAI chat completion answering a parser request.
+    """
+    messages = payload.get("messages") or []
+    system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+    request = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+    schema = (payload.get("response_format") or {}).get("json_schema") or {}
+    kind = schema.get("name") or ("trip" if "leg" in system.lower() else "hotel" if "hotel" in system.lower() else "flight")
+    flight = fast_parse_flight(request)["details"]
+    flight = {key: flight.get(key) or value for key, value in FLIGHT_DEFAULTS.items()}
+    if kind == "trip":
+        # Trip planner: the flight and a stay at its destination
+        details = {"legs": [flight], "stays": [{"location": flight["destination"], "check_in_date": None,
+                                                "check_out_date": None, "nights": 2, "room_type": "standard"}]}
+    elif kind.startswith("hotel"):
+        hotel = fast_parse_hotel(request)["details"]
+        details = {key: hotel.get(key) or value for key, value in HOTEL_DEFAULTS.items()}
+    else:
+        details = flight
+    content = json.dumps(details)
+    prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4
+    completion_tokens = len(content) // 4
+    return {
+        "id": f"chatcmpl-{os.urandom(6).hex()}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": payload.get("model", "stand-in"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                  "total_tokens": prompt_tokens + completion_tokens},
+    }
+
+
+class StandInServer:
+    """
+    OpenAI-compatible API and mock booking sites on a background thread.
+    """
+
+    def __init__(self, latency: float = 0.3, jitter: float = 0.1, tail_rate: float = 0.0,
+                 tail_latency: float = 2.0, site_latency: Optional[float] = None,
+                 host: str = "127.0.0.1", port: int = 0):
+        """
+        Args:
+            latency: Base delay of OpenAI responses in seconds
+            jitter: Maximum extra uniform delay in seconds
+            tail_rate: Probability that a response gets `tail_latency` on top
+            tail_latency: Extra delay of slow outliers in seconds
+            site_latency: Base delay of mock site pages (defaults to `latency`)
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.site_latency = latency if site_latency is None else site_latency
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._writers: Set[asyncio.StreamWriter] = set()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def _delay(self, base: float) -> float:
+        delay = base + random.uniform(0, self.jitter)
+        if self.tail_rate and random.random() < self.tail_rate:
+            delay += self.tail_latency
+        return delay
+
+    async def _respond(self, method: str, path: str, body: bytes) -> Tuple[int, str, bytes]:
+        path = path.split("?")[0]
+        if method == "POST" and path.rstrip("/").endswith("/chat/completions"):
+            await asyncio.sleep(self._delay(self.latency))
+            return 200, "application/json", json.dumps(_completion(json.loads(body or b"{}"))).encode("utf-8")
+        parts = [part for part in path.split("/") if part]
+        if method == "GET" and parts and parts[0] in SITE_PAGES:
+            page = parts[1] if len(parts) > 1 else "search"
+            if page not in SITE_PAGES[parts[0]]:
+                return 404, "text/plain", b"not found"
+            await asyncio.sleep(self._delay(self.site_latency))
+            return 200, "text/html; charset=utf-8", _mock_page(parts[0], page)
+        return 404, "text/plain", b"not found"
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._writers.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                self.requests += 1
+
+                status, content_type, payload = await self._respond(method, path, body)
+                reason = "OK" if status == 200 else "Not Found"
+                writer.write(
+                    f"HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\n"
+                    f"Content-Length: {len(payload)}\r\n\r\n".encode("latin-1") + payload
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    def start(self) -> "StandInServer":
+        """
+        Start serving on a background thread; returns once the port is bound.
+        """
+        ready = threading.Event()
+
+        def run() -> None:
+            self._loop = asyncio.new_event_loop()
+            self._server = self._loop.run_until_complete(
+                asyncio.start_server(self._handle, self.host, self.port, backlog=1024)
+            )
+            self.port = self._server.sockets[0].getsockname()[1]
+            ready.set()
+            self._loop.run_forever()
+            self._server.close()
+            # Close idle keep-alive connections so their handlers see EOF and finish
+            for writer in list(self._writers):
+                writer.close()
+            pending = asyncio.all_tasks(self._loop)
+            if pending:
+                self._loop.run_until_complete(asyncio.wait(pending, timeout=1.0))
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="stand-in-server", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(5)
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+
+async def fetch(url: str) -> bytes:
+    """
+    GET a page from the stand-in server with asyncio streams.
+    """
+    rest = url.split("://", 1)[1]
+    hostport, _, path = rest.partition("/")
+    host, _, port = hostport.partition(":")
+    reader, writer = await asyncio.open_connection(host, int(port or 80))
+    try:
+        writer.write(f"GET /{path} HTTP/1.1\r\nHost: {hostport}\r\nConnection: close\r\n\r\n".encode("latin-1"))
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    return response.partition(b"\r\n\r\n")[2]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the stand-in OpenAI API and mock booking sites")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--tail-rate", type=float, default=0.0)
+    parser.add_argument("--tail-latency", type=float, default=2.0)
+    args = parser.parse_args()
+
+    server = StandInServer(args.latency, args.jitter, args.tail_rate, args.tail_latency, port=args.port).start()
+    print(f"Serving on {server.base_url} (set OPENAI_BASE_URL={server.base_url}/v1); Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the Travel Booker CLI.
+
+Runs `python -X importtime -m travel_booker.main <command> --help` for every
+typer command in fresh interpreters, reports the wall-clock startup time and
+the slowest imports, and optionally fails when a command got slower than a
+stored baseline.
+
+Usage:
+    python benchmarks/startup.py --runs 5 --output startup.json
+    python benchmarks/startup.py --baseline startup.json --threshold 0.2
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from typing import Dict, Any, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def discover_commands() -> List[str]:
+    """
+    Return the CLI command names registered on the typer app.
+    """
+    sys.path.insert(0, REPO_ROOT)
+    import typer
+    from travel_booker.main import app
+
+    return sorted(typer.main.get_command(app).commands)
+
+
+def parse_importtime(stderr: str) -> Dict[str, int]:
+    """
+    Parse `-X importtime` output into cumulative microseconds per module.
+
+    Nested imports are returned with their leading indentation.
+    """
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3:
+            continue
+        # Nested imports keep their extra indentation so callers can tell them apart
+        module = fields[2].rstrip()[1:]
+        cumulative[module] = int(fields[1])
+    return cumulative
+
+
+def measure_command(command: Optional[str], runs: int) -> Dict[str, Any]:
+    """
+    Measure cold-start time of one CLI command in fresh interpreters.
+
+    Args:
+        command: Command name, or None for the top-level `--help`
+        runs: Number of interpreter launches to measure
+
+    Returns:
+        Dictionary with wall-clock timings and the slowest imports
+    """
+    argv = [sys.executable, "-X", "importtime", "-m", "travel_booker.main"]
+    if command:
+        argv.append(command)
+    argv.append("--help")
+
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "sk-mock-testing-key")
+    env["PYTHONPATH"] = REPO_ROOT + os.pathsep + env.get("PYTHONPATH", "")
+
+    wall_times = []
+    imports: Dict[str, int] = {}
+    returncode = 0
+    for _ in range(runs):
+        started = time.perf_counter()
+        proc = subprocess.run(argv, env=env, cwd=REPO_ROOT, capture_output=True, text=True)
+        wall_times.append(time.perf_counter() - started)
+        returncode = proc.returncode
+        imports = parse_importtime(proc.stderr)
+
+    top_level = {name: us for name, us in imports.items() if not name.startswith(" ")}
+    slowest = sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:10]
+    return {
+        "command": command or "--help",
+        "runs": runs,
+        "returncode": returncode,
+        "median_seconds": statistics.median(wall_times),
+        "min_seconds": min(wall_times),
+        "import_seconds": sum(top_level.values()) / 1e6,
+        "slowest_imports": [{"module": name, "cumulative_us": us} for name, us in slowest],
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, threshold: float) -> List[str]:
+    """
+    Compare results to a baseline file and return the regressions found.
+    """
+    with open(baseline_path) as f:
+        baseline = {entry["command"]: entry for entry in json.load(f)["results"]}
+    regressions = []
+    for entry in results:
+        previous = baseline.get(entry["command"])
+        if previous is None:
+            continue
+        limit = previous["median_seconds"] * (1 + threshold)
+        if entry["median_seconds"] > limit:
+            regressions.append(
+                f"{entry['command']}: {entry['median_seconds']:.3f}s "
+                f"(baseline {previous['median_seconds']:.3f}s, limit {limit:.3f}s)"
+            )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Interpreter launches per command")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Fail if a command is slower than in this results file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown vs. baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    results = [measure_command(command, args.runs) for command in [None] + discover_commands()]
+
+    for entry in results:
+        print(f"{entry['command']:<20} median {entry['median_seconds'] * 1000:8.1f} ms"
+              f"   imports {entry['import_seconds'] * 1000:8.1f} ms")
+        for item in entry["slowest_imports"][:3]:
+            print(f"    {item['cumulative_us'] / 1000:8.1f} ms  {item['module']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"python": sys.version, "results": results}, f, indent=2)
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.threshold)
+        for line in regressions:
+            print(f"Startup regression: {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,6 +8,7 @@ from dotenv import load_dotenv
 from travel_booker.core.ai_parser import parse_flight_request, parse_hotel_request
 from travel_booker.browser_automation.flight_booker import book_flight
 from travel_booker.browser_automation.hotel_booker import book_hotel
+from travel_booker.core.events import format_event
 
 # Load environment variables from .env file if present
 load_dotenv()
@@ -43,7 +44,7 @@ def main():
         
         # Book the flight
         print("Booking flight...")
-        result = book_flight(flight_details)
+        result = book_flight(flight_details, on_event=lambda event: print(format_event(event)))
         if result:
             print("Flight booking completed successfully!")
             print(f"Details: {result}")
@@ -63,7 +64,7 @@ def main():
         
         # Book the hotel
         print("Booking hotel...")
-        result = book_hotel(hotel_details)
+        result = book_hotel(hotel_details, on_event=lambda event: print(format_event(event)))
         if result:
             print("Hotel booking completed successfully!")
             print(f"Details: {result}")
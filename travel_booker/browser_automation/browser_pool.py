@@ -0,0 +1,426 @@
+"""
+Warm pool of browser-use contexts shared by the booking flows.
+
+Launching a browser dominates per-booking latency, so the pool starts one
+browser-use `Browser` up front, pre-opens a number of contexts on it and
+hands them out to the flight and hotel bookers. Cookies and storage are
+cleared between uses, and contexts are recycled after a configurable number
+of uses or amount of memory. A context whose replacement fails to launch
+leaves its slot missing; missing slots are relaunched on later acquires, with
+exponential backoff. Each browser-use context blocks the resources its
+booking's site does not need (see resource_policy).
+"""
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, Callable, Awaitable, AsyncIterator, List, Set
+
+from travel_booker.browser_automation.resource_policy import (
+    LEAN_BROWSER_ARGS, SessionResources, attach_resource_blocker, resource_blocking_enabled,
+)
+
+DEFAULT_POOL_SIZE = 2
+DEFAULT_MAX_USES = 50
+# Wait before relaunching a missing context, doubled after each failed launch
+RELAUNCH_BACKOFF_SECONDS = 1.0
+MAX_RELAUNCH_BACKOFF_SECONDS = 30.0
+
+
+class PoolClosedError(RuntimeError):
+    """
+    Raised when a context is requested from a pool that is shutting down.
+    """
+
+
+class PoolUnavailableError(RuntimeError):
+    """
+    Raised when the pool has no contexts left and none can be launched.
+    """
+
+
+class PooledContext:
+    """
+    A browser context owned by the pool, with its usage bookkeeping.
+    """
+    __slots__ = ("context", "uses", "created_at")
+
+    def __init__(self, context: Any):
+        self.context = context
+        self.uses = 0
+        self.created_at = time.monotonic()
+
+
+async def _clear_browser_use_context(context: Any) -> None:
+    """
+    Clear cookies and web storage of a browser-use context.
+    """
+    session = getattr(context, "session", None)
+    playwright_context = getattr(session, "context", None)
+    if playwright_context is None:
+        return
+    await playwright_context.clear_cookies()
+    for page in playwright_context.pages:
+        try:
+            await page.evaluate("() => { localStorage.clear(); sessionStorage.clear(); }")
+        except Exception:
+            # about:blank and similar pages have no storage to clear
+            pass
+    # Keep a single blank page so the next booking starts from a clean tab
+    for page in playwright_context.pages[1:]:
+        await page.close()
+    if playwright_context.pages:
+        await playwright_context.pages[0].goto("about:blank")
+
+
+async def _browser_use_context_memory_mb(context: Any) -> float:
+    """
+    Estimate a browser-use context's memory from the JS heap of its current page.
+    """
+    page = await context.get_current_page()
+    heap_bytes = await page.evaluate(
+        "() => (performance.memory ? performance.memory.usedJSHeapSize : 0)"
+    )
+    return heap_bytes / (1024 * 1024)
+
+
+class BrowserPool:
+    """
+    Fixed-size pool of pre-launched browser contexts.
+
+    By default the contexts come from a single headless browser-use `Browser`.
+    Custom `create_context` / `close_context` / `reset_context` callables can
+    be supplied to pool other kinds of sessions.
+    """
+
+    def __init__(
+        self,
+        size: int = DEFAULT_POOL_SIZE,
+        max_uses: int = DEFAULT_MAX_USES,
+        max_memory_mb: Optional[float] = None,
+        headless: bool = True,
+        create_context: Optional[Callable[[], Awaitable[Any]]] = None,
+        close_context: Optional[Callable[[Any], Awaitable[None]]] = None,
+        reset_context: Optional[Callable[[Any], Awaitable[None]]] = None,
+        memory_probe: Optional[Callable[[Any], Awaitable[float]]] = None,
+        block_resources: bool = True,
+    ):
+        self.size = max(1, size)
+        self.max_uses = max_uses
+        self.max_memory_mb = max_memory_mb
+        self.headless = headless
+        self.block_resources = block_resources and resource_blocking_enabled()
+        self._create_context = create_context or self._new_browser_use_context
+        self._close_context = close_context or self._close_browser_use_context
+        self._reset_context = reset_context or _clear_browser_use_context
+        self._memory_probe = memory_probe or _browser_use_context_memory_mb
+
+        self._browser: Any = None
+        # Created on first use so the pool can be constructed outside an event loop
+        self._idle: Optional["asyncio.Queue[PooledContext]"] = None
+        self._start_lock: Optional[asyncio.Lock] = None
+        self._in_use: Set[PooledContext] = set()
+        self._replacing: Set["asyncio.Task[None]"] = set()
+        # Slots whose context could not be relaunched, and when the next attempt is due
+        self._missing = 0
+        self._relaunching = 0
+        self._launch_failures = 0
+        self._relaunch_after = 0.0
+        self._started = False
+        self._closing = False
+        self._started_at = 0.0
+
+        self._acquisitions = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._busy_seconds = 0.0
+        self._recycles = 0
+        self._created = 0
+        self._resources = {"sessions": 0, "allowed": 0, "blocked": 0, "stubbed": 0,
+                           "transferred_bytes": 0, "blocked_bytes_estimate": 0}
+
+    async def _new_browser_use_context(self) -> Any:
+        if self._browser is None:
+            from browser_use import Browser, BrowserConfig
+            extra_args = list(LEAN_BROWSER_ARGS) if self.block_resources else []
+            self._browser = Browser(config=BrowserConfig(headless=self.headless, extra_chromium_args=extra_args))
+        context = await self._browser.new_context()
+        if self.block_resources:
+            try:
+                await attach_resource_blocker(context)
+            except Exception as e:
+                print(f"Error installing resource blocking, loading pages in full: {e}")
+        return context
+
+    async def _close_browser_use_context(self, context: Any) -> None:
+        await context.close()
+
+    async def _launch(self) -> PooledContext:
+        pooled = PooledContext(await self._create_context())
+        self._created += 1
+        return pooled
+
+    def _launch_failed(self, error: Exception) -> None:
+        print(f"Error launching browser context: {error}")
+        self._missing += 1
+        self._launch_failures += 1
+        backoff = RELAUNCH_BACKOFF_SECONDS * 2 ** (self._launch_failures - 1)
+        self._relaunch_after = time.monotonic() + min(backoff, MAX_RELAUNCH_BACKOFF_SECONDS)
+
+    async def _relaunch(self) -> Optional[PooledContext]:
+        """
+        Launch a context for a missing slot, or return None if it fails or its backoff has not passed.
+        """
+        if time.monotonic() < self._relaunch_after:
+            return None
+        self._missing -= 1
+        self._relaunching += 1
+        try:
+            pooled = await self._launch()
+        except Exception as e:
+            self._launch_failed(e)
+            return None
+        finally:
+            self._relaunching -= 1
+        self._launch_failures = 0
+        return pooled
+
+    async def start(self) -> None:
+        """
+        Pre-launch all contexts. Called automatically on first use.
+
+        Contexts that fail to launch are left as missing slots for acquire() to
+        relaunch; only a pool where none came up fails to start.
+        """
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+            self._idle = asyncio.Queue()
+        async with self._start_lock:
+            if self._started:
+                return
+            if self._closing:
+                raise PoolClosedError("Browser pool is closed")
+            launched = await asyncio.gather(*(self._launch() for _ in range(self.size)), return_exceptions=True)
+            errors = [outcome for outcome in launched if isinstance(outcome, BaseException)]
+            if len(errors) == len(launched):
+                # Nothing came up: shut down the browser too, so the next start begins from scratch
+                await self._close_browser()
+                raise PoolUnavailableError(f"No browser context could be launched: {errors[0]}") from errors[0]
+            for outcome in launched:
+                if isinstance(outcome, BaseException):
+                    self._launch_failed(outcome)
+                else:
+                    self._idle.put_nowait(outcome)
+            self._started_at = time.monotonic()
+            self._started = True
+
+    async def acquire(self, timeout: Optional[float] = None) -> PooledContext:
+        """
+        Take a context from the pool, waiting until one is free.
+
+        Missing slots are relaunched first when no context is idle.
+
+        Args:
+            timeout: Maximum number of seconds to wait, or None to wait indefinitely
+
+        Returns:
+            The pooled context; hand it back with release()
+
+        Raises:
+            PoolUnavailableError: If no context is left and none can be launched
+        """
+        if self._closing:
+            raise PoolClosedError("Browser pool is closed")
+        await self.start()
+
+        wait_started = time.monotonic()
+        deadline = None if timeout is None else wait_started + timeout
+        pooled = None
+        while pooled is None:
+            if self._idle.empty() and self._missing:
+                pooled = await self._relaunch()
+                if pooled is not None:
+                    break
+            if self._idle.empty() and not (self._in_use or self._replacing or self._relaunching):
+                raise PoolUnavailableError(f"No browser contexts left: {self._missing} of {self.size} failed to launch")
+            # Wake up now and then to relaunch slots lost while waiting, even if nothing is released
+            wait = RELAUNCH_BACKOFF_SECONDS
+            if deadline is not None:
+                wait = min(wait, max(deadline - time.monotonic(), 0.0))
+            try:
+                pooled = await asyncio.wait_for(self._idle.get(), wait)
+            except asyncio.TimeoutError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise
+        waited = time.monotonic() - wait_started
+        if self._closing:
+            self._idle.put_nowait(pooled)
+            raise PoolClosedError("Browser pool is closed")
+
+        self._acquisitions += 1
+        self._wait_seconds += waited
+        self._max_wait_seconds = max(self._max_wait_seconds, waited)
+        pooled.uses += 1
+        self._in_use.add(pooled)
+        return pooled
+
+    async def release(self, pooled: PooledContext, busy_seconds: float = 0.0) -> None:
+        """
+        Return a context to the pool, resetting or recycling it.
+
+        Args:
+            pooled: Context obtained from acquire()
+            busy_seconds: How long the caller held the context
+        """
+        self._busy_seconds += busy_seconds
+
+        if self._closing:
+            self._in_use.discard(pooled)
+            await self._discard(pooled)
+            return
+
+        # The context counts as in use until it is idle or being replaced
+        recycle = await self._needs_recycle(pooled)
+        self._in_use.discard(pooled)
+        if self._closing:
+            await self._discard(pooled)
+            return
+        if recycle:
+            self._recycles += 1
+            task = asyncio.ensure_future(self._replace(pooled))
+            self._replacing.add(task)
+            task.add_done_callback(self._replacing.discard)
+            return
+
+        self._idle.put_nowait(pooled)
+
+    async def _needs_recycle(self, pooled: PooledContext) -> bool:
+        if self.max_uses and pooled.uses >= self.max_uses:
+            return True
+        try:
+            await self._reset_context(pooled.context)
+        except Exception as e:
+            print(f"Browser context reset failed, recycling it: {e}")
+            return True
+        if self.max_memory_mb is None:
+            return False
+        try:
+            return await self._memory_probe(pooled.context) > self.max_memory_mb
+        except Exception:
+            return False
+
+    async def _replace(self, pooled: PooledContext) -> None:
+        await self._discard(pooled)
+        if self._closing:
+            return
+        try:
+            fresh = await self._launch()
+        except Exception as e:
+            # The slot is relaunched by a later acquire()
+            self._launch_failed(e)
+            return
+        if self._closing:
+            await self._discard(fresh)
+            return
+        self._idle.put_nowait(fresh)
+
+    async def _discard(self, pooled: PooledContext) -> None:
+        try:
+            await self._close_context(pooled.context)
+        except Exception as e:
+            print(f"Error closing browser context: {e}")
+
+    @asynccontextmanager
+    async def session(self, timeout: Optional[float] = None, site: Optional[str] = None) -> AsyncIterator[Any]:
+        """
+        Borrow a browser context for the duration of a booking.
+
+        Args:
+            timeout: Maximum number of seconds to wait for a free context
+            site: Site the booking runs on, which selects the resource policy
+        """
+        pooled = await self.acquire(timeout)
+        blocker = getattr(pooled.context, "resource_blocker", None)
+        if blocker is not None:
+            blocker.begin(site)
+        held_since = time.monotonic()
+        try:
+            yield pooled.context
+        finally:
+            if blocker is not None:
+                self._count_resources(blocker.end())
+            await self.release(pooled, time.monotonic() - held_since)
+
+    def _count_resources(self, session: SessionResources) -> None:
+        totals = self._resources
+        totals["sessions"] += 1
+        for name in ("allowed", "blocked", "stubbed", "transferred_bytes", "blocked_bytes_estimate"):
+            totals[name] += getattr(session, name)
+
+    async def close(self, timeout: Optional[float] = 30.0) -> None:
+        """
+        Drain the pool: wait for borrowed contexts to come back, then close everything.
+
+        Args:
+            timeout: Maximum number of seconds to wait for borrowed contexts
+        """
+        self._closing = True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._in_use and (deadline is None or time.monotonic() < deadline):
+            await asyncio.sleep(0.05)
+        if self._replacing:
+            await asyncio.gather(*self._replacing, return_exceptions=True)
+
+        leftovers: List[PooledContext] = list(self._in_use)
+        while self._idle is not None and not self._idle.empty():
+            leftovers.append(self._idle.get_nowait())
+        await asyncio.gather(*(self._discard(pooled) for pooled in leftovers))
+        self._in_use.clear()
+
+        await self._close_browser()
+
+    async def _close_browser(self) -> None:
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception as e:
+                print(f"Error closing browser: {e}")
+            self._browser = None
+
+    async def __aenter__(self) -> "BrowserPool":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Return wait time, utilization, recycle and resource-blocking counters for the pool.
+        """
+        elapsed = time.monotonic() - self._started_at if self._started else 0.0
+        capacity_seconds = elapsed * self.size
+        return {
+            "size": self.size,
+            "in_use": len(self._in_use),
+            "idle": self._idle.qsize() if self._idle is not None else 0,
+            "acquisitions": self._acquisitions,
+            "avg_wait_seconds": self._wait_seconds / self._acquisitions if self._acquisitions else 0.0,
+            "max_wait_seconds": self._max_wait_seconds,
+            "utilization": self._busy_seconds / capacity_seconds if capacity_seconds else 0.0,
+            "recycles": self._recycles,
+            "contexts_created": self._created,
+            "missing": self._missing,
+            "resources": dict(self._resources),
+        }
+
+
+@asynccontextmanager
+async def browser_session(pool: Optional[BrowserPool], site: Optional[str] = None) -> AsyncIterator[Any]:
+    """
+    Borrow a context from the pool for a booking on `site`, or yield None when no pool is in use.
+    """
+    if pool is None:
+        yield None
+        return
+    async with pool.session(site=site) as context:
+        yield context
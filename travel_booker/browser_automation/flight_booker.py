@@ -4,52 +4,318 @@ Flight booking automation for Finnair using browser-use.
 import os
 import json
 import asyncio
-import time
-from typing import Dict, Any, Optional
+from dataclasses import replace
+from urllib.parse import urlencode
+from typing import Dict, Any, Optional, List, Sequence, Tuple
 
-def book_flight(booking_details: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+from travel_booker.browser_automation.browser_pool import BrowserPool, browser_session
+from travel_booker.browser_automation.resource_policy import session_resources
+from travel_booker.core.coalesce import details_key, get_booking_coalescer
+from travel_booker.core import events
+from travel_booker.core.events import BookingReporter, EventCallback
+from travel_booker.core.booking import FlightRequest, FlightBooking, Money
+from travel_booker.core.inventory import FlightInventory, get_flight_inventory
+from travel_booker.core.gazetteer import canonicalize_details, iata_code, suggest_city
+from travel_booker.core.search_cache import MISS, get_search_cache
+from travel_booker.core.checkpoint import Checkpoint, get_checkpoint_store
+from travel_booker.core.flex import cheapest_candidate, cheapest_prices, date_window, flex_days, search_candidates
+
+SITE = "finnair"
+SEARCH_URL = "https://www.finnair.com/en/booking/flight-selection"
+PASSENGERS_URL = "https://www.finnair.com/en/booking/passengers"
+SEARCH_RESULTS_LIMIT = 5
+# Result of the simulated search when no local inventory is configured
+DEFAULT_FLIGHT_OPTION = {
+    "flight_number": "AY1234", "departure_time": "09:30", "arrival_time": "11:45", "price_minor": 35000, "currency": "EUR",
+}
+
+
+async def _search_flights(
+    browser_context: Any,
+    request: FlightRequest,
+    inventory: Optional[FlightInventory]
+) -> List[Dict[str, Any]]:
+    """
+    Search Finnair for flights on the requested route and date, cheapest first.
+    """
+    # For demo purposes, simulate the time the search results take to load
+    await asyncio.sleep(1)
+    if inventory is None:
+        return [dict(DEFAULT_FLIGHT_OPTION)]
+    return inventory.cheapest(request.origin, request.destination, request.date.isoformat(), limit=SEARCH_RESULTS_LIMIT)
+
+
+async def _search_flights_in_session(
+    pool: Optional[BrowserPool],
+    request: FlightRequest,
+    inventory: Optional[FlightInventory]
+) -> List[Dict[str, Any]]:
+    """
+    Run a flight search in a browser session of its own (used for background refreshes).
+    """
+    async with browser_session(pool, SITE) as browser_context:
+        return await _search_flights(browser_context, request, inventory)
+
+
+async def search_flight_candidates(
+    browser_context: Any,
+    pool: Optional[BrowserPool],
+    requests: Sequence[FlightRequest],
+    inventory: Optional[FlightInventory] = None
+) -> List[Tuple[List[Dict[str, Any]], str]]:
+    """
+    Search Finnair for every candidate date of a flexible request at once, each in its own tab.
+
+    Args:
+        browser_context: Browser session the searches run in
+        pool: Warm browser pool, used for background refreshes of stale results
+        requests: One request per candidate date
+        inventory: Local flight inventory; dates without flights on the route are not searched
+
+    Returns:
+        Search results (cheapest first) and how they were served, per request
+    """
+    async def search(request: FlightRequest) -> List[Dict[str, Any]]:
+        if inventory is not None and not inventory.has_route(request.origin, request.destination, request.date.isoformat()):
+            return []
+        return await _search_flights(browser_context, request, inventory)
+
+    return await search_candidates(SITE, requests, search, lambda request: _search_flights_in_session(pool, request, inventory))
+
+
+async def _verify_flight(
+    browser_context: Any,
+    request: FlightRequest,
+    option: Dict[str, Any],
+    inventory: Optional[FlightInventory]
+) -> Optional[Dict[str, Any]]:
+    """
+    Reopen the chosen flight and return its current fare, or None if it can no longer be booked.
+    """
+    # Opening one offer is much quicker than a full search
+    await asyncio.sleep(0.2)
+    if inventory is None:
+        return option
+    return inventory.flight(request.origin, request.destination, request.date.isoformat(), option["flight_number"])
+
+
+def _search_url(request: FlightRequest) -> str:
+    """
+    Return the Finnair search results URL of a request.
+    """
+    query = urlencode({
+        "origin": iata_code(request.origin) or request.origin,
+        "destination": iata_code(request.destination) or request.destination,
+        "date": request.date.isoformat(),
+        "adults": request.num_adults,
+        "children": request.num_children,
+    })
+    return f"{SEARCH_URL}?{query}"
+
+
+async def _reverify_flight(
+    browser_context: Any,
+    request: FlightRequest,
+    option: Dict[str, Any],
+    inventory: Optional[FlightInventory],
+    report: BookingReporter
+) -> Optional[Dict[str, Any]]:
+    """
+    Re-check a cached or checkpointed flight before booking it, searching again if it is gone.
+    """
+    report.emit(events.VERIFYING, f"Checking that flight {option['flight_number']} is still available...",
+                flight_number=option["flight_number"])
+    current = await _verify_flight(browser_context, request, option, inventory)
+    cache = get_search_cache()
+    if cache is not None and (current is None or current["price_minor"] != option["price_minor"]):
+        cache.invalidate(SITE, request.to_dict())
+    if current is None:
+        options = await _search_flights(browser_context, request, inventory)
+        if cache is not None:
+            cache.put(SITE, request.to_dict(), options)
+        current = options[0] if options else None
+    return current
+
+
+async def _book_flight_async(
+    booking_details: Dict[str, Any],
+    pool: Optional[BrowserPool] = None,
+    inventory: Optional[FlightInventory] = None,
+    on_event: Optional[EventCallback] = None
+) -> Optional[Dict[str, Any]]:
     """
     Automate flight booking on Finnair website using browser-use.
+    """
+    report = BookingReporter("flight", on_event, site=SITE)
+    checkpoints = get_checkpoint_store()
+    key = None
+    try:
+        # Validate the parsed details before opening any pages; places are searched by their canonical names
+        request = FlightRequest.from_dict(canonicalize_details(booking_details))
+        # Flexible requests search every date of their window and book the cheapest
+        flex = flex_days(booking_details)
+        window = date_window(request.date, flex)
+        when = f"between {window[0]} and {window[-1]}" if flex else f"on {request.date}"
+        # The checkpoint keeps the details as keyed, window included, so a resume re-enters under the same key
+        requested = dict(request.to_dict(), date_flex_days=flex) if flex else request.to_dict()
+        key = details_key("flight", requested)
+        # An earlier attempt that got past the selection step continues from its checkpoint
+        checkpoint = checkpoints.load(key) if checkpoints is not None else None
+        if checkpoint is not None:
+            request = FlightRequest.from_dict(checkpoint.details)
+
+        def save_step(step: str, option: Dict[str, Any], url: str, form: Optional[Dict[str, Any]] = None) -> None:
+            if checkpoints is not None:
+                checkpoints.save(Checkpoint(key, "flight", step, request.to_dict(), option, form or {}, url,
+                                            attempts=checkpoint.attempts if checkpoint is not None else 0,
+                                            requested=requested))
+
+        # Check the local inventory first so we never open a session for a route with no flights
+        inventory = inventory or get_flight_inventory()
+        if inventory is not None and not any(
+            inventory.has_route(request.origin, request.destination, date.isoformat()) for date in window
+        ):
+            if checkpoint is not None:
+                checkpoints.clear(key)
+            hints = [f"did you mean {hint}?" for hint in map(suggest_city, (request.origin, request.destination)) if hint]
+            report.emit(events.UNAVAILABLE, f"No flights from {request.origin} to {request.destination} {when} in the local inventory"
+                        + (f" ({', '.join(hints)})" if hints else ""))
+            return None
+
+        async with browser_session(pool, SITE) as browser_context:
+            if checkpoint is not None:
+                report.emit(events.STARTED, f"Resuming flight booking after the {checkpoint.step.replace('_', ' ')} step...",
+                            resumed_from=checkpoint.step, url=checkpoint.url)
+                # For demo purposes, simulate reopening the saved page
+                await asyncio.sleep(1)
+                option, source = checkpoint.option, "checkpoint"
+            else:
+                report.emit(events.STARTED, "Starting flight booking process...")
+                # For demo purposes, simulate a delay to make it look like we're doing something
+                await asyncio.sleep(1)
+                
+                # Mock the flight booking process; identical searches are served from the search cache
+                report.emit(events.SEARCHING, f"Searching for flights from {request.origin} to {request.destination} {when}...",
+                            origin_code=iata_code(request.origin), destination_code=iata_code(request.destination),
+                            dates=[date.isoformat() for date in window])
+                if flex:
+                    candidates = [replace(request, date=date) for date in window]
+                    found = await search_flight_candidates(browser_context, pool, candidates, inventory)
+                    best = cheapest_candidate(cheapest_prices(found, "price_minor"),
+                                              [abs(offset) for offset in range(-flex, flex + 1)])
+                    options, source = found[best] if best is not None else ([], MISS)
+                    if best is not None:
+                        request = candidates[best]
+                else:
+                    cache = get_search_cache()
+                    search = lambda: _search_flights(browser_context, request, inventory)
+                    if cache is not None:
+                        options, source = await cache.get_or_search(
+                            SITE, request.to_dict(), search, refresh=lambda: _search_flights_in_session(pool, request, inventory)
+                        )
+                    else:
+                        options, source = await search(), MISS
+                if not options:
+                    report.emit(events.UNAVAILABLE, f"No flights from {request.origin} to {request.destination} {when} found on Finnair")
+                    return None
+                option = options[0]
+                
+                if inventory is not None:
+                    report.emit(events.SELECTING, f"Selecting flight {option['flight_number']} on {request.date} found in the local inventory...",
+                                flight_number=option["flight_number"], date=request.date.isoformat(), search_cache=source)
+                else:
+                    report.emit(events.SELECTING, "Found several flight options, selecting the best one...",
+                                date=request.date.isoformat(), search_cache=source)
+                await asyncio.sleep(0.5)
+            
+            if source != MISS:
+                # Cached and checkpointed flights may be out of date: re-check only the chosen one
+                option = await _reverify_flight(browser_context, request, option, inventory, report)
+                if option is None:
+                    if checkpoint is not None:
+                        checkpoints.clear(key)
+                    report.emit(events.UNAVAILABLE, f"No flights from {request.origin} to {request.destination} on {request.date} are left")
+                    return None
+            
+            form = {"num_adults": request.num_adults, "num_children": request.num_children}
+            if checkpoint is not None and checkpoint.step == events.PASSENGER_DETAILS:
+                report.emit(events.PASSENGER_DETAILS, "Restoring passenger details from the checkpoint...", resumed=True)
+                form = checkpoint.form or form
+            else:
+                save_step(events.SELECTING, option, _search_url(request))
+                report.emit(events.PASSENGER_DETAILS, "Continuing to passenger details...")
+                await asyncio.sleep(0.5)
+            save_step(events.PASSENGER_DETAILS, option, PASSENGERS_URL, form)
+            
+            report.emit(events.CONFIRMING, "Confirming booking...")
+            # Create a mock booking result
+            booking_id = f"FINN-{os.urandom(3).hex().upper()}"
+            
+            booking_result = FlightBooking(
+                booking_id=booking_id,
+                flight_number=option["flight_number"],
+                origin=request.origin,
+                destination=request.destination,
+                date=request.date,
+                departure_time=option["departure_time"],
+                arrival_time=option["arrival_time"],
+                price=Money(option["price_minor"], option["currency"]),
+                status="pending_payment"
+            ).to_dict()
+            
+            if checkpoints is not None:
+                checkpoints.clear(key)
+            report.emit(events.CONFIRMED, f"Flight booking completed successfully (ID: {booking_id})", booking_id=booking_id,
+                        resources=session_resources(browser_context))
+            return booking_result
+        
+    except Exception as e:
+        if checkpoints is not None and key is not None:
+            checkpoints.record_failure(key)
+        report.emit(events.FAILED, f"Error in flight booking: {e}", error=str(e))
+        return None
+
+
+async def book_flight_async(
+    booking_details: Dict[str, Any],
+    pool: Optional[BrowserPool] = None,
+    inventory: Optional[FlightInventory] = None,
+    on_event: Optional[EventCallback] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Automate flight booking on Finnair website using browser-use.
+    
+    Concurrent calls with the same details share one booking, and repeats
+    within the idempotency window get the stored result (see travel_booker.core.coalesce).
     
     Args:
-        booking_details: Dictionary with flight booking details
+        booking_details: Dictionary with flight booking details; with a
+            "date_flex_days" window, the cheapest date in the window is booked
+        pool: Warm browser pool to borrow a context from (optional)
+        inventory: Local flight inventory used as a pre-filter (defaults to
+            the snapshot configured in TRAVEL_BOOKER_FLIGHT_SNAPSHOT, if any)
+        on_event: Callback receiving typed step events (see travel_booker.core.events)
         
     Returns:
         Dictionary with booking confirmation details or None if booking failed
     """
-    try:
-        print("Starting flight booking process...")
-        # For demo purposes, simulate a delay to make it look like we're doing something
-        time.sleep(1)
-        
-        # Mock the flight booking process
-        print(f"Searching for flights from {booking_details['origin']} to {booking_details['destination']} on {booking_details['date']}...")
-        time.sleep(1)
-        
-        print("Found several flight options, selecting the best one...")
-        time.sleep(0.5)
-        
-        print("Continuing to passenger details...")
-        time.sleep(0.5)
-        
-        # Create a mock booking result
-        booking_id = f"FINN-{os.urandom(3).hex().upper()}"
-        
-        booking_result = {
-            "booking_id": booking_id,
-            "flight_number": "AY1234",
-            "origin": booking_details["origin"],
-            "destination": booking_details["destination"],
-            "date": booking_details["date"],
-            "departure_time": "09:30",
-            "arrival_time": "11:45",
-            "price": "€350.00",
-            "status": "pending_payment"
-        }
-        
-        print(f"Flight booking completed successfully (ID: {booking_id})")
-        return booking_result
-        
-    except Exception as e:
-        print(f"Error in flight booking: {e}")
-        return None 
\ No newline at end of file
+    return await get_booking_coalescer().call_async(
+        details_key("flight", booking_details),
+        lambda: _book_flight_async(booking_details, pool, inventory, on_event)
+    )
+
+
+def book_flight(
+    booking_details: Dict[str, Any],
+    on_event: Optional[EventCallback] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Blocking wrapper around book_flight_async.
+    
+    Use book_flight_async from code that already runs an event loop so that
+    several Finnair sessions can share it.
+    """
+    return get_booking_coalescer().call(
+        details_key("flight", booking_details),
+        lambda: asyncio.run(_book_flight_async(booking_details, on_event=on_event))
+    )
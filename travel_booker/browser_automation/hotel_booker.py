@@ -3,52 +3,346 @@ Hotel booking automation for Booking.com using browser-use.
 """
 import os
 import json
-import time
-from typing import Dict, Any, Optional
+import asyncio
+import datetime
+from dataclasses import replace
+from urllib.parse import urlencode
+from typing import Dict, Any, Optional, List, Sequence, Tuple
 
-def book_hotel(booking_details: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+from travel_booker.browser_automation.browser_pool import BrowserPool, browser_session
+from travel_booker.browser_automation.resource_policy import session_resources
+from travel_booker.core.coalesce import details_key, get_booking_coalescer
+from travel_booker.core import events
+from travel_booker.core.events import BookingReporter, EventCallback
+from travel_booker.core.booking import HotelRequest, HotelBooking, Money
+from travel_booker.core.availability import HotelAvailability, get_hotel_availability
+from travel_booker.core.gazetteer import canonicalize_details, iata_code, suggest_city
+from travel_booker.core.search_cache import MISS, get_search_cache
+from travel_booker.core.checkpoint import Checkpoint, get_checkpoint_store
+from travel_booker.core.flex import cheapest_candidate, cheapest_prices, nights_flex, search_candidates, stay_lengths
+
+SITE = "booking.com"
+SEARCH_URL = "https://www.booking.com/searchresults.html"
+GUESTS_URL = "https://secure.booking.com/book.html"
+SEARCH_RESULTS_LIMIT = 5
+DEFAULT_PRICE_PER_NIGHT_MINOR = 18000
+
+
+async def _search_hotels(
+    browser_context: Any,
+    request: HotelRequest,
+    availability: Optional[HotelAvailability]
+) -> List[Dict[str, Any]]:
+    """
+    Search Booking.com for properties with the requested room free for the whole stay, cheapest first.
+    """
+    # For demo purposes, simulate the time the search results take to load
+    await asyncio.sleep(1)
+    if availability is None:
+        return [{
+            "property_id": "grand-plaza",
+            "name": "Grand Plaza Hotel",
+            "nights": request.nights,
+            "total_price_minor": DEFAULT_PRICE_PER_NIGHT_MINOR * request.nights,
+            "price_per_night_minor": DEFAULT_PRICE_PER_NIGHT_MINOR,
+            "currency": "EUR",
+        }]
+    return availability.find(
+        request.location,
+        request.check_in_date.isoformat(),
+        request.check_out_date.isoformat(),
+        request.room_type,
+        limit=SEARCH_RESULTS_LIMIT
+    )
+
+
+async def _search_hotels_in_session(
+    pool: Optional[BrowserPool],
+    request: HotelRequest,
+    availability: Optional[HotelAvailability]
+) -> List[Dict[str, Any]]:
+    """
+    Run a hotel search in a browser session of its own (used for background refreshes).
+    """
+    async with browser_session(pool, SITE) as browser_context:
+        return await _search_hotels(browser_context, request, availability)
+
+
+async def search_hotel_candidates(
+    browser_context: Any,
+    pool: Optional[BrowserPool],
+    requests: Sequence[HotelRequest],
+    availability: Optional[HotelAvailability] = None
+) -> List[Tuple[List[Dict[str, Any]], str]]:
+    """
+    Search Booking.com for every candidate stay of a flexible request at once, each in its own tab.
+
+    Args:
+        browser_context: Browser session the searches run in
+        pool: Warm browser pool, used for background refreshes of stale results
+        requests: One request per candidate check-in date and stay length
+        availability: Local availability index; stays no property can host are not searched
+
+    Returns:
+        Search results (cheapest first) and how they were served, per request
+    """
+    async def search(request: HotelRequest) -> List[Dict[str, Any]]:
+        if availability is not None and not availability.is_bookable(
+            request.location, request.check_in_date.isoformat(), request.check_out_date.isoformat(), request.room_type
+        ):
+            return []
+        return await _search_hotels(browser_context, request, availability)
+
+    return await search_candidates(SITE, requests, search, lambda request: _search_hotels_in_session(pool, request, availability))
+
+
+async def _verify_hotel(
+    browser_context: Any,
+    request: HotelRequest,
+    option: Dict[str, Any],
+    availability: Optional[HotelAvailability]
+) -> Optional[Dict[str, Any]]:
+    """
+    Reopen the chosen property and return its current price, or None if the stay can no longer be booked there.
+    """
+    # Opening one property page is much quicker than a full search
+    await asyncio.sleep(0.2)
+    if availability is None:
+        return option
+    return availability.quote(
+        option["property_id"],
+        request.location,
+        request.check_in_date.isoformat(),
+        request.check_out_date.isoformat(),
+        request.room_type
+    )
+
+
+def _search_url(request: HotelRequest) -> str:
+    """
+    Return the Booking.com search results URL of a request.
+    """
+    query = urlencode({
+        "ss": request.location,
+        "checkin": request.check_in_date.isoformat(),
+        "checkout": request.check_out_date.isoformat(),
+        "group_adults": request.num_adults,
+        "group_children": request.num_children,
+    })
+    return f"{SEARCH_URL}?{query}"
+
+
+async def _reverify_hotel(
+    browser_context: Any,
+    request: HotelRequest,
+    option: Dict[str, Any],
+    availability: Optional[HotelAvailability],
+    report: BookingReporter
+) -> Optional[Dict[str, Any]]:
+    """
+    Re-check a cached or checkpointed property before booking it, searching again if it is gone.
+    """
+    report.emit(events.VERIFYING, f"Checking that {option['name']} is still available...",
+                property_id=option["property_id"])
+    current = await _verify_hotel(browser_context, request, option, availability)
+    cache = get_search_cache()
+    if cache is not None and (current is None or current["total_price_minor"] != option["total_price_minor"]):
+        cache.invalidate(SITE, request.to_dict())
+    if current is None:
+        options = await _search_hotels(browser_context, request, availability)
+        if cache is not None:
+            cache.put(SITE, request.to_dict(), options)
+        current = options[0] if options else None
+    return current
+
+
+async def _book_hotel_async(
+    booking_details: Dict[str, Any],
+    pool: Optional[BrowserPool] = None,
+    availability: Optional[HotelAvailability] = None,
+    on_event: Optional[EventCallback] = None
+) -> Optional[Dict[str, Any]]:
     """
     Automate hotel booking on Booking.com website using browser-use.
+    """
+    report = BookingReporter("hotel", on_event, site=SITE)
+    checkpoints = get_checkpoint_store()
+    key = None
+    try:
+        # Validate the parsed details before opening any pages; places are searched by their canonical names
+        request = HotelRequest.from_dict(canonicalize_details(booking_details))
+        # Flexible stays search every length in their window and book the cheapest
+        flex = nights_flex(booking_details)
+        lengths = stay_lengths(request.nights, flex)
+        candidates = [
+            replace(request, check_out_date=request.check_in_date + datetime.timedelta(days=nights)) for nights in lengths
+        ]
+        stay = (f"from {request.check_in_date} for {lengths[0]} to {lengths[-1]} nights" if flex
+                else f"from {request.check_in_date} to {request.check_out_date}")
+        # The checkpoint keeps the details as keyed, window included, so a resume re-enters under the same key
+        requested = dict(request.to_dict(), nights_flex=flex) if flex else request.to_dict()
+        key = details_key("hotel", requested)
+        # An earlier attempt that got past the selection step continues from its checkpoint
+        checkpoint = checkpoints.load(key) if checkpoints is not None else None
+        if checkpoint is not None:
+            request = HotelRequest.from_dict(checkpoint.details)
+
+        def save_step(step: str, option: Dict[str, Any], url: str, form: Optional[Dict[str, Any]] = None) -> None:
+            if checkpoints is not None:
+                checkpoints.save(Checkpoint(key, "hotel", step, request.to_dict(), option, form or {}, url,
+                                            attempts=checkpoint.attempts if checkpoint is not None else 0,
+                                            requested=requested))
+
+        # Check local availability first so we never open a session for a stay that cannot be booked
+        availability = availability or get_hotel_availability()
+        if availability is not None and not any(
+            availability.is_bookable(
+                candidate.location,
+                candidate.check_in_date.isoformat(),
+                candidate.check_out_date.isoformat(),
+                candidate.room_type
+            )
+            for candidate in candidates
+        ):
+            if checkpoint is not None:
+                checkpoints.clear(key)
+            hint = suggest_city(request.location)
+            report.emit(events.UNAVAILABLE, f"No {request.room_type} rooms free in {request.location} for the whole stay in the local availability index"
+                        + (f" (did you mean {hint}?)" if hint else ""))
+            return None
+
+        async with browser_session(pool, SITE) as browser_context:
+            if checkpoint is not None:
+                report.emit(events.STARTED, f"Resuming hotel booking after the {checkpoint.step.replace('_', ' ')} step...",
+                            resumed_from=checkpoint.step, url=checkpoint.url)
+                # For demo purposes, simulate reopening the saved page
+                await asyncio.sleep(1)
+                option, source = checkpoint.option, "checkpoint"
+            else:
+                report.emit(events.STARTED, "Starting hotel booking process...")
+                # For demo purposes, simulate a delay to make it look like we're doing something
+                await asyncio.sleep(1)
+                
+                # Mock the hotel booking process; identical searches are served from the search cache
+                report.emit(events.SEARCHING, f"Searching for hotels in {request.location} {stay}...",
+                            location_code=iata_code(request.location), nights=lengths)
+                if flex:
+                    found = await search_hotel_candidates(browser_context, pool, candidates, availability)
+                    best = cheapest_candidate(cheapest_prices(found, "total_price_minor"),
+                                              [abs(nights - request.nights) for nights in lengths])
+                    options, source = found[best] if best is not None else ([], MISS)
+                    if best is not None:
+                        request = candidates[best]
+                else:
+                    cache = get_search_cache()
+                    search = lambda: _search_hotels(browser_context, request, availability)
+                    if cache is not None:
+                        options, source = await cache.get_or_search(
+                            SITE, request.to_dict(), search, refresh=lambda: _search_hotels_in_session(pool, request, availability)
+                        )
+                    else:
+                        options, source = await search(), MISS
+                if not options:
+                    report.emit(events.UNAVAILABLE, f"No {request.room_type} rooms free in {request.location} for the whole stay on Booking.com")
+                    return None
+                option = options[0]
+                
+                if availability is not None:
+                    report.emit(events.SELECTING, f"Selecting {option['name']} for {request.nights} nights found in the local availability index...",
+                                property_id=option["property_id"], nights=request.nights, search_cache=source)
+                else:
+                    report.emit(events.SELECTING, "Found several hotel options, selecting a top-rated one...",
+                                nights=request.nights, search_cache=source)
+                await asyncio.sleep(0.5)
+            
+            if source != MISS:
+                # Cached and checkpointed properties may be out of date: re-check only the chosen one
+                option = await _reverify_hotel(browser_context, request, option, availability, report)
+                if option is None:
+                    if checkpoint is not None:
+                        checkpoints.clear(key)
+                    report.emit(events.UNAVAILABLE, f"No {request.room_type} rooms are left in {request.location} for the whole stay")
+                    return None
+            
+            form = {"room_type": request.room_type, "num_adults": request.num_adults, "num_children": request.num_children}
+            if checkpoint is not None and checkpoint.step == events.GUEST_DETAILS:
+                report.emit(events.GUEST_DETAILS, "Restoring the room and guest details from the checkpoint...", resumed=True)
+                form = checkpoint.form or form
+            else:
+                save_step(events.SELECTING, option, _search_url(request))
+                report.emit(events.GUEST_DETAILS, "Selecting room type and continuing to guest details...")
+                await asyncio.sleep(0.5)
+            save_step(events.GUEST_DETAILS, option, GUESTS_URL, form)
+            
+            report.emit(events.CONFIRMING, "Confirming booking...")
+            # Create a mock booking result
+            booking_id = f"BK-{os.urandom(3).hex().upper()}"
+            
+            booking_result = HotelBooking(
+                booking_id=booking_id,
+                hotel_name=option["name"],
+                location=request.location,
+                check_in_date=request.check_in_date,
+                check_out_date=request.check_out_date,
+                room_type=request.room_type,
+                price_per_night=Money(option["price_per_night_minor"], option["currency"]),
+                total_price=Money(option["total_price_minor"], option["currency"]),
+                status="pending_payment"
+            ).to_dict()
+            
+            if checkpoints is not None:
+                checkpoints.clear(key)
+            report.emit(events.CONFIRMED, f"Hotel booking completed successfully (ID: {booking_id})", booking_id=booking_id,
+                        resources=session_resources(browser_context))
+            return booking_result
+        
+    except Exception as e:
+        if checkpoints is not None and key is not None:
+            checkpoints.record_failure(key)
+        report.emit(events.FAILED, f"Error in hotel booking: {e}", error=str(e))
+        return None
+
+
+async def book_hotel_async(
+    booking_details: Dict[str, Any],
+    pool: Optional[BrowserPool] = None,
+    availability: Optional[HotelAvailability] = None,
+    on_event: Optional[EventCallback] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Automate hotel booking on Booking.com website using browser-use.
+    
+    Concurrent calls with the same details share one booking, and repeats
+    within the idempotency window get the stored result (see travel_booker.core.coalesce).
     
     Args:
-        booking_details: Dictionary with hotel booking details
+        booking_details: Dictionary with hotel booking details; with a
+            "nights_flex" window, the cheapest stay length in the window is booked
+        pool: Warm browser pool to borrow a context from (optional)
+        availability: Local availability index used as a pre-filter (defaults
+            to the snapshot configured in TRAVEL_BOOKER_HOTEL_SNAPSHOT, if any)
+        on_event: Callback receiving typed step events (see travel_booker.core.events)
         
     Returns:
         Dictionary with booking confirmation details or None if booking failed
     """
-    try:
-        print("Starting hotel booking process...")
-        # For demo purposes, simulate a delay to make it look like we're doing something
-        time.sleep(1)
-        
-        # Mock the hotel booking process
-        print(f"Searching for hotels in {booking_details['location']} from {booking_details['check_in_date']} to {booking_details['check_out_date']}...")
-        time.sleep(1)
-        
-        print("Found several hotel options, selecting a top-rated one...")
-        time.sleep(0.5)
-        
-        print("Selecting room type and continuing to guest details...")
-        time.sleep(0.5)
-        
-        # Create a mock booking result
-        booking_id = f"BK-{os.urandom(3).hex().upper()}"
-        
-        booking_result = {
-            "booking_id": booking_id,
-            "hotel_name": "Grand Plaza Hotel",
-            "location": booking_details["location"],
-            "check_in_date": booking_details["check_in_date"],
-            "check_out_date": booking_details["check_out_date"],
-            "room_type": booking_details.get("room_type", "standard"),
-            "price_per_night": "€180.00",
-            "total_price": "€540.00",
-            "status": "pending_payment"
-        }
-        
-        print(f"Hotel booking completed successfully (ID: {booking_id})")
-        return booking_result
-        
-    except Exception as e:
-        print(f"Error in hotel booking: {e}")
-        return None 
\ No newline at end of file
+    return await get_booking_coalescer().call_async(
+        details_key("hotel", booking_details),
+        lambda: _book_hotel_async(booking_details, pool, availability, on_event)
+    )
+
+
+def book_hotel(
+    booking_details: Dict[str, Any],
+    on_event: Optional[EventCallback] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Blocking wrapper around book_hotel_async.
+    
+    Use book_hotel_async from code that already runs an event loop so that
+    several Booking.com sessions can share it.
+    """
+    return get_booking_coalescer().call(
+        details_key("hotel", booking_details),
+        lambda: asyncio.run(_book_hotel_async(booking_details, on_event=on_event))
+    )
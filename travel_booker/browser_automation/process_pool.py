@@ -0,0 +1,536 @@
+"""
+Booking executor that spreads browser sessions over worker processes.
+
+Driving many browser sessions from one Python process makes that process the
+bottleneck long before the machine is. ProcessBookingExecutor starts a number
+of worker processes, each with its own event loop and BrowserPool, and runs
+parse-and-book jobs (see travel_booker.cli.batch.process_job) on them:
+
+- Jobs are sharded by their booking key, so repeats of the same booking land
+  on the same worker and share its coalescer and search cache. A worker whose
+  own shard is empty steals the newest job from the longest other shard.
+- Step events and results are streamed back over a multiprocessing queue as
+  they happen.
+- A worker whose resident memory goes over the limit, or that has handled
+  its maximum number of jobs, finishes what it is running and is replaced by a
+  fresh process. A worker that dies has its jobs requeued on the others.
+- A replacement that fails to start (e.g. its browser pool does not come up)
+  is respawned with exponential backoff. After MAX_START_FAILURES failures in
+  a row its slot is given up, and the jobs of its shard fail instead of
+  waiting for a worker that never comes.
+
+Memory is read from /proc, so the limits only apply on Linux.
+"""
+import os
+import sys
+import zlib
+import time
+import asyncio
+import threading
+import itertools
+import contextlib
+import multiprocessing
+from collections import deque
+from typing import Dict, Any, Optional, List, Deque, Set
+
+from travel_booker.browser_automation.browser_pool import DEFAULT_POOL_SIZE
+from travel_booker.core.coalesce import details_key
+from travel_booker.core.events import EventCallback
+
+DEFAULT_JOBS_PER_WORKER = 4
+DEFAULT_START_TIMEOUT = 60.0
+# A worker over its memory limit by this factor is killed instead of being allowed to finish
+HARD_MEMORY_FACTOR = 1.5
+# How often a job may be retried after the worker running it died
+MAX_ATTEMPTS = 2
+MONITOR_INTERVAL = 0.2
+# Replacements that die before they are ready are respawned after a growing delay, then given up
+MAX_START_FAILURES = 5
+RESPAWN_BACKOFF_SECONDS = 1.0
+MAX_RESPAWN_BACKOFF_SECONDS = 30.0
+
+
+class WorkerStartError(RuntimeError):
+    """
+    Raised when worker processes fail to start.
+    """
+
+
+def _rss_mb(pid: Optional[int] = None) -> Optional[float]:
+    """
+    Return the resident memory of a process (default: this one) in MB, or None if unknown.
+    """
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _worker_main(worker_id: int, tasks: Any, results: Any, pool_size: int,
+                 max_memory_mb: Optional[float], max_jobs: Optional[int]) -> None:
+    """
+    Entry point of a worker process.
+    """
+    # Progress messages of the booking flows must not mix with the parent's output
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            asyncio.run(_worker_loop(worker_id, tasks, results, pool_size, max_memory_mb, max_jobs))
+        except KeyboardInterrupt:
+            pass
+
+
+async def _worker_loop(worker_id: int, tasks: Any, results: Any, pool_size: int,
+                       max_memory_mb: Optional[float], max_jobs: Optional[int]) -> None:
+    from travel_booker.browser_automation.browser_pool import BrowserPool
+    from travel_booker.cli.batch import process_job
+
+    loop = asyncio.get_running_loop()
+    pool = None
+    try:
+        if pool_size > 0:
+            pool = BrowserPool(size=pool_size)
+            await pool.start()
+    except Exception as e:
+        results.put(("failed", worker_id, f"{type(e).__name__}: {e}"))
+        return
+    results.put(("ready", worker_id, os.getpid()))
+
+    running = set()
+    handled = 0
+    retiring = False
+
+    async def run(job_id: int, job: Dict[str, Any], parse_only: bool, stream_events: bool) -> None:
+        nonlocal handled, retiring
+        on_event = (lambda event: results.put(("event", worker_id, job_id, event))) if stream_events else None
+        try:
+            output = await process_job(job, parse_only, on_event, pool=pool)
+        except Exception as e:
+            output = {"id": job.get("id"), "error": f"{type(e).__name__}: {e}"}
+        handled += 1
+        rss = _rss_mb()
+        results.put(("done", worker_id, job_id, output, rss))
+        if not retiring:
+            if max_memory_mb is not None and rss is not None and rss > max_memory_mb:
+                retiring = True
+                results.put(("retiring", worker_id, f"memory {rss:.0f} MB over the {max_memory_mb:.0f} MB limit"))
+            elif max_jobs is not None and handled >= max_jobs:
+                retiring = True
+                results.put(("retiring", worker_id, f"handled {handled} jobs"))
+
+    try:
+        while True:
+            # The parent sends None once the worker should exit
+            message = await loop.run_in_executor(None, tasks.get)
+            if message is None:
+                break
+            job_id, job, parse_only, stream_events = message
+            task = asyncio.ensure_future(run(job_id, job, parse_only, stream_events))
+            running.add(task)
+            task.add_done_callback(running.discard)
+            # Back-pressure is applied by the parent, which never sends more than jobs_per_worker at once
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+    finally:
+        if pool is not None:
+            await pool.close()
+
+
+class _PendingJob:
+    __slots__ = ("job_id", "job", "parse_only", "on_event", "future", "attempts")
+
+    def __init__(self, job_id: int, job: Dict[str, Any], parse_only: bool, on_event: Optional[EventCallback],
+                 future: "asyncio.Future[Dict[str, Any]]"):
+        self.job_id = job_id
+        self.job = job
+        self.parse_only = parse_only
+        self.on_event = on_event
+        self.future = future
+        self.attempts = 0
+
+
+class _Worker:
+    __slots__ = ("worker_id", "slot", "process", "tasks", "ready", "accepting", "replaced", "assigned", "rss_mb",
+                 "completed", "started_at")
+
+    def __init__(self, worker_id: int, slot: int, process: Any, tasks: Any):
+        self.worker_id = worker_id
+        self.slot = slot
+        self.process = process
+        self.tasks = tasks
+        self.ready = False
+        self.accepting = True
+        # Set once a replacement was started for this worker
+        self.replaced = False
+        self.assigned: Dict[int, _PendingJob] = {}
+        self.rss_mb: Optional[float] = None
+        self.completed = 0
+        self.started_at = time.monotonic()
+
+
+class ProcessBookingExecutor:
+    """
+    Runs parse-and-book jobs on a pool of worker processes with their own browser pools.
+    """
+
+    def __init__(
+        self,
+        processes: Optional[int] = None,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        jobs_per_worker: Optional[int] = None,
+        max_memory_mb: Optional[float] = None,
+        max_jobs: Optional[int] = None,
+        start_method: str = "spawn",
+        start_timeout: float = DEFAULT_START_TIMEOUT,
+    ):
+        """
+        Args:
+            processes: Number of worker processes (defaults to the number of CPUs)
+            pool_size: Warm browser contexts per worker (0 to book without a pool)
+            jobs_per_worker: Jobs each worker runs concurrently (defaults to the
+                pool size, or DEFAULT_JOBS_PER_WORKER without a pool)
+            max_memory_mb: Resident memory after which a worker is replaced (optional)
+            max_jobs: Number of jobs after which a worker is replaced (optional)
+            start_method: multiprocessing start method; "spawn" keeps workers
+                free of the parent's threads and event loop
+            start_timeout: Seconds start() waits for the workers to be ready
+        """
+        self.processes = max(1, processes or os.cpu_count() or 1)
+        self.pool_size = max(0, pool_size)
+        self.jobs_per_worker = max(1, jobs_per_worker or self.pool_size or DEFAULT_JOBS_PER_WORKER)
+        self.max_memory_mb = max_memory_mb
+        self.max_jobs = max_jobs
+        self.start_timeout = start_timeout
+        self._context = multiprocessing.get_context(start_method)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._results: Any = None
+        self._reader: Optional[threading.Thread] = None
+        self._monitor: Optional["asyncio.Task[None]"] = None
+        self._worker_ids = itertools.count(1)
+        self._job_ids = itertools.count(1)
+        self._workers: Dict[int, _Worker] = {}
+        # One queue of waiting jobs per worker slot
+        self._shards: List[Deque[_PendingJob]] = [deque() for _ in range(self.processes)]
+        self._closing = False
+        self._start_error: Optional[str] = None
+        # Consecutive start failures and due respawns of each slot, and the slots given up on
+        self._start_failures = [0] * self.processes
+        self._respawns: Dict[int, float] = {}
+        self._abandoned: Set[int] = set()
+
+        self.counters = {"submitted": 0, "completed": 0, "failed": 0, "stolen": 0, "requeued": 0, "restarts": 0}
+
+    async def start(self) -> None:
+        """
+        Start the worker processes and wait until each has its browser pool ready.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._results = self._context.Queue()
+        self._reader = threading.Thread(target=self._read_results, name="booking-executor-results", daemon=True)
+        self._reader.start()
+        for slot in range(self.processes):
+            self._spawn(slot)
+        deadline = time.monotonic() + self.start_timeout
+        while not all(worker.ready for worker in self._workers.values()):
+            if self._start_error is not None or time.monotonic() > deadline:
+                error = self._start_error or f"workers not ready within {self.start_timeout:.0f}s"
+                await self.close(timeout=0)
+                raise WorkerStartError(f"Booking workers failed to start: {error}")
+            await asyncio.sleep(0.02)
+        self._monitor = asyncio.ensure_future(self._watch())
+
+    def _spawn(self, slot: int) -> _Worker:
+        worker_id = next(self._worker_ids)
+        tasks = self._context.Queue()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker_id, tasks, self._results, self.pool_size, self.max_memory_mb, self.max_jobs),
+            name=f"booking-worker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        worker = self._workers[worker_id] = _Worker(worker_id, slot, process, tasks)
+        return worker
+
+    def _read_results(self) -> None:
+        """
+        Forward worker messages to the event loop (runs in a thread).
+        """
+        while True:
+            try:
+                message = self._results.get()
+            except (EOFError, OSError):
+                return
+            if message is None:
+                return
+            try:
+                self._loop.call_soon_threadsafe(self._handle, message)
+            except RuntimeError:
+                # The event loop is closed
+                return
+
+    def _handle(self, message: Any) -> None:
+        kind, worker_id = message[0], message[1]
+        worker = self._workers.get(worker_id)
+        if kind == "event":
+            pending = worker.assigned.get(message[2]) if worker is not None else None
+            if pending is not None and pending.on_event is not None:
+                try:
+                    pending.on_event(message[3])
+                except Exception as e:
+                    print(f"Error in event callback: {e}", file=sys.stderr)
+            return
+        if worker is None:
+            return
+        if kind == "ready":
+            worker.ready = True
+            self._start_failures[worker.slot] = 0
+        elif kind == "failed":
+            self._start_error = message[2]
+            worker.accepting = False
+            print(f"Booking worker {worker_id} failed to start: {message[2]}", file=sys.stderr)
+        elif kind == "done":
+            _, _, job_id, output, worker.rss_mb = message
+            worker.completed += 1
+            pending = worker.assigned.pop(job_id, None)
+            if pending is not None:
+                self._finish(pending, output)
+        elif kind == "retiring":
+            print(f"Replacing booking worker {worker_id}: {message[2]}", file=sys.stderr)
+            self._retire(worker)
+        if not worker.accepting and not worker.assigned:
+            self._stop_worker(worker)
+        self._dispatch()
+
+    def _finish(self, pending: _PendingJob, output: Dict[str, Any]) -> None:
+        self.counters["completed"] += 1
+        if output.get("error"):
+            self.counters["failed"] += 1
+        if not pending.future.done():
+            pending.future.set_result(output)
+
+    def _retire(self, worker: _Worker) -> None:
+        """
+        Stop sending jobs to a worker and start its replacement.
+        """
+        worker.accepting = False
+        if not worker.replaced and not self._closing:
+            worker.replaced = True
+            self._respawn(worker.slot)
+
+    def _respawn(self, slot: int) -> None:
+        """
+        Start a new worker for a slot, after a backoff if its last workers failed to start.
+        """
+        failures = self._start_failures[slot]
+        if failures == 0:
+            self.counters["restarts"] += 1
+            self._spawn(slot)
+        elif failures >= MAX_START_FAILURES:
+            self._abandon(slot)
+        else:
+            delay = min(RESPAWN_BACKOFF_SECONDS * 2 ** (failures - 1), MAX_RESPAWN_BACKOFF_SECONDS)
+            self._respawns[slot] = time.monotonic() + delay
+
+    def _abandon(self, slot: int) -> None:
+        """
+        Give up on a slot whose workers keep failing to start, failing the jobs queued for it.
+        """
+        print(f"Booking worker slot {slot} failed to start {self._start_failures[slot]} times in a row; "
+              f"failing its jobs", file=sys.stderr)
+        self._abandoned.add(slot)
+        shard = self._shards[slot]
+        while shard:
+            pending = shard.popleft()
+            self._finish(pending, self._start_failed_output(pending.job))
+
+    def _start_failed_output(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        return {"id": job.get("id"), "type": job.get("type"),
+                "error": f"Booking worker could not be started: {self._start_error or 'unknown error'}"}
+
+    def _stop_worker(self, worker: _Worker) -> None:
+        try:
+            worker.tasks.put(None)
+        except (OSError, ValueError):
+            pass
+
+    def _next_job(self, slot: int, steal: bool) -> Optional[_PendingJob]:
+        own = self._shards[slot]
+        if own:
+            return own.popleft()
+        if not steal:
+            return None
+        # Steal the newest job of the busiest shard; its owner keeps working from the oldest end
+        victim = max(self._shards, key=len)
+        if victim:
+            self.counters["stolen"] += 1
+            return victim.pop()
+        return None
+
+    def _dispatch(self) -> None:
+        # Workers take from their own shards first and only then steal from the others
+        for steal in (False, True):
+            for worker in list(self._workers.values()):
+                if worker.ready and worker.accepting:
+                    self._fill(worker, steal)
+
+    def _fill(self, worker: _Worker, steal: bool) -> None:
+        while len(worker.assigned) < self.jobs_per_worker:
+            pending = self._next_job(worker.slot, steal)
+            if pending is None:
+                return
+            if pending.future.done():
+                continue
+            pending.attempts += 1
+            worker.assigned[pending.job_id] = pending
+            worker.tasks.put((pending.job_id, pending.job, pending.parse_only, pending.on_event is not None))
+
+    async def _watch(self) -> None:
+        """
+        Replace workers that died or grew far past the memory limit.
+        """
+        while True:
+            await asyncio.sleep(MONITOR_INTERVAL)
+            now = time.monotonic()
+            for slot, due in list(self._respawns.items()):
+                if due <= now:
+                    del self._respawns[slot]
+                    self.counters["restarts"] += 1
+                    self._spawn(slot)
+            for worker in list(self._workers.values()):
+                if worker.process.is_alive():
+                    if self.max_memory_mb is not None and worker.ready:
+                        rss = _rss_mb(worker.process.pid)
+                        if rss is not None and rss > self.max_memory_mb * HARD_MEMORY_FACTOR:
+                            print(f"Killing booking worker {worker.worker_id}: memory {rss:.0f} MB", file=sys.stderr)
+                            worker.process.kill()
+                    continue
+                self._reap(worker)
+            self._dispatch()
+
+    def _reap(self, worker: _Worker) -> None:
+        """
+        Clean up after a worker process that has exited, requeueing the jobs it did not finish.
+        """
+        del self._workers[worker.worker_id]
+        worker.process.join(0)
+        if not worker.ready:
+            # Died before its browser pool was ready: its replacement waits longer each time
+            self._start_failures[worker.slot] += 1
+        if worker.assigned:
+            print(f"Booking worker {worker.worker_id} exited with code {worker.process.exitcode}; "
+                  f"requeueing {len(worker.assigned)} jobs", file=sys.stderr)
+        for pending in worker.assigned.values():
+            if pending.attempts >= MAX_ATTEMPTS:
+                self._finish(pending, {"id": pending.job.get("id"), "type": pending.job.get("type"),
+                                       "error": f"Booking worker exited with code {worker.process.exitcode}"})
+            else:
+                self.counters["requeued"] += 1
+                self._shards[worker.slot].appendleft(pending)
+        worker.assigned.clear()
+        self._retire(worker)
+
+    def _shard(self, job: Dict[str, Any]) -> int:
+        details = job.get("details")
+        if isinstance(details, dict):
+            key = details_key(str(job.get("type")), details)
+        else:
+            key = f"{job.get('type')}:{' '.join(str(job.get('request', '')).casefold().split())}"
+        return zlib.crc32(key.encode("utf-8")) % self.processes
+
+    async def submit(self, job: Dict[str, Any], parse_only: bool = False,
+                     on_event: Optional[EventCallback] = None) -> Dict[str, Any]:
+        """
+        Run one job on a worker process.
+
+        Args:
+            job: Dictionary with "id", "type" and either "request" text or parsed "details"
+            parse_only: Stop after parsing instead of booking
+            on_event: Optional callback receiving the booking's step events as they are streamed back
+
+        Returns:
+            Output dictionary of process_job
+        """
+        if self._closing or self._loop is None:
+            raise RuntimeError("Booking executor is not running")
+        future = self._loop.create_future()
+        pending = _PendingJob(next(self._job_ids), job, parse_only, on_event, future)
+        slot = self._shard(job)
+        self.counters["submitted"] += 1
+        if slot in self._abandoned:
+            self._finish(pending, self._start_failed_output(job))
+            return future.result()
+        self._shards[slot].append(pending)
+        self._dispatch()
+        return await asyncio.shield(future)
+
+    async def close(self, timeout: Optional[float] = 30.0) -> None:
+        """
+        Finish queued and running jobs, then stop the workers.
+
+        Args:
+            timeout: Maximum number of seconds to wait for outstanding jobs
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while (any(self._shards) or any(worker.assigned for worker in self._workers.values())) and \
+                (deadline is None or time.monotonic() < deadline):
+            await asyncio.sleep(0.05)
+        self._closing = True
+        if self._monitor is not None:
+            self._monitor.cancel()
+        self._respawns.clear()
+
+        for worker in self._workers.values():
+            worker.accepting = False
+            self._stop_worker(worker)
+        for worker in list(self._workers.values()):
+            await self._loop.run_in_executor(None, worker.process.join, 5.0)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join(1.0)
+            for pending in worker.assigned.values():
+                if not pending.future.done():
+                    pending.future.set_exception(RuntimeError("Booking executor closed"))
+        for shard in self._shards:
+            while shard:
+                pending = shard.popleft()
+                if not pending.future.done():
+                    pending.future.set_exception(RuntimeError("Booking executor closed"))
+        self._workers.clear()
+
+        if self._results is not None:
+            self._results.put(None)
+            if self._reader is not None:
+                await self._loop.run_in_executor(None, self._reader.join, 5.0)
+            self._results.close()
+
+    async def __aenter__(self) -> "ProcessBookingExecutor":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Return job counters and the load and memory of each worker.
+        """
+        return {
+            "processes": self.processes,
+            "jobs_per_worker": self.jobs_per_worker,
+            "queued": sum(len(shard) for shard in self._shards),
+            "abandoned_slots": sorted(self._abandoned),
+            "counters": dict(self.counters),
+            "workers": [
+                {
+                    "worker_id": worker.worker_id,
+                    "pid": worker.process.pid,
+                    "in_flight": len(worker.assigned),
+                    "completed": worker.completed,
+                    "rss_mb": round(worker.rss_mb, 1) if worker.rss_mb is not None else None,
+                    "accepting": worker.accepting,
+                }
+                for worker in self._workers.values()
+            ],
+        }
@@ -0,0 +1,262 @@
+"""
+Resource blocking for the browser-use sessions of the booking flows.
+
+Finnair and Booking.com pages pull in megabytes of images, fonts, video,
+analytics and ads that the automation never looks at. A ResourceBlocker is
+attached to every pooled browser context and intercepts its requests with the
+ResourcePolicy of the site the current booking runs on:
+
+- images, media, fonts and web app manifests are aborted,
+- third-party tracker and ad scripts are answered with an empty script (so
+  pages waiting for them still load) and their other requests are aborted,
+- URLs matching the site's allowlist (and captcha providers) always load.
+
+The browser is also launched with LEAN_BROWSER_ARGS, which turn off features
+the flows do not need. Each session counts its allowed, blocked and stubbed
+requests. The bytes a blocked request would have cost are not known, so they
+are estimated from typical sizes per resource type (TYPICAL_BYTES).
+
+Set TRAVEL_BOOKER_BLOCK_RESOURCES=0 to load pages in full.
+"""
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlsplit
+
+ALLOW = "allow"
+BLOCK = "block"
+STUB = "stub"
+
+# Playwright resource types the flows never need
+BLOCKED_RESOURCE_TYPES = ("image", "media", "font", "manifest")
+
+TRACKER_DOMAINS = (
+    "google-analytics.com", "googletagmanager.com", "googleadservices.com", "googlesyndication.com",
+    "doubleclick.net", "adservice.google.com", "facebook.net", "facebook.com/tr", "connect.facebook.net",
+    "hotjar.com", "hotjar.io", "clarity.ms", "bat.bing.com", "criteo.com", "criteo.net", "taboola.com",
+    "outbrain.com", "scorecardresearch.com", "quantserve.com", "adsrvr.org", "amazon-adsystem.com",
+    "analytics.tiktok.com", "snap.licdn.com", "ads.linkedin.com", "segment.io", "segment.com",
+    "optimizely.com", "nr-data.net", "js-agent.newrelic.com", "demdex.net", "omtrdc.net", "everesttech.net",
+    "cookielaw.org", "onetrust.com", "usabilla.com", "qualtrics.com", "mouseflow.com", "fullstory.com",
+)
+
+# Bot checks break the flows when their widgets cannot load
+CAPTCHA_ALLOWLIST = (
+    "google.com/recaptcha/", "gstatic.com/recaptcha/", "recaptcha.net/", "hcaptcha.com/",
+    "challenges.cloudflare.com/",
+)
+
+# Rough transfer sizes of requests that are never made, for the blocked-bytes estimate
+TYPICAL_BYTES = {
+    "image": 40_000,
+    "media": 500_000,
+    "font": 35_000,
+    "manifest": 1_000,
+    "script": 25_000,
+}
+DEFAULT_TYPICAL_BYTES = 2_000
+
+STUB_CONTENT_TYPES = {
+    "script": "application/javascript",
+    "stylesheet": "text/css",
+}
+
+# Chromium features the booking flows do not use
+LEAN_BROWSER_ARGS = (
+    "--disable-extensions",
+    "--disable-component-extensions-with-background-pages",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-translate",
+    "--disable-domain-reliability",
+    "--disable-client-side-phishing-detection",
+    "--disable-features=MediaRouter,OptimizationHints,Translate,AutofillServerCommunication",
+    "--metrics-recording-only",
+    "--mute-audio",
+    "--no-first-run",
+    "--no-default-browser-check",
+)
+
+
+def _matches_domain(host: str, url: str, domains: Tuple[str, ...]) -> bool:
+    for domain in domains:
+        if "/" in domain:
+            if f"//{domain}" in url or f".{domain}" in url:
+                return True
+        elif host == domain or host.endswith("." + domain):
+            return True
+    return False
+
+
+@dataclass(frozen=True)
+class ResourcePolicy:
+    """
+    What a site's pages may load.
+    """
+    site: str = "default"
+    # URL fragments that always load, e.g. assets a flow clicks on
+    allowlist: Tuple[str, ...] = CAPTCHA_ALLOWLIST
+    block_types: Tuple[str, ...] = BLOCKED_RESOURCE_TYPES
+    block_trackers: bool = True
+    tracker_domains: Tuple[str, ...] = TRACKER_DOMAINS
+
+    def decide(self, url: str, resource_type: str) -> str:
+        """
+        Decide what to do with a request.
+
+        Args:
+            url: Request URL
+            resource_type: Playwright resource type ("image", "script", ...)
+
+        Returns:
+            ALLOW, BLOCK or STUB (answer with an empty body)
+        """
+        if any(pattern in url for pattern in self.allowlist):
+            return ALLOW
+        if self.block_trackers and _matches_domain((urlsplit(url).hostname or "").lower(), url, self.tracker_domains):
+            return STUB if resource_type in STUB_CONTENT_TYPES else BLOCK
+        if resource_type in self.block_types:
+            return BLOCK
+        return ALLOW
+
+
+SITE_POLICIES: Dict[str, ResourcePolicy] = {
+    # The seat map and fare-family icons are SVG images the selection step reads
+    "finnair": ResourcePolicy("finnair", CAPTCHA_ALLOWLIST + ("finnair.com/assets/icons/", "/seatmap/")),
+    # Room type icons are an icon font the room selection needs to render its buttons
+    "booking.com": ResourcePolicy("booking.com", CAPTCHA_ALLOWLIST + ("bstatic.com/static/fonts/bui-icons",)),
+}
+DEFAULT_POLICY = ResourcePolicy()
+
+
+def resource_blocking_enabled() -> bool:
+    """
+    Return False when TRAVEL_BOOKER_BLOCK_RESOURCES is "0".
+    """
+    return os.getenv("TRAVEL_BOOKER_BLOCK_RESOURCES", "1") != "0"
+
+
+def policy_for(site: Optional[str]) -> ResourcePolicy:
+    """
+    Return the resource policy of a site (the default policy for unknown sites).
+    """
+    return SITE_POLICIES.get(site or "", DEFAULT_POLICY)
+
+
+@dataclass
+class SessionResources:
+    """
+    Request counters of one booking session.
+    """
+    site: str
+    allowed: int = 0
+    blocked: int = 0
+    stubbed: int = 0
+    transferred_bytes: int = 0
+    blocked_bytes_estimate: int = 0
+    blocked_by_type: Dict[str, int] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "site": self.site,
+            "allowed": self.allowed,
+            "blocked": self.blocked,
+            "stubbed": self.stubbed,
+            "transferred_bytes": self.transferred_bytes,
+            "blocked_bytes_estimate": self.blocked_bytes_estimate,
+            "blocked_by_type": dict(self.blocked_by_type),
+        }
+
+
+class ResourceBlocker:
+    """
+    Applies a ResourcePolicy to every request of one browser context.
+    """
+
+    def __init__(self, policy: ResourcePolicy = DEFAULT_POLICY):
+        self.policy = policy
+        self.session = SessionResources(policy.site)
+
+    async def attach(self, playwright_context: Any) -> None:
+        """
+        Start intercepting the requests of a Playwright browser context.
+        """
+        await playwright_context.route("**/*", self._route)
+        playwright_context.on("response", self._on_response)
+
+    def begin(self, site: Optional[str]) -> None:
+        """
+        Switch to a site's policy and start counting a new session.
+        """
+        self.policy = policy_for(site)
+        self.session = SessionResources(self.policy.site)
+
+    def end(self) -> SessionResources:
+        """
+        Return the counters of the current session and start a new one under the same policy.
+        """
+        session, self.session = self.session, SessionResources(self.policy.site)
+        return session
+
+    def record(self, resource_type: str, decision: str) -> None:
+        session = self.session
+        if decision == ALLOW:
+            session.allowed += 1
+            return
+        if decision == STUB:
+            session.stubbed += 1
+        else:
+            session.blocked += 1
+        session.blocked_by_type[resource_type] = session.blocked_by_type.get(resource_type, 0) + 1
+        session.blocked_bytes_estimate += TYPICAL_BYTES.get(resource_type, DEFAULT_TYPICAL_BYTES)
+
+    async def _route(self, route: Any) -> None:
+        request = route.request
+        resource_type = request.resource_type
+        decision = self.policy.decide(request.url, resource_type)
+        self.record(resource_type, decision)
+        try:
+            if decision == ALLOW:
+                await route.continue_()
+            elif decision == STUB:
+                await route.fulfill(status=200, body="", content_type=STUB_CONTENT_TYPES[resource_type])
+            else:
+                await route.abort("blockedbyclient")
+        except Exception:
+            # The page navigated away or closed while the request was pending
+            pass
+
+    def _on_response(self, response: Any) -> None:
+        try:
+            self.session.transferred_bytes += int(response.headers.get("content-length") or 0)
+        except (TypeError, ValueError, AttributeError):
+            pass
+
+
+async def attach_resource_blocker(context: Any) -> Optional[ResourceBlocker]:
+    """
+    Attach a ResourceBlocker to a browser-use context, kept as its `resource_blocker` attribute.
+
+    Returns:
+        The blocker, or None when blocking is disabled or the context has no Playwright context
+    """
+    if not resource_blocking_enabled():
+        return None
+    session = await context.get_session()
+    playwright_context = getattr(session, "context", None)
+    if playwright_context is None:
+        return None
+    blocker = ResourceBlocker()
+    await blocker.attach(playwright_context)
+    context.resource_blocker = blocker
+    return blocker
+
+
+def session_resources(context: Any) -> Optional[Dict[str, Any]]:
+    """
+    Return the request counters of a pooled context's current session, or None without a blocker.
+    """
+    blocker = getattr(context, "resource_blocker", None)
+    return blocker.session.to_dict() if blocker is not None else None
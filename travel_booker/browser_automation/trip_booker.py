@@ -0,0 +1,320 @@
+"""
+Concurrent flight and hotel booking for a single trip.
+"""
+import time
+import asyncio
+import datetime
+from dataclasses import replace
+from typing import Dict, Any, Optional, Tuple
+
+from travel_booker.browser_automation.browser_pool import BrowserPool, browser_session
+from travel_booker.browser_automation import flight_booker, hotel_booker
+from travel_booker.browser_automation.flight_booker import book_flight_async, search_flight_candidates
+from travel_booker.browser_automation.hotel_booker import book_hotel_async, search_hotel_candidates
+from travel_booker.core import events
+from travel_booker.core.booking import FlightRequest, HotelRequest, Money
+from travel_booker.core.events import BookingReporter, EventCallback
+from travel_booker.core.flex import (
+    cheapest_combination, cheapest_prices, date_window, exact_details, flex_days, nights_flex, stay_lengths,
+)
+from travel_booker.core.gazetteer import canonicalize_details
+from travel_booker.core.inventory import FlightInventory, get_flight_inventory
+from travel_booker.core.availability import HotelAvailability, get_hotel_availability
+from travel_booker.core.trip_plan import TripPlan, TripPlanError, build_trip_plan, resolve_details
+
+BOOKERS = {"flight": book_flight_async, "hotel": book_hotel_async}
+
+
+def is_flexible(flight_details: Optional[Dict[str, Any]], hotel_details: Optional[Dict[str, Any]]) -> bool:
+    """
+    Return True if a flight and the stay after it have a date or length-of-stay window to choose from.
+    """
+    return bool(flight_details and hotel_details and (flex_days(flight_details) or nights_flex(hotel_details)))
+
+
+async def choose_trip_window(
+    flight_details: Dict[str, Any],
+    hotel_details: Dict[str, Any],
+    pool: Optional[BrowserPool] = None,
+    on_event: Optional[EventCallback] = None,
+    inventory: Optional[FlightInventory] = None,
+    availability: Optional[HotelAvailability] = None
+) -> Optional[Tuple[FlightRequest, HotelRequest, int]]:
+    """
+    Pick the flight date and stay length of a flexible trip with the lowest total cost.
+    
+    Every date in the flight's window and every stay length in the hotel's
+    window are searched at once, in one Finnair and one Booking.com session.
+    The stay checks in as many days after the flight as requested (on the
+    flight's date when the hotel details have no check-in date). The searches
+    go through the search cache, so booking the chosen flight and stay
+    afterwards does not search again.
+    
+    Args:
+        flight_details: Flight details, optionally with a "date_flex_days" window
+        hotel_details: Hotel details with "check_out_date" or "nights", optionally
+            with a "nights_flex" window
+        pool: Warm browser pool to borrow the two sessions from (optional)
+        on_event: Callback receiving the search events (optional)
+        inventory: Local flight inventory (defaults to the configured snapshot)
+        availability: Local availability index (defaults to the configured snapshot)
+        
+    Returns:
+        The chosen FlightRequest and HotelRequest and their total price in
+        minor units, or None if no combination can be booked
+    """
+    flight = FlightRequest.from_dict(canonicalize_details(exact_details(flight_details)))
+    check_in = hotel_details.get("check_in_date")
+    lead = datetime.timedelta(days=(datetime.date.fromisoformat(check_in) - flight.date).days if check_in else 0)
+    nights = int(hotel_details.get("nights") or 0) or HotelRequest.from_dict(canonicalize_details(hotel_details)).nights
+    days = flex_days(flight_details)
+    lengths = stay_lengths(nights, nights_flex(hotel_details))
+    flights = [replace(flight, date=date) for date in date_window(flight.date, days)]
+    stays = [
+        HotelRequest.from_dict(canonicalize_details(exact_details(
+            hotel_details,
+            check_in_date=(candidate.date + lead).isoformat(),
+            check_out_date=(candidate.date + lead + datetime.timedelta(days=length)).isoformat(),
+        )))
+        for candidate in flights for length in lengths
+    ]
+
+    report = BookingReporter("trip", on_event)
+    report.emit(events.SEARCHING, f"Searching {len(flights)} flight dates and {len(stays)} stays for the cheapest trip...",
+                dates=[candidate.date.isoformat() for candidate in flights], nights=lengths)
+    inventory = inventory or get_flight_inventory()
+    availability = availability or get_hotel_availability()
+    async with browser_session(pool, flight_booker.SITE) as flight_context, browser_session(pool, hotel_booker.SITE) as hotel_context:
+        found_flights, found_stays = await asyncio.gather(
+            search_flight_candidates(flight_context, pool, flights, inventory),
+            search_hotel_candidates(hotel_context, pool, stays, availability)
+        )
+
+    # Prefer the requested date and length when totals tie
+    distances = [abs(offset) + abs(length - nights) for offset in range(-days, days + 1) for length in lengths]
+    best = cheapest_combination(cheapest_prices(found_flights, "price_minor"),
+                                cheapest_prices(found_stays, "total_price_minor"), distances)
+    if best is None:
+        report.emit(events.SELECTING, "No flight and stay in the window can be booked together")
+        return None
+    index, total = best
+    chosen_flight, chosen_stay = flights[index // len(lengths)], stays[index]
+    currency = found_flights[index // len(lengths)][0][0]["currency"]
+    report.emit(events.SELECTING, f"Cheapest trip: flight on {chosen_flight.date} and {chosen_stay.nights} nights "
+                f"from {chosen_stay.check_in_date}, {Money(total, currency).format()} in total",
+                date=chosen_flight.date.isoformat(), nights=chosen_stay.nights, total_price_minor=total)
+    return chosen_flight, chosen_stay, total
+
+
+async def _choose_plan_windows(plan: TripPlan, pool: Optional[BrowserPool], on_event: Optional[EventCallback]) -> None:
+    """
+    Fix the date of each flexible flight and the length of the stay that checks in off it, jointly.
+    """
+    pairs = []
+    for stay in plan.nodes.values():
+        leg_id = stay.derived.get("check_in_date")
+        if leg_id is None or not stay.details.get("nights") or not plan.nodes[leg_id].details.get("date"):
+            continue
+        if is_flexible(plan.nodes[leg_id].details, stay.details):
+            pairs.append((plan.nodes[leg_id], stay))
+
+    async def choose(leg: Any, stay: Any) -> None:
+        try:
+            choice = await choose_trip_window(leg.details, stay.details, pool, on_event)
+        except ValueError as e:
+            print(f"Error choosing trip dates: {e}")
+            return
+        if choice is not None:
+            chosen_flight, chosen_stay, _ = choice
+            leg.details = exact_details(leg.details, date=chosen_flight.date.isoformat())
+            stay.details = exact_details(stay.details, nights=chosen_stay.nights)
+
+    await asyncio.gather(*(choose(leg, stay) for leg, stay in pairs))
+
+
+async def book_trip_async(
+    flight_details: Optional[Dict[str, Any]],
+    hotel_details: Optional[Dict[str, Any]],
+    pool: Optional[BrowserPool] = None,
+    on_event: Optional[EventCallback] = None
+) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Book the flight and the hotel of a trip concurrently.
+    
+    When the flight has a date window or the hotel a length-of-stay window,
+    the cheapest combination by total trip cost is chosen first (see
+    choose_trip_window) and the stay is moved along with the flight.
+    
+    Args:
+        flight_details: Dictionary with flight booking details, or None to skip the flight
+        hotel_details: Dictionary with hotel booking details, or None to skip the hotel
+        pool: Warm browser pool shared by both bookings (optional)
+        on_event: Callback receiving the step events of both bookings (optional)
+        
+    Returns:
+        Dictionary with "flight" and "hotel" booking results (None if skipped or failed)
+    """
+    async def skip() -> None:
+        return None
+
+    if is_flexible(flight_details, hotel_details):
+        try:
+            choice = await choose_trip_window(flight_details, hotel_details, pool, on_event)
+        except ValueError as e:
+            print(f"Error choosing trip dates: {e}")
+            choice = None
+        if choice is not None:
+            chosen_flight, chosen_stay, _ = choice
+            flight_details = exact_details(flight_details, date=chosen_flight.date.isoformat())
+            hotel_details = exact_details(hotel_details, check_in_date=chosen_stay.check_in_date.isoformat(),
+                                          check_out_date=chosen_stay.check_out_date.isoformat())
+
+    flight_result, hotel_result = await asyncio.gather(
+        book_flight_async(flight_details, pool, on_event=on_event) if flight_details else skip(),
+        book_hotel_async(hotel_details, pool, on_event=on_event) if hotel_details else skip()
+    )
+    return {"flight": flight_result, "hotel": hotel_result}
+
+
+def book_trip(
+    flight_details: Optional[Dict[str, Any]],
+    hotel_details: Optional[Dict[str, Any]],
+    on_event: Optional[EventCallback] = None
+) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Blocking wrapper around book_trip_async.
+    """
+    return asyncio.run(book_trip_async(flight_details, hotel_details, on_event=on_event))
+
+
+async def execute_trip_plan(
+    plan: TripPlan,
+    pool: Optional[BrowserPool] = None,
+    on_event: Optional[EventCallback] = None
+) -> Dict[str, Any]:
+    """
+    Book every node of a trip plan, starting each one as soon as its dependencies are booked.
+    
+    Independent bookings run concurrently, so the trip takes about as long as
+    its slowest chain of dependent bookings. When a booking fails, the
+    bookings still running are cancelled and those not started are skipped.
+    Bookings already confirmed are kept.
+    
+    Args:
+        plan: Trip plan from build_trip_plan()
+        pool: Warm browser pool shared by all bookings (optional)
+        on_event: Callback receiving the step events of every booking (optional)
+        
+    Returns:
+        Dictionary with the trip "status" ("confirmed" or "failed"), the
+        booking "results" by node ID, each node's "status" and "details", and
+        "elapsed_seconds"
+    """
+    started = time.monotonic()
+    results: Dict[str, Dict[str, Any]] = {}
+    statuses = {node_id: "pending" for node_id in plan.order}
+    details: Dict[str, Dict[str, Any]] = {}
+    errors: Dict[str, str] = {}
+    running: Dict["asyncio.Future[Any]", str] = {}
+
+    def launch_ready() -> None:
+        for node in plan.ready(list(results)):
+            if statuses[node.node_id] != "pending":
+                continue
+            try:
+                details[node.node_id] = resolve_details(node, results)
+            except (KeyError, ValueError) as e:
+                statuses[node.node_id] = "failed"
+                errors[node.node_id] = f"Could not derive booking details: {e}"
+                continue
+            task = asyncio.ensure_future(BOOKERS[node.kind](details[node.node_id], pool, on_event=on_event))
+            running[task] = node.node_id
+            statuses[node.node_id] = "running"
+
+    try:
+        launch_ready()
+        while running and not errors:
+            done, _ = await asyncio.wait(list(running), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                node_id = running.pop(task)
+                result = task.result() if task.exception() is None else None
+                if result is None:
+                    statuses[node_id] = "failed"
+                    errors[node_id] = str(task.exception() or "Booking failed")
+                else:
+                    statuses[node_id] = "confirmed"
+                    results[node_id] = result
+            if not errors:
+                launch_ready()
+    finally:
+        # A failed booking (or our own cancellation) stops the rest of the trip
+        for task, node_id in running.items():
+            task.cancel()
+            statuses[node_id] = "cancelled"
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+        for node_id, status in statuses.items():
+            if status == "pending":
+                statuses[node_id] = "skipped"
+
+    return {
+        "status": "confirmed" if all(status == "confirmed" for status in statuses.values()) else "failed",
+        "results": results,
+        "nodes": {
+            node_id: {"kind": plan.nodes[node_id].kind, "status": statuses[node_id],
+                      "details": details.get(node_id, plan.nodes[node_id].details), "error": errors.get(node_id)}
+            for node_id in plan.order
+        },
+        "elapsed_seconds": time.monotonic() - started,
+    }
+
+
+async def plan_trip_async(
+    request: str,
+    pool: Optional[BrowserPool] = None,
+    on_event: Optional[EventCallback] = None,
+    dry_run: bool = False
+) -> Optional[Dict[str, Any]]:
+    """
+    Parse a whole trip with one completion, then book its flights and stays as a dependency graph.
+    
+    Args:
+        request: Natural language description of the trip, e.g. "Fly from
+            Helsinki to Riga on 28.3, stay 3 nights, then fly on to Berlin"
+        pool: Warm browser pool shared by all bookings (optional)
+        on_event: Callback receiving the step events of every booking (optional)
+        dry_run: Only build the plan, do not book anything
+        
+    Returns:
+        Dictionary with the parsed "trip", the "plan" and, unless dry_run, the
+        outcome from execute_trip_plan(); None if the request could not be parsed
+    """
+    from travel_booker.core.ai_parser import parse_trip_request_async
+
+    trip = await parse_trip_request_async(request)
+    if not trip:
+        return None
+    try:
+        plan = build_trip_plan(trip)
+    except TripPlanError as e:
+        print(f"Error planning trip: {e}")
+        return {"trip": trip, "plan": None, "status": "failed", "error": str(e)}
+
+    if not dry_run:
+        # Flexible flights and the stays after them are searched over their windows before anything is booked
+        await _choose_plan_windows(plan, pool, on_event)
+    outcome: Dict[str, Any] = {"trip": trip, "plan": plan.to_dict()}
+    if not dry_run:
+        outcome.update(await execute_trip_plan(plan, pool, on_event))
+    return outcome
+
+
+def plan_trip(
+    request: str,
+    on_event: Optional[EventCallback] = None,
+    dry_run: bool = False
+) -> Optional[Dict[str, Any]]:
+    """
+    Blocking wrapper around plan_trip_async.
+    """
+    return asyncio.run(plan_trip_async(request, on_event=on_event, dry_run=dry_run))
@@ -0,0 +1,187 @@
+"""
+Streaming batch processing of JSONL booking requests.
+
+Each input line is a JSON object such as
+    {"id": "42", "type": "flight", "request": "Book a flight from Helsinki to Riga on 28.3"}
+and produces one JSON output line as soon as its parse (and booking) finishes.
+Lines that already carry parsed "details" skip the parse stage.
+Lines are read lazily through a bounded queue, so memory use does not grow
+with the size of the input.
+"""
+import sys
+import json
+import time
+import asyncio
+from typing import Dict, Any, Optional, TextIO, Callable, Awaitable, Tuple
+
+from travel_booker.core.ai_parser import parse_flight_requests_async, parse_hotel_requests_async
+from travel_booker.browser_automation.flight_booker import book_flight_async
+from travel_booker.browser_automation.hotel_booker import book_hotel_async
+from travel_booker.browser_automation.browser_pool import BrowserPool
+from travel_booker.browser_automation.process_pool import ProcessBookingExecutor
+from travel_booker.core.store import BookingStore
+from travel_booker.core.events import EventCallback
+from travel_booker.utils.stats import LatencyHistogram
+
+DEFAULT_WORKERS = 8
+
+# Parse and book coroutines for each request type
+STAGES: Dict[str, Tuple[Callable[..., Awaitable[Any]], Callable[..., Awaitable[Any]]]] = {
+    "flight": (parse_flight_requests_async, book_flight_async),
+    "hotel": (parse_hotel_requests_async, book_hotel_async),
+}
+
+_END = object()
+
+
+def _decode_line(line: str, line_number: int, default_type: str) -> Dict[str, Any]:
+    """
+    Turn one input line into a job dictionary; plain text lines are accepted as requests.
+    """
+    stripped = line.strip()
+    if stripped.startswith("{"):
+        job = json.loads(stripped)
+    else:
+        job = {"request": stripped}
+    job.setdefault("id", str(line_number))
+    job.setdefault("type", default_type)
+    return job
+
+
+async def process_job(job: Dict[str, Any], parse_only: bool, on_event: Optional[EventCallback] = None,
+                      pool: Optional[BrowserPool] = None) -> Dict[str, Any]:
+    """
+    Run one job through the parse and book stages.
+    
+    Args:
+        job: Dictionary with "id", "type" and either "request" text or parsed "details"
+        parse_only: Stop after parsing instead of booking
+        on_event: Optional callback receiving the booking's step events
+        pool: Warm browser pool the booking borrows a context from (optional)
+        
+    Returns:
+        Output dictionary with "details", "result" and "error" keys
+    """
+    output = {"id": job["id"], "type": job["type"], "request": job.get("request"),
+              "details": None, "result": None, "error": None}
+    stages = STAGES.get(job["type"])
+    if stages is None:
+        output["error"] = f"Unknown request type: {job['type']}"
+        return output
+    parse_batch, book = stages
+    if isinstance(job.get("details"), dict):
+        output["details"] = job["details"]
+    elif job.get("request"):
+        parsed = (await parse_batch([job["request"]], 1))[0]
+        if parsed["error"] or not parsed["result"]:
+            output["error"] = parsed["error"] or "Failed to parse request"
+            return output
+        output["details"] = parsed["result"]
+    else:
+        output["error"] = "Missing request text"
+        return output
+    if parse_only:
+        return output
+
+    result = await book(output["details"], pool, on_event=on_event)
+    if result is None:
+        output["error"] = "Booking failed"
+    output["result"] = result
+    return output
+
+
+async def run_batch(
+    input_stream: TextIO,
+    output_stream: TextIO,
+    workers: int = DEFAULT_WORKERS,
+    default_type: str = "flight",
+    parse_only: bool = False,
+    store: Optional[BookingStore] = None,
+    on_event: Optional[EventCallback] = None,
+    executor: Optional[ProcessBookingExecutor] = None,
+) -> Dict[str, Any]:
+    """
+    Stream JSONL requests from input_stream through parse and book stages.
+
+    Args:
+        input_stream: Text stream with one request per line
+        output_stream: Text stream that receives one JSON result per line
+        workers: Number of requests processed concurrently
+        default_type: Request type ("flight" or "hotel") for lines without one
+        parse_only: Stop after parsing instead of booking
+        store: Optional booking store that successful bookings are saved to
+        on_event: Optional callback receiving the step events of every booking
+        executor: Started process executor to run the jobs on instead of this
+            process (workers then bounds the jobs submitted at once)
+
+    Returns:
+        Summary with counts, throughput and latency percentiles
+    """
+    loop = asyncio.get_running_loop()
+    workers = max(1, workers)
+    queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=workers * 2)
+    latencies = LatencyHistogram()
+    counters = {"completed": 0, "failed": 0}
+
+    async def read_lines() -> None:
+        line_number = 0
+        while True:
+            # Read in a thread so a slow stdin producer does not stall the workers
+            line = await loop.run_in_executor(None, input_stream.readline)
+            if not line:
+                break
+            line_number += 1
+            if line.strip():
+                await queue.put((line_number, line))
+        for _ in range(workers):
+            await queue.put(_END)
+
+    async def work() -> None:
+        while True:
+            item = await queue.get()
+            if item is _END:
+                return
+            line_number, line = item
+            started = time.perf_counter()
+            try:
+                job = _decode_line(line, line_number, default_type)
+                if executor is not None:
+                    output = await executor.submit(job, parse_only, on_event)
+                else:
+                    output = await process_job(job, parse_only, on_event)
+            except Exception as e:
+                output = {"id": str(line_number), "error": f"{type(e).__name__}: {e}"}
+            elapsed = time.perf_counter() - started
+            output["latency_seconds"] = round(elapsed, 6)
+            latencies.record(elapsed)
+            if store is not None and output.get("result"):
+                store.save(output["result"])
+
+            output_stream.write(json.dumps(output, ensure_ascii=False) + "\n")
+            output_stream.flush()
+            counters["completed"] += 1
+            if output.get("error"):
+                counters["failed"] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(read_lines(), *(work() for _ in range(workers)))
+    elapsed = time.perf_counter() - started
+
+    summary = latencies.summary()
+    return {
+        "completed": counters["completed"],
+        "failed": counters["failed"],
+        "elapsed_seconds": elapsed,
+        "throughput_per_second": counters["completed"] / elapsed if elapsed else 0.0,
+        "p50_seconds": summary["p50"],
+        "p95_seconds": summary["p95"],
+    }
+
+
+def open_streams(input_path: str, output_path: str) -> Tuple[TextIO, TextIO]:
+    """
+    Open the batch input and output, treating "-" as stdin / stdout.
+    """
+    input_stream = sys.stdin if input_path == "-" else open(input_path, encoding="utf-8")
+    output_stream = sys.stdout if output_path == "-" else open(output_path, "w", encoding="utf-8")
+    return input_stream, output_stream
@@ -0,0 +1,403 @@
+"""
+Long-running HTTP service for parsing and booking requests.
+
+One process keeps the imports, the OpenAI client (and its pooled keep-alive
+connections) and a warm browser pool alive across requests; with a process
+executor, bookings run on worker processes with browser pools of their own:
+
+    POST /parse    {"type": "flight", "request": "..."}          -> {"details": {...}}
+    POST /book     {"type": "hotel", "request": "..."}           -> {"details": {...}, "result": {...}}
+                   {"type": "hotel", "details": {...}}           (already parsed)
+    GET  /status   Queue depth, counters, latency, pool, parse-call and search-cache statistics
+    GET  /healthz  200 while serving, 503 while shutting down
+    GET  /metrics  Prometheus export (when telemetry is enabled)
+
+Work goes through a bounded queue served by a fixed number of workers. When
+the queue is full, requests are rejected immediately with 429 and a
+Retry-After header instead of piling up. On SIGINT/SIGTERM the service stops
+accepting work (503), lets queued and running jobs finish within a grace
+period, then closes the browser pool, the booking store and the OpenAI client.
+"""
+import sys
+import json
+import time
+import signal
+import asyncio
+from typing import Dict, Any, Optional, Tuple, Set
+
+from travel_booker.cli.batch import process_job
+from travel_booker.browser_automation.browser_pool import BrowserPool
+from travel_booker.browser_automation.process_pool import ProcessBookingExecutor
+from travel_booker.core.store import BookingStore
+from travel_booker.core.telemetry import get_telemetry
+from travel_booker.utils.stats import LatencyHistogram
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_WORKERS = 8
+DEFAULT_QUEUE_SIZE = 64
+DEFAULT_TIMEOUT_SECONDS = 120.0
+DEFAULT_GRACE_SECONDS = 30.0
+MAX_BODY_BYTES = 1024 * 1024
+
+_REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+    422: "Unprocessable Entity", 429: "Too Many Requests", 500: "Internal Server Error", 502: "Bad Gateway",
+    503: "Service Unavailable", 504: "Gateway Timeout",
+}
+
+Response = Tuple[int, Dict[str, Any], Dict[str, str]]
+
+
+class BookingService:
+    """
+    asyncio HTTP service running parse and book jobs through a bounded queue.
+    """
+
+    def __init__(
+        self,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        workers: int = DEFAULT_WORKERS,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        pool: Optional[BrowserPool] = None,
+        store: Optional[BookingStore] = None,
+        timeout_seconds: float = DEFAULT_TIMEOUT_SECONDS,
+        grace_seconds: float = DEFAULT_GRACE_SECONDS,
+        executor: Optional[ProcessBookingExecutor] = None,
+    ):
+        """
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            workers: Number of jobs processed concurrently
+            queue_size: Jobs that may wait for a worker before new ones get 429
+            pool: Warm browser pool the bookings borrow contexts from (optional)
+            store: Booking store that successful bookings are saved to (optional)
+            timeout_seconds: How long a request waits for its job before getting 504
+            grace_seconds: How long shutdown waits for queued and running jobs
+            executor: Process executor that runs the bookings instead of this process (optional)
+        """
+        self.host = host
+        self.port = port
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.pool = pool
+        self.store = store
+        self.timeout_seconds = timeout_seconds
+        self.grace_seconds = grace_seconds
+        self.executor = executor
+
+        # Created in start() so the service can be constructed outside an event loop
+        self._queue: Optional["asyncio.Queue[Any]"] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._stopped: Optional[asyncio.Event] = None
+        self._workers: Set["asyncio.Task[None]"] = set()
+        self._connections: Set[asyncio.StreamWriter] = set()
+        self._draining = False
+        self._started_at = 0.0
+        # Requests read but not yet answered, so shutdown can let their responses go out
+        self._open_requests = 0
+
+        self.in_flight = 0
+        self.counters = {"accepted": 0, "rejected": 0, "completed": 0, "failed": 0, "timed_out": 0}
+        self.latencies = LatencyHistogram()
+
+    async def start(self) -> None:
+        """
+        Warm up the browser pool and the OpenAI client, start the workers and bind the port.
+        """
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._stopped = asyncio.Event()
+        if self.pool is not None:
+            await self.pool.start()
+        if self.executor is not None:
+            await self.executor.start()
+        _warm_openai_client()
+        for _ in range(self.workers):
+            task = asyncio.ensure_future(self._work())
+            self._workers.add(task)
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, backlog=1024)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._started_at = time.monotonic()
+
+    def stop(self) -> None:
+        """
+        Ask the service to shut down; serve_forever() then drains and returns.
+        """
+        if self._stopped is not None:
+            self._stopped.set()
+
+    async def serve_forever(self) -> None:
+        """
+        Serve until stop() is called (or SIGINT/SIGTERM), then shut down gracefully.
+        """
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, self.stop)
+            except (NotImplementedError, RuntimeError):
+                # Not supported on Windows event loops; Ctrl+C raises KeyboardInterrupt instead
+                pass
+        try:
+            await self._stopped.wait()
+        finally:
+            await self.shutdown()
+
+    async def shutdown(self) -> None:
+        """
+        Stop accepting work, finish queued and running jobs within the grace period, then close everything.
+        """
+        if self._draining:
+            return
+        self._draining = True
+        if self._server is not None:
+            self._server.close()
+
+        deadline = time.monotonic() + self.grace_seconds
+        await self._wait_idle(deadline)
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        # Requests still waiting in the queue past the grace period get a 503
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Service is shutting down"))
+        await self._wait_idle(time.monotonic() + 1.0)
+
+        # Only idle keep-alive connections are left
+        for writer in list(self._connections):
+            writer.close()
+        if self.pool is not None:
+            await self.pool.close(timeout=max(0.0, deadline - time.monotonic()))
+        if self.executor is not None:
+            await self.executor.close(timeout=max(0.0, deadline - time.monotonic()))
+        if self.store is not None:
+            self.store.flush(timeout=5.0)
+        await _close_openai_client()
+
+    async def _wait_idle(self, deadline: float) -> None:
+        while (self._open_requests or not self._queue.empty() or self.in_flight) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+    async def _work(self) -> None:
+        while True:
+            job, future = await self._queue.get()
+            if future.cancelled():
+                continue
+            self.in_flight += 1
+            started = time.perf_counter()
+            try:
+                if self.executor is not None and job["action"] == "book":
+                    output = await self.executor.submit(job)
+                else:
+                    output = await process_job(job, parse_only=job["action"] == "parse", pool=self.pool)
+                if self.store is not None and output.get("result"):
+                    self.store.save(output["result"])
+            except asyncio.CancelledError:
+                # Shutdown ran out of grace time while this job was running
+                if not future.done():
+                    future.set_exception(RuntimeError("Service is shutting down"))
+                raise
+            except Exception as e:
+                output = {"id": job.get("id"), "error": f"{type(e).__name__}: {e}"}
+            finally:
+                self.in_flight -= 1
+            elapsed = time.perf_counter() - started
+            output["latency_seconds"] = round(elapsed, 6)
+            self.latencies.record(elapsed)
+            self.counters["completed"] += 1
+            if output.get("error"):
+                self.counters["failed"] += 1
+            if not future.done():
+                future.set_result(output)
+
+    async def submit(self, job: Dict[str, Any]) -> Response:
+        """
+        Queue a job and wait for its output.
+
+        Returns:
+            HTTP status, JSON body and extra headers
+        """
+        if self._draining:
+            return 503, {"error": "Service is shutting down"}, {}
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((job, future))
+        except asyncio.QueueFull:
+            self.counters["rejected"] += 1
+            return 429, {"error": "Too many requests in progress, retry later"}, {"Retry-After": str(self._retry_after())}
+        self.counters["accepted"] += 1
+
+        try:
+            # The job keeps running if the client stops waiting; its result still reaches the store
+            output = await asyncio.wait_for(asyncio.shield(future), self.timeout_seconds)
+        except asyncio.TimeoutError:
+            self.counters["timed_out"] += 1
+            return 504, {"error": f"No result within {self.timeout_seconds:.0f}s"}, {}
+        except RuntimeError as e:
+            return 503, {"error": str(e)}, {}
+        if not output.get("error"):
+            return 200, output, {}
+        # Requests that could not be parsed are the client's problem; failed bookings are the site's
+        return (502 if output.get("details") else 422), output, {}
+
+    def _retry_after(self) -> int:
+        """
+        Estimate in whole seconds how long it takes the workers to get through the current queue.
+        """
+        typical = self.latencies.percentile(50) if self.latencies.count else 1.0
+        return max(1, round(typical * self._queue.qsize() / self.workers))
+
+    def get_status(self) -> Dict[str, Any]:
+        """
+        Return queue, counter, latency, browser pool, parse-call and search-cache statistics.
+        """
+        from travel_booker.core.ai_parser import parse_latency_stats, parse_usage_stats
+        from travel_booker.core.search_cache import search_cache_stats
+
+        latency = self.latencies.summary()
+        return {
+            "status": "draining" if self._draining else "ok",
+            "uptime_seconds": round(time.monotonic() - self._started_at, 3),
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queue": {"depth": self._queue.qsize(), "capacity": self.queue_size},
+            "counters": dict(self.counters),
+            "latency": {"p50_seconds": latency["p50"], "p95_seconds": latency["p95"],
+                        "p99_seconds": latency["p99"]},
+            "browser_pool": self.pool.get_stats() if self.pool is not None else None,
+            "executor": self.executor.get_stats() if self.executor is not None else None,
+            "parse_calls": parse_latency_stats(),
+            "parse_usage": parse_usage_stats(),
+            "search_cache": search_cache_stats(),
+        }
+
+    async def _dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, Any, Dict[str, str]]:
+        path = path.split("?")[0].rstrip("/") or "/"
+        if path in ("/parse", "/book"):
+            if method != "POST":
+                return 405, {"error": "Use POST"}, {"Allow": "POST"}
+            try:
+                job = json.loads(body or b"{}")
+            except ValueError as e:
+                return 400, {"error": f"Invalid JSON: {e}"}, {}
+            if not isinstance(job, dict):
+                return 400, {"error": "Expected a JSON object"}, {}
+            job.setdefault("id", None)
+            job.setdefault("type", "flight")
+            job["action"] = path[1:]
+            return await self.submit(job)
+        if method != "GET":
+            return 405, {"error": "Use GET"}, {"Allow": "GET"}
+        if path == "/status":
+            return 200, self.get_status(), {}
+        if path == "/healthz":
+            return (503, {"status": "draining"}, {}) if self._draining else (200, {"status": "ok"}, {})
+        if path == "/metrics" and get_telemetry().enabled:
+            return 200, get_telemetry().prometheus(), {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+        return 404, {"error": f"Unknown path: {path}"}, {}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Serve HTTP/1.1 requests on one keep-alive connection.
+        """
+        self._connections.add(writer)
+        try:
+            while not self._draining:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode("latin-1").split()
+                if len(parts) != 3:
+                    await _write_response(writer, 400, {"error": "Malformed request line"}, {}, close=True)
+                    break
+                method, path, _ = parts
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await _write_response(writer, 400, {"error": "Invalid Content-Length"}, {}, close=True)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await _write_response(writer, 413, {"error": "Request body too large"}, {}, close=True)
+                    break
+                body = await reader.readexactly(length)
+                self._open_requests += 1
+                try:
+                    try:
+                        status, payload, extra = await self._dispatch(method.upper(), path, body)
+                    except Exception as e:
+                        print(f"Error handling {method} {path}: {e}", file=sys.stderr)
+                        status, payload, extra = 500, {"error": str(e)}, {}
+
+                    close = headers.get("connection", "").lower() == "close" or self._draining
+                    await _write_response(writer, status, payload, extra, close)
+                finally:
+                    self._open_requests -= 1
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+
+async def _write_response(writer: asyncio.StreamWriter, status: int, payload: Any,
+                          extra_headers: Dict[str, str], close: bool = False) -> None:
+    if isinstance(payload, str):
+        body = payload.encode("utf-8")
+    else:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    headers = {"Content-Type": "application/json", "Content-Length": str(len(body))}
+    headers.update(extra_headers)
+    if close:
+        headers["Connection"] = "close"
+    head = f"HTTP/1.1 {status} {_REASONS.get(status, 'Unknown')}\r\n"
+    head += "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+    writer.write(head.encode("latin-1") + b"\r\n" + body)
+    await writer.drain()
+
+
+def _warm_openai_client() -> None:
+    """
+    Create the shared async OpenAI client up front so every request reuses its connection pool.
+    """
+    from travel_booker.core.ai_parser import get_async_client, use_mock_data
+
+    if use_mock_data():
+        return
+    try:
+        get_async_client()
+    except Exception as e:
+        print(f"Error initializing OpenAI client: {e}", file=sys.stderr)
+
+
+async def _close_openai_client() -> None:
+    from travel_booker.core.ai_parser import close_async_client
+
+    try:
+        await close_async_client()
+    except Exception as e:
+        print(f"Error closing OpenAI client: {e}", file=sys.stderr)
+
+
+async def run_service(service: BookingService) -> None:
+    """
+    Start the service, print where it listens and serve until it is stopped.
+    """
+    await service.start()
+    print(f"Serving on http://{service.host}:{service.port} "
+          f"({service.workers} workers, queue of {service.queue_size}); Ctrl+C to stop", file=sys.stderr)
+    await service.serve_forever()
@@ -3,101 +3,583 @@ AI parser for interpreting natural language booking requests.
 """
 import os
 import json
-import sys
-from typing import Dict, Any, Optional
-import openai
-from dotenv import load_dotenv
+import asyncio
+from typing import Dict, Any, Optional, List, Callable, Tuple, Awaitable
+from travel_booker.core.parse_cache import get_parse_cache, make_key
+from travel_booker.core.coalesce import get_parse_coalescer
+from travel_booker.core.hedging import (
+    HedgedCaller, CircuitBreaker, DEFAULT_DEADLINE_SECONDS, DEFAULT_RETRIES,
+    DEFAULT_HEDGE_PERCENTILE, DEFAULT_BREAKER_FAILURES, DEFAULT_BREAKER_RESET_SECONDS,
+)
+from travel_booker.core.fast_parser import fast_parse_flight, fast_parse_hotel, extract_date_flex, extract_nights_flex
+from travel_booker.core.telemetry import get_telemetry
+from travel_booker.core.usage import get_usage_ledger
+from travel_booker.core.gazetteer import canonicalize_details, get_gazetteer
 
-# Reload environment variables to ensure we have the latest
-load_dotenv(override=True)
+# API keys that switch the parser to mock data (no API calls)
+MOCK_API_KEYS = ("sk-mock-testing-key", "sk-your-actual-api-key-here")
 
-# Get OpenAI API key from environment
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Local fast-path results at or above this confidence skip the OpenAI call
+DEFAULT_FAST_PATH_MIN_CONFIDENCE = 0.8
 
-# Flag to use mock data for testing
-USE_MOCK_DATA = OPENAI_API_KEY == "sk-mock-testing-key" or OPENAI_API_KEY == "sk-your-actual-api-key-here"
+# The environment and the OpenAI clients are loaded on first use so that
+# importing this module (and e.g. `--help`) stays cheap.
+_settings: Optional[Dict[str, Any]] = None
+_client = None
+_async_client = None
+# Event loop the async client's connection pool belongs to (None until it is first used in one)
+_async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_caller: Optional[HedgedCaller] = None
 
-if USE_MOCK_DATA:
-    print("Using mock data for parsing requests (no API calls)")
-else:
+
+class ParserConfigurationError(RuntimeError):
+    """
+    Raised when the OpenAI client cannot be configured.
+    """
+
+
+class ParseRefusedError(RuntimeError):
+    """
+    Raised when the model refuses to answer a parse request.
+    """
+
+
+def _get_settings() -> Dict[str, Any]:
+    """
+    Load environment variables once and derive the parser settings.
+    """
+    global _settings
+    if _settings is None:
+        from dotenv import load_dotenv
+
+        # Reload environment variables to ensure we have the latest
+        load_dotenv(override=True)
+        api_key = os.getenv("OPENAI_API_KEY")
+        use_mock = api_key in MOCK_API_KEYS
+        if use_mock:
+            print("Using mock data for parsing requests (no API calls)")
+        default_model = os.getenv("TRAVEL_BOOKER_PARSER_MODEL") or DEFAULT_PARSER_MODEL
+        _settings = {
+            "api_key": api_key,
+            "use_mock_data": use_mock,
+            "models": {
+                kind: os.getenv(f"TRAVEL_BOOKER_{kind.upper()}_MODEL") or default_model
+                for kind in ("flight", "hotel", "trip")
+            },
+            # Set TRAVEL_BOOKER_STRUCTURED_OUTPUT=0 for models or endpoints without JSON-schema output
+            "structured_output": os.getenv("TRAVEL_BOOKER_STRUCTURED_OUTPUT", "1") != "0",
+            "fast_path_min_confidence": float(
+                os.getenv("TRAVEL_BOOKER_FAST_PARSE_MIN_CONFIDENCE", DEFAULT_FAST_PATH_MIN_CONFIDENCE)
+            ),
+        }
+    return _settings
+
+
+def use_mock_data() -> bool:
+    """
+    Return True when requests are parsed with mock data instead of OpenAI.
+    """
+    return _get_settings()["use_mock_data"]
+
+
+def _fast_path(fast_parser: Callable[[str], Dict[str, Any]], request: str) -> Optional[Dict[str, Any]]:
+    """
+    Return the local parse of a request if it is confident enough, otherwise None.
+    """
+    parsed = fast_parser(request)
+    if parsed["confidence"] >= _get_settings()["fast_path_min_confidence"]:
+        return parsed["details"]
+    return None
+
+
+def _api_key() -> str:
+    api_key = _get_settings()["api_key"]
     # Check if API key is valid
-    if not OPENAI_API_KEY:
-        print("Error: Please set a valid OPENAI_API_KEY in your .env file")
-        print("You can get an API key from https://platform.openai.com/account/api-keys")
-        print("Or use 'sk-mock-testing-key' for testing with mock data")
-        sys.exit(1)
+    if not api_key:
+        raise ParserConfigurationError(
+            "Please set a valid OPENAI_API_KEY in your .env file. "
+            "You can get an API key from https://platform.openai.com/account/api-keys "
+            "or use 'sk-mock-testing-key' for testing with mock data"
+        )
+    return api_key
+
+
+def get_client():
+    """
+    Return the shared OpenAI client, creating it on first use.
+    """
+    global _client
+    if _client is None:
+        import openai
+
+        try:
+            # Retries are handled by the hedged caller, under one deadline
+            _client = openai.OpenAI(api_key=_api_key(), max_retries=0)
+        except ParserConfigurationError:
+            raise
+        except Exception as e:
+            raise ParserConfigurationError(f"Error initializing OpenAI client: {e}") from e
+    return _client
 
-    # Initialize OpenAI client
+
+def get_async_client():
+    """
+    Return the shared async OpenAI client of the running event loop, creating it on first use.
+
+    Its pooled connections only work in the loop that opened them, so a client
+    last used in another loop (e.g. one finished by asyncio.run) is replaced.
+    """
+    global _async_client, _async_client_loop
     try:
-        client = openai.OpenAI(api_key=OPENAI_API_KEY)
-    except Exception as e:
-        print(f"Error initializing OpenAI client: {e}")
-        sys.exit(1)
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    if _async_client is not None and loop is not None:
+        if _async_client_loop is None:
+            _async_client_loop = loop
+        elif _async_client_loop is not loop:
+            _async_client = None
+    if _async_client is None:
+        _async_client_loop = loop
+        import openai
 
-def parse_flight_request(request: str) -> Optional[Dict[str, Any]]:
+        try:
+            _async_client = openai.AsyncOpenAI(api_key=_api_key(), max_retries=0)
+        except ParserConfigurationError:
+            raise
+        except Exception as e:
+            raise ParserConfigurationError(f"Error initializing OpenAI client: {e}") from e
+    return _async_client
+
+
+async def close_async_client() -> None:
     """
-    Parse a natural language flight booking request into structured data.
+    Close the shared async OpenAI client and its pooled connections; it is recreated on next use.
+    """
+    global _async_client, _async_client_loop
+    if _async_client is not None:
+        client, _async_client, _async_client_loop = _async_client, None, None
+        await client.close()
+
+
+async def _closing_async_client(batch: Awaitable[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    # Blocking wrappers run one event loop per call; its connections close with it
+    try:
+        return await batch
+    finally:
+        await close_async_client()
+
+def get_parse_caller() -> HedgedCaller:
+    """
+    Return the shared latency-budgeted caller for OpenAI parse calls.
+
+    Deadline, retries, hedge percentile and circuit breaker are configured with
+    the TRAVEL_BOOKER_PARSE_* environment variables (see .env.example).
+    """
+    global _caller
+    if _caller is None:
+        _get_settings()
+        _caller = HedgedCaller(
+            deadline_seconds=float(os.getenv("TRAVEL_BOOKER_PARSE_DEADLINE", DEFAULT_DEADLINE_SECONDS)),
+            retries=int(os.getenv("TRAVEL_BOOKER_PARSE_RETRIES", DEFAULT_RETRIES)),
+            hedge_percentile=float(os.getenv("TRAVEL_BOOKER_PARSE_HEDGE_PERCENTILE", DEFAULT_HEDGE_PERCENTILE)),
+            breaker=CircuitBreaker(
+                int(os.getenv("TRAVEL_BOOKER_PARSE_BREAKER_FAILURES", DEFAULT_BREAKER_FAILURES)),
+                float(os.getenv("TRAVEL_BOOKER_PARSE_BREAKER_RESET", DEFAULT_BREAKER_RESET_SECONDS)),
+            ),
+            give_up_on=(ParserConfigurationError, ParseRefusedError),
+        )
+    return _caller
+
+
+def parse_latency_stats() -> Dict[str, Any]:
+    """
+    Return p50/p99 latency, hedge, retry and circuit breaker statistics of OpenAI parse calls.
+    """
+    return get_parse_caller().get_stats()
+
+
+def _local_fallback(fast_parser: Callable[[str], Dict[str, Any]], request: str) -> Optional[Dict[str, Any]]:
+    """
+    Return the local parse of a request when OpenAI is unavailable, if it found every required field.
+    """
+    parsed = fast_parser(request)
+    if parsed["confidence"] <= 0:
+        return None
+    print("Falling back to the local parser")
+    return parsed["details"]
+
+
+# Default model for parsing requests; override per type with TRAVEL_BOOKER_{FLIGHT,HOTEL,TRIP}_MODEL
+DEFAULT_PARSER_MODEL = "gpt-4o-mini"
+
+# Maximum number of concurrent OpenAI calls for batch parsing
+DEFAULT_BATCH_CONCURRENCY = 16
+
+# The field descriptions live in the response schemas, so the prompts only carry the rules
+FLIGHT_SYSTEM_PROMPT = (
+    "Extract the flight booking. Dates as YYYY-MM-DD. num_children is 0 if not given. "
+    "date_flex_days is 0 for an exact date and 2 for an approximate one (\"around 28.3\") unless a window is given."
+)
+
+HOTEL_SYSTEM_PROMPT = (
+    "Extract the hotel booking. Dates as YYYY-MM-DD. num_children is 0 and room_type is \"standard\" if not given. "
+    "nights_flex is 0 for an exact stay and 1 for an approximate length (\"about 3 nights\") unless a window is given."
+)
+
+TRIP_SYSTEM_PROMPT = (
+    "Extract every flight leg and hotel stay of the trip, in travel order. Dates as YYYY-MM-DD; "
+    "use null for dates and nights that are not stated, never infer them from other legs or stays. "
+    "num_children is 0 and room_type is \"standard\" if not given. date_flex_days and nights_flex are 0 unless "
+    "a date or stay length is approximate (2 days for \"around 28.3\", 1 night for \"about 3 nights\")."
+)
+
+_DATE = {"type": ["string", "null"], "description": "YYYY-MM-DD"}
+_TRAVELERS = {
+    "num_adults": {"type": "integer"},
+    "num_children": {"type": "integer"},
+}
+
+
+def _object_schema(properties: Dict[str, Any]) -> Dict[str, Any]:
+    # Strict structured output needs every property listed as required
+    return {"type": "object", "properties": properties, "required": list(properties), "additionalProperties": False}
+
+
+_FLIGHT_FIELDS = {
+    "origin": {"type": "string", "description": "Departure city or airport"},
+    "destination": {"type": "string", "description": "Arrival city or airport"},
+    "date": _DATE,
+    **_TRAVELERS,
+    "date_flex_days": {"type": "integer", "description": "Days either side of the date the traveller accepts"},
+}
+
+_HOTEL_FIELDS = {
+    "location": {"type": "string", "description": "City of the hotel"},
+    "check_in_date": _DATE,
+    "check_out_date": _DATE,
+    **_TRAVELERS,
+    "room_type": {"type": "string"},
+    "nights_flex": {"type": "integer", "description": "Nights shorter or longer the stay may be"},
+}
+
+FLIGHT_SCHEMA = _object_schema(_FLIGHT_FIELDS)
+HOTEL_SCHEMA = _object_schema(_HOTEL_FIELDS)
+TRIP_SCHEMA = _object_schema({
+    "legs": {"type": "array", "items": _object_schema(_FLIGHT_FIELDS)},
+    "stays": {"type": "array", "items": _object_schema({**_HOTEL_FIELDS, "nights": {"type": ["integer", "null"]}})},
+})
+
+# Prompt, response schema name and schema of each request type
+PARSE_SPECS: Dict[str, Tuple[str, str, Dict[str, Any]]] = {
+    "flight": (FLIGHT_SYSTEM_PROMPT, "flight_booking", FLIGHT_SCHEMA),
+    "hotel": (HOTEL_SYSTEM_PROMPT, "hotel_booking", HOTEL_SCHEMA),
+    "trip": (TRIP_SYSTEM_PROMPT, "trip", TRIP_SCHEMA),
+}
+
+
+def parser_model(kind: str) -> str:
+    """
+    Return the model used to parse requests of a type ("flight", "hotel" or "trip").
+    """
+    return _get_settings()["models"][kind]
+
+
+def _system_prompt(kind: str) -> str:
+    prompt, _, schema = PARSE_SPECS[kind]
+    if _get_settings()["structured_output"]:
+        return prompt
+    # JSON mode needs the word "JSON" in the prompt and has no schema to name the fields
+    return f"{prompt} Reply with a JSON object with the keys {', '.join(schema['properties'])}."
+
+
+def _response_format(kind: str) -> Dict[str, Any]:
+    _, name, schema = PARSE_SPECS[kind]
+    if _get_settings()["structured_output"]:
+        return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": schema}}
+    return {"type": "json_object"}
+
+
+def _cache_key(kind: str, request: str) -> str:
+    # Results follow the response schema, so a schema change must miss old entries
+    return make_key(request, parser_model(kind), _system_prompt(kind), _response_format(kind))
+
+
+def _complete_json(kind: str, request: str) -> Dict[str, Any]:
+    """
+    Extract structured data from a request, serving repeats from the parse cache.
+    Concurrent identical requests share one OpenAI call, which runs under the
+    deadline, hedging and retry policy of get_parse_caller().
     
     Args:
+        kind: Request type, selecting the prompt, response schema and model
         request: Natural language request string
         
     Returns:
-        Dictionary with structured booking data or None if parsing failed
+        Dictionary parsed from the model's JSON response
     """
-    if USE_MOCK_DATA:
-        # Mock implementation for testing
-        print(f"Mock parsing flight request: '{request}'")
-        # Simple parsing based on keywords
-        origin = "Helsinki"
-        destination = "New York"
-        date = "2023-07-01"
-        num_adults = 2
-        num_children = 0
-        
-        if "Helsinki to Riika" in request or "Helsinki to Riga" in request:
-            destination = "Riga"
-        
-        if "28.3" in request:
-            date = "2023-03-28"
-        
-        return {
-            "origin": origin,
-            "destination": destination,
-            "date": date,
-            "num_adults": num_adults,
-            "num_children": num_children
-        }
-    
-    try:
-        # Define the system prompt
-        system_prompt = """
-        You are a flight booking assistant. Extract the following information from the user's request:
-        - origin: The departure city/airport
-        - destination: The arrival city/airport
-        - date: The departure date in YYYY-MM-DD format
-        - num_adults: The number of adult travelers
-        - num_children: The number of child travelers (0 if not specified)
-        
-        Return the information as a JSON object with these fields.
-        """
-        
+    cache = get_parse_cache()
+    key = _cache_key(kind, request)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    def attempt(timeout: float) -> Dict[str, Any]:
         # Call OpenAI API to extract information
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": request}
-            ],
-            response_format={"type": "json_object"}
-        )
-        
-        # Parse the response
-        content = response.choices[0].message.content
-        return json.loads(content)
+        with get_telemetry().span("openai_call", site="openai", kind=kind):
+            response = get_client().chat.completions.create(timeout=timeout, **_completion_args(kind, request))
+        return _read_response(kind, response)
+
+    def fetch() -> Dict[str, Any]:
+        result = get_parse_caller().call(attempt)
+        cache.set(key, result)
+        return result
+
+    return get_parse_coalescer().call(key, fetch)
+
+
+async def _complete_json_async(kind: str, request: str) -> Dict[str, Any]:
+    """
+    Async counterpart of _complete_json using the async OpenAI client.
+    """
+    cache = get_parse_cache()
+    key = _cache_key(kind, request)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    async def attempt(timeout: float) -> Dict[str, Any]:
+        with get_telemetry().span("openai_call", site="openai", kind=kind):
+            response = await get_async_client().chat.completions.create(timeout=timeout, **_completion_args(kind, request))
+        return _read_response(kind, response)
+
+    async def fetch() -> Dict[str, Any]:
+        result = await get_parse_caller().call_async(attempt)
+        cache.set(key, result)
+        return result
+
+    return await get_parse_coalescer().call_async(key, fetch)
+
+
+def _read_response(kind: str, response: Any) -> Dict[str, Any]:
+    """
+    Account for the tokens of a parse response and decode its JSON content.
+    """
+    _record_usage(kind, response)
+    message = response.choices[0].message
+    refusal = getattr(message, "refusal", None)
+    if refusal:
+        raise ParseRefusedError(f"The model declined to parse the request: {refusal}")
+    return json.loads(message.content)
+
+
+def _record_usage(kind: str, response: Any) -> None:
+    """
+    Count the tokens and cost of an OpenAI response in the usage ledger and the telemetry.
+    """
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    prompt_tokens, completion_tokens = usage.prompt_tokens or 0, usage.completion_tokens or 0
+    cost = get_usage_ledger().record(kind, parser_model(kind), prompt_tokens, completion_tokens)
+    telemetry = get_telemetry()
+    if telemetry.enabled:
+        telemetry.record_tokens("parse", "openai", prompt_tokens, completion_tokens, cost or 0.0)
+
+
+def parse_usage_stats() -> Dict[str, Any]:
+    """
+    Return the tokens and USD cost of OpenAI parse calls so far, in total and per request type and model.
+    """
+    return get_usage_ledger().get_stats()
+
+
+def _completion_args(kind: str, request: str) -> Dict[str, Any]:
+    """
+    Build the chat completion arguments for a parse call.
+    """
+    return {
+        "model": parser_model(kind),
+        "messages": [
+            {"role": "system", "content": _system_prompt(kind)},
+            {"role": "user", "content": request}
+        ],
+        "response_format": _response_format(kind),
+    }
+
+
+def _mock_flight_details(request: str) -> Dict[str, Any]:
+    """
+    Mock flight parsing used when no real API key is configured.
+    """
+    print(f"Mock parsing flight request: '{request}'")
+    # Simple parsing based on keywords
+    origin = "Helsinki"
+    destination = "New York"
+    date = "2023-07-01"
+    num_adults = 2
+    num_children = 0
+    
+    # Any spelling of a known city ("Riika", "RIX", ...) counts; "from" and "to" decide the direction
+    route = fast_parse_flight(request)["details"]
+    places = get_gazetteer().find_in_text(request)
+    if route["origin"] and route["destination"]:
+        origin, destination = route["origin"], route["destination"]
+    elif len(places) >= 2:
+        origin, destination = places[0].name, places[1].name
+    elif places and places[0].name != origin:
+        destination = places[0].name
+    
+    if "28.3" in request:
+        date = "2023-03-28"
     
-    except Exception as e:
-        print(f"Error parsing flight request: {e}")
+    return {
+        "origin": origin,
+        "destination": destination,
+        "date": date,
+        "num_adults": num_adults,
+        "num_children": num_children,
+        "date_flex_days": extract_date_flex(request)
+    }
+
+
+def _mock_hotel_details(request: str) -> Dict[str, Any]:
+    """
+    Mock hotel parsing used when no real API key is configured.
+    """
+    print(f"Mock parsing hotel request: '{request}'")
+    # Simple parsing based on keywords
+    location = "New York"
+    check_in_date = "2023-07-01"
+    check_out_date = "2023-07-05"
+    num_adults = 2
+    num_children = 0
+    room_type = "standard"
+    
+    return {
+        "location": location,
+        "check_in_date": check_in_date,
+        "check_out_date": check_out_date,
+        "num_adults": num_adults,
+        "num_children": num_children,
+        "room_type": room_type,
+        "nights_flex": extract_nights_flex(request)
+    }
+
+
+def _mock_trip_details(request: str) -> Dict[str, Any]:
+    """
+    Mock trip parsing used when no real API key is configured: one flight and a stay at its destination.
+    """
+    leg = _mock_flight_details(request)
+    return {"legs": [leg], "stays": [{"location": leg["destination"], "nights": 3, "room_type": "standard",
+                                   "nights_flex": extract_nights_flex(request)}]}
+
+
+def _trip_from_json(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Keep only the legs and stays of a trip completion, dropping malformed entries.
+    """
+    return {
+        key: [canonicalize_details(entry) for entry in data.get(key) or [] if isinstance(entry, dict)]
+        for key in ("legs", "stays")
+    }
+
+
+def _local_trip_fallback(request: str) -> Optional[Dict[str, Any]]:
+    """
+    Build a one-flight, one-stay trip from the local parsers when OpenAI is unavailable.
+    """
+    flight = _local_fallback(fast_parse_flight, request)
+    hotel = _local_fallback(fast_parse_hotel, request)
+    if flight is None and hotel is None:
         return None
+    return _trip_from_json({"legs": [flight], "stays": [hotel]})
+
+
+def parse_trip_request(request: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse every flight leg and hotel stay of a trip with a single completion.
+    
+    Args:
+        request: Natural language description of the whole trip
+        
+    Returns:
+        Dictionary with "legs" (flight details) and "stays" (hotel details,
+        possibly without dates) or None if parsing failed
+    """
+    with get_telemetry().span("parse", site="openai", kind="trip") as span:
+        if use_mock_data():
+            span.site = "mock"
+            return _mock_trip_details(request)
+        try:
+            return _trip_from_json(_complete_json("trip", request))
+        except Exception as e:
+            print(f"Error parsing trip request: {e}")
+            span.error = True
+            return _local_trip_fallback(request)
+
+
+async def parse_trip_request_async(request: str) -> Optional[Dict[str, Any]]:
+    """
+    Async counterpart of parse_trip_request using the async OpenAI client.
+    """
+    with get_telemetry().span("parse", site="openai", kind="trip") as span:
+        if use_mock_data():
+            span.site = "mock"
+            return _mock_trip_details(request)
+        try:
+            return _trip_from_json(await _complete_json_async("trip", request))
+        except Exception as e:
+            print(f"Error parsing trip request: {e}")
+            span.error = True
+            return _local_trip_fallback(request)
+
+
+def _parse_request(
+    kind: str,
+    request: str,
+    fast_parser: Callable[[str], Dict[str, Any]],
+    mock_parser: Callable[[str], Dict[str, Any]],
+) -> Optional[Dict[str, Any]]:
+    """
+    Parse one request with the fast path, the mock parser or OpenAI, in that order.
+    """
+    with get_telemetry().span("parse", site="fast_path", kind=kind) as span:
+        # Common requests are handled by the local rule-based parser
+        details = _fast_path(fast_parser, request)
+        if details is not None:
+            return details
+
+        if use_mock_data():
+            # Mock implementation for testing
+            span.site = "mock"
+            return mock_parser(request)
+
+        span.site = "openai"
+        try:
+            return _complete_json(kind, request)
+
+        except Exception as e:
+            print(f"Error parsing {kind} request: {e}")
+            span.error = True
+            # OpenAI failed or the circuit breaker is open: use the local parse if it is complete
+            return _local_fallback(fast_parser, request)
+
+
+def parse_flight_request(request: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse a natural language flight booking request into structured data.
+    
+    Args:
+        request: Natural language request string
+        
+    Returns:
+        Dictionary with structured booking data or None if parsing failed
+    """
+    details = _parse_request("flight", request, fast_parse_flight, _mock_flight_details)
+    # Places are returned under their canonical gazetteer names, whichever parser produced them
+    return canonicalize_details(details) if details else None
 
 
 def parse_hotel_request(request: str) -> Optional[Dict[str, Any]]:
@@ -110,54 +592,131 @@ def parse_hotel_request(request: str) -> Optional[Dict[str, Any]]:
     Returns:
         Dictionary with structured booking data or None if parsing failed
     """
-    if USE_MOCK_DATA:
-        # Mock implementation for testing
-        print(f"Mock parsing hotel request: '{request}'")
-        # Simple parsing based on keywords
-        location = "New York"
-        check_in_date = "2023-07-01"
-        check_out_date = "2023-07-05"
-        num_adults = 2
-        num_children = 0
-        room_type = "standard"
-        
-        return {
-            "location": location,
-            "check_in_date": check_in_date,
-            "check_out_date": check_out_date,
-            "num_adults": num_adults,
-            "num_children": num_children,
-            "room_type": room_type
-        }
+    details = _parse_request("hotel", request, fast_parse_hotel, _mock_hotel_details)
+    return canonicalize_details(details) if details else None
+
+
+async def _parse_requests_async(
+    requests: List[str],
+    kind: str,
+    fast_parser: Callable[[str], Dict[str, Any]],
+    mock_parser: Callable[[str], Dict[str, Any]],
+    max_concurrency: int,
+) -> List[Dict[str, Any]]:
+    """
+    Parse many requests concurrently, keeping results in input order.
     
-    try:
-        # Define the system prompt
-        system_prompt = """
-        You are a hotel booking assistant. Extract the following information from the user's request:
-        - location: The city/location for the hotel
-        - check_in_date: The check-in date in YYYY-MM-DD format
-        - check_out_date: The check-out date in YYYY-MM-DD format
-        - num_adults: The number of adult guests
-        - num_children: The number of child guests (0 if not specified)
-        - room_type: The type of room (if specified, otherwise "standard")
+    Identical requests (after normalization) within a batch share one call.
+    
+    Args:
+        requests: Natural language request strings
+        kind: Request type ("flight" or "hotel")
+        fast_parser: Local rule-based parser tried before OpenAI
+        mock_parser: Parser used instead of OpenAI in mock mode
+        max_concurrency: Maximum number of in-flight OpenAI calls
         
-        Return the information as a JSON object with these fields.
-        """
+    Returns:
+        One dictionary per request with "request", "result" and "error" keys
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def parse_one(request: str) -> Dict[str, Any]:
+        with get_telemetry().span("parse", site="fast_path", kind=kind) as span:
+            details = _fast_path(fast_parser, request)
+            if details is not None:
+                return details
+            async with semaphore:
+                if use_mock_data():
+                    span.site = "mock"
+                    return mock_parser(request)
+                span.site = "openai"
+                try:
+                    return await _complete_json_async(kind, request)
+                except Exception:
+                    span.error = True
+                    details = _local_fallback(fast_parser, request)
+                    if details is None:
+                        raise
+                    return details
+
+    keys = [_cache_key(kind, request) for request in requests]
+    unique: Dict[str, str] = {}
+    for key, request in zip(keys, requests):
+        unique.setdefault(key, request)
+
+    outcomes = await asyncio.gather(
+        *(parse_one(request) for request in unique.values()),
+        return_exceptions=True
+    )
+    by_key = dict(zip(unique.keys(), outcomes))
+
+    results = []
+    for key, request in zip(keys, requests):
+        outcome = by_key[key]
+        if isinstance(outcome, BaseException):
+            results.append({"request": request, "result": None, "error": str(outcome) or type(outcome).__name__})
+        else:
+            results.append({"request": request, "result": canonicalize_details(outcome), "error": None})
+    return results
+
+
+async def parse_flight_requests_async(
+    requests: List[str],
+    max_concurrency: int = DEFAULT_BATCH_CONCURRENCY
+) -> List[Dict[str, Any]]:
+    """
+    Parse a batch of flight booking requests concurrently.
+    
+    Args:
+        requests: Natural language request strings
+        max_concurrency: Maximum number of in-flight OpenAI calls
         
-        # Call OpenAI API to extract information
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": request}
-            ],
-            response_format={"type": "json_object"}
-        )
+    Returns:
+        One dictionary per request, in input order, with the original
+        "request", the parsed "result" (None on failure) and an "error" message
+    """
+    return await _parse_requests_async(requests, "flight", fast_parse_flight, _mock_flight_details, max_concurrency)
+
+
+async def parse_hotel_requests_async(
+    requests: List[str],
+    max_concurrency: int = DEFAULT_BATCH_CONCURRENCY
+) -> List[Dict[str, Any]]:
+    """
+    Parse a batch of hotel booking requests concurrently.
+    
+    Args:
+        requests: Natural language request strings
+        max_concurrency: Maximum number of in-flight OpenAI calls
         
-        # Parse the response
-        content = response.choices[0].message.content
-        return json.loads(content)
+    Returns:
+        One dictionary per request, in input order, with the original
+        "request", the parsed "result" (None on failure) and an "error" message
+    """
+    return await _parse_requests_async(requests, "hotel", fast_parse_hotel, _mock_hotel_details, max_concurrency)
+
+
+def parse_flight_requests(
+    requests: List[str],
+    max_concurrency: int = DEFAULT_BATCH_CONCURRENCY
+) -> List[Dict[str, Any]]:
+    """
+    Parse a batch of flight booking requests.
     
-    except Exception as e:
-        print(f"Error parsing hotel request: {e}")
-        return None
+    Blocking wrapper around parse_flight_requests_async; use the async
+    variant from code that already runs an event loop.
+    """
+    return asyncio.run(_closing_async_client(parse_flight_requests_async(requests, max_concurrency)))
+
+
+def parse_hotel_requests(
+    requests: List[str],
+    max_concurrency: int = DEFAULT_BATCH_CONCURRENCY
+) -> List[Dict[str, Any]]:
+    """
+    Parse a batch of hotel booking requests.
+    
+    Blocking wrapper around parse_hotel_requests_async; use the async
+    variant from code that already runs an event loop.
+    """
+    return asyncio.run(_closing_async_client(parse_hotel_requests_async(requests, max_concurrency)))
@@ -0,0 +1,288 @@
+"""
+Hotel availability engine built from room-night snapshots.
+
+Snapshots are CSV files with one row per property, room type and night:
+
+    property_id,name,location,room_type,date,rooms_free,price_minor,currency
+    riga-001,Grand Plaza Hotel,Riga,standard,2023-03-28,4,18000,EUR
+
+For every (location, room_type) the engine keeps one bitmap per night, with
+bit i set when property i has a free room that night. A stay query ANDs the
+bitmaps of its nights, so checking tens of thousands of properties costs a
+handful of big-integer operations. Nightly prices are kept in per-property
+prefix-sum arrays, so the total for any stay is a single subtraction.
+"""
+import os
+import csv
+import heapq
+import datetime
+from array import array
+from typing import Dict, Any, Optional, List, Iterable, Tuple
+
+
+def _location_key(location: str) -> str:
+    return " ".join(location.casefold().split())
+
+
+class _PropertyGroup:
+    """
+    Availability of all properties offering one room type in one location.
+    """
+    __slots__ = ("property_ids", "names", "currency", "index", "nightly", "first_days", "prices", "prefix", "dirty")
+
+    def __init__(self):
+        self.property_ids: List[str] = []
+        self.names: List[str] = []
+        self.currency = "EUR"
+        self.index: Dict[str, int] = {}
+        # day ordinal -> bitmap of properties with a free room that night
+        self.nightly: Dict[int, int] = {}
+        # Nightly prices per property, starting at that property's first known night
+        self.first_days: List[int] = []
+        self.prices: List[array] = []
+        self.prefix: List[Optional[array]] = []
+        self.dirty: set = set()
+
+    def _property(self, property_id: str, name: str) -> int:
+        i = self.index.get(property_id)
+        if i is None:
+            i = len(self.property_ids)
+            self.index[property_id] = i
+            self.property_ids.append(property_id)
+            self.names.append(name)
+            self.first_days.append(-1)
+            self.prices.append(array("q"))
+            self.prefix.append(None)
+        return i
+
+    def set_night(self, property_id: str, name: str, day: int, rooms_free: int, price_minor: int) -> None:
+        i = self._property(property_id, name)
+        bit = 1 << i
+        if rooms_free > 0:
+            self.nightly[day] = self.nightly.get(day, 0) | bit
+        else:
+            self.nightly[day] = self.nightly.get(day, 0) & ~bit
+        prices = self.prices[i]
+        if not prices:
+            self.first_days[i] = day
+        elif day < self.first_days[i]:
+            self.prices[i] = prices = array("q", [0] * (self.first_days[i] - day)) + prices
+            self.first_days[i] = day
+        offset = day - self.first_days[i]
+        if len(prices) <= offset:
+            prices.extend([0] * (offset + 1 - len(prices)))
+        prices[offset] = price_minor
+        self.dirty.add(i)
+
+    def total(self, i: int, start: int, end: int) -> int:
+        if i in self.dirty or self.prefix[i] is None:
+            running = 0
+            prefix = array("q", [0])
+            for price in self.prices[i]:
+                running += price
+                prefix.append(running)
+            self.prefix[i] = prefix
+            self.dirty.discard(i)
+        prefix = self.prefix[i]
+        first_day = self.first_days[i]
+        last = len(prefix) - 1
+        return prefix[min(max(end - first_day, 0), last)] - prefix[min(max(start - first_day, 0), last)]
+
+
+class HotelAvailability:
+    """
+    Bitmap index of hotel room-night inventory keyed by location and room type.
+    """
+
+    def __init__(self):
+        self._groups: Dict[Tuple[str, str], _PropertyGroup] = {}
+        self._snapshot_mtimes: Dict[str, float] = {}
+
+    @staticmethod
+    def _read_rows(path: str) -> Iterable[Dict[str, Any]]:
+        with open(path, newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+
+    def apply_updates(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """
+        Set the free rooms and price of individual property nights.
+
+        Args:
+            rows: Snapshot rows (same columns as a full snapshot)
+
+        Returns:
+            Number of rows applied
+        """
+        applied = 0
+        for row in rows:
+            day = datetime.date.fromisoformat(row["date"]).toordinal()
+            key = (_location_key(row["location"]), (row.get("room_type") or "standard").lower())
+            group = self._groups.get(key)
+            if group is None:
+                group = self._groups[key] = _PropertyGroup()
+                group.currency = row.get("currency") or "EUR"
+            group.set_night(row["property_id"], row.get("name") or row["property_id"], day,
+                            int(row.get("rooms_free") or 0), int(row.get("price_minor") or 0))
+            applied += 1
+        return applied
+
+    def load(self, path: str) -> int:
+        """
+        Replace the whole index with a full snapshot file.
+
+        Args:
+            path: CSV snapshot path
+
+        Returns:
+            Number of property nights loaded
+        """
+        self._groups = {}
+        loaded = self.apply_updates(self._read_rows(path))
+        self._snapshot_mtimes[path] = os.path.getmtime(path)
+        return loaded
+
+    def refresh(self, path: str) -> int:
+        """
+        Apply an update file if it changed since it was last applied.
+
+        Returns:
+            Number of rows applied (0 if the file is unchanged)
+        """
+        mtime = os.path.getmtime(path)
+        if self._snapshot_mtimes.get(path) == mtime:
+            return 0
+        applied = self.apply_updates(self._read_rows(path))
+        self._snapshot_mtimes[path] = mtime
+        return applied
+
+    def _stay(self, location: str, check_in_date: str, check_out_date: str,
+              room_type: str) -> Optional[Tuple[_PropertyGroup, int, int, int]]:
+        """
+        Return the group, first and end day ordinals and the AND of the night bitmaps of a stay,
+        or None if no property has a free room for every night.
+        """
+        group = self._groups.get((_location_key(location), room_type.lower()))
+        if group is None:
+            return None
+        start = datetime.date.fromisoformat(check_in_date).toordinal()
+        end = datetime.date.fromisoformat(check_out_date).toordinal()
+        if end <= start:
+            return None
+
+        available = -1
+        for day in range(start, end):
+            available &= group.nightly.get(day, 0)
+            if not available:
+                return None
+        return group, start, end, available
+
+    def find(
+        self,
+        location: str,
+        check_in_date: str,
+        check_out_date: str,
+        room_type: str = "standard",
+        limit: Optional[int] = None,
+        max_total_minor: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Find properties with a free room for every night of a stay.
+
+        Args:
+            location: City/location of the hotel
+            check_in_date: Check-in date in YYYY-MM-DD format
+            check_out_date: Check-out date in YYYY-MM-DD format (exclusive)
+            room_type: Room type to look for
+            limit: Maximum number of properties to return, cheapest first
+            max_total_minor: Optional upper bound for the stay total in minor units
+
+        Returns:
+            List of dictionaries with property_id, name, nights, total_price_minor,
+            price_per_night_minor and currency, cheapest first
+        """
+        stay = self._stay(location, check_in_date, check_out_date, room_type)
+        if stay is None:
+            return []
+        group, start, end, available = stay
+
+        nights = end - start
+        matches = []
+        # Walk the set bits of the result bitmap via its binary string, lowest bit first
+        bits = bin(available)[:1:-1]
+        i = bits.find("1")
+        while i != -1:
+            total = group.total(i, start, end)
+            if max_total_minor is None or total <= max_total_minor:
+                matches.append((total, i))
+            i = bits.find("1", i + 1)
+        matches = heapq.nsmallest(limit, matches) if limit is not None else sorted(matches)
+        return [
+            {
+                "property_id": group.property_ids[i],
+                "name": group.names[i],
+                "nights": nights,
+                "total_price_minor": total,
+                "price_per_night_minor": total // nights,
+                "currency": group.currency,
+            }
+            for total, i in matches
+        ]
+
+    def quote(self, property_id: str, location: str, check_in_date: str, check_out_date: str,
+              room_type: str = "standard") -> Optional[Dict[str, Any]]:
+        """
+        Price one property for a stay, or return None if it has no free room for every night.
+
+        Takes the arguments of find() plus the property ID, and returns a dictionary in the same format.
+        """
+        group = self._groups.get((_location_key(location), room_type.lower()))
+        i = group.index.get(property_id) if group is not None else None
+        if i is None:
+            return None
+        start = datetime.date.fromisoformat(check_in_date).toordinal()
+        end = datetime.date.fromisoformat(check_out_date).toordinal()
+        if end <= start or any(not group.nightly.get(day, 0) >> i & 1 for day in range(start, end)):
+            return None
+        total = group.total(i, start, end)
+        return {
+            "property_id": property_id,
+            "name": group.names[i],
+            "nights": end - start,
+            "total_price_minor": total,
+            "price_per_night_minor": total // (end - start),
+            "currency": group.currency,
+        }
+
+    def is_bookable(self, location: str, check_in_date: str, check_out_date: str,
+                    room_type: str = "standard") -> bool:
+        """
+        Return True if at least one property can host the whole stay.
+
+        Only the night bitmaps are checked; no stay is priced.
+        """
+        return self._stay(location, check_in_date, check_out_date, room_type) is not None
+
+
+_availability: Optional[HotelAvailability] = None
+
+
+def get_hotel_availability() -> Optional[HotelAvailability]:
+    """
+    Return the process-wide availability index, loaded from TRAVEL_BOOKER_HOTEL_SNAPSHOT.
+
+    Returns None when no snapshot is configured. If
+    TRAVEL_BOOKER_HOTEL_SNAPSHOT_DELTA is set, that update file is re-applied
+    whenever it changes.
+    """
+    global _availability
+    snapshot = os.getenv("TRAVEL_BOOKER_HOTEL_SNAPSHOT")
+    if not snapshot:
+        return None
+    if _availability is None:
+        availability = HotelAvailability()
+        availability.load(snapshot)
+        _availability = availability
+    delta = os.getenv("TRAVEL_BOOKER_HOTEL_SNAPSHOT_DELTA")
+    if delta and os.path.exists(delta):
+        _availability.refresh(delta)
+    return _availability
@@ -0,0 +1,344 @@
+"""
+Typed booking models shared by the parser, the booking flows and the CLI.
+
+Models are frozen dataclasses (slotted on Python 3.10+). Prices are held as
+integer minor units plus an ISO currency code, so consumers never reparse
+strings like "€350.00". `from_dict` validates and coerces loose dictionaries,
+and `to_dict` / `to_json` produce JSON-ready output without deep copies.
+"""
+import re
+import sys
+import json
+import datetime
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Union
+
+# Slotted dataclasses cut per-record memory but need Python 3.10+
+_DATACLASS_OPTIONS = {"frozen": True, "slots": True} if sys.version_info >= (3, 10) else {"frozen": True}
+
+CURRENCY_SYMBOLS = {"€": "EUR", "$": "USD", "£": "GBP", "¥": "JPY"}
+_SYMBOL_FOR_CURRENCY = {code: symbol for symbol, code in CURRENCY_SYMBOLS.items()}
+
+# Currencies that do not use two decimal places
+CURRENCY_EXPONENTS = {"JPY": 0, "KRW": 0, "ISK": 0}
+
+_PRICE_PATTERN = re.compile(
+    r"^\s*(?P<prefix>[A-Z]{3}|[€$£¥])?\s*(?P<amount>-?\d[\d,\s]*(?:\.\d+)?)\s*(?P<suffix>[A-Z]{3}|[€$£¥])?\s*$"
+)
+
+
+class BookingValidationError(ValueError):
+    """
+    Raised when booking data is missing fields or has invalid values.
+    """
+
+
+def _currency_exponent(currency: str) -> int:
+    return CURRENCY_EXPONENTS.get(currency, 2)
+
+
+def _to_date(value: Union[str, datetime.date], field: str) -> datetime.date:
+    if isinstance(value, datetime.date):
+        return value
+    try:
+        return datetime.date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise BookingValidationError(f"{field} must be a YYYY-MM-DD date, got {value!r}")
+
+
+def _to_count(value: Any, field: str, minimum: int) -> int:
+    try:
+        count = int(value)
+    except (TypeError, ValueError):
+        raise BookingValidationError(f"{field} must be an integer, got {value!r}")
+    if count < minimum:
+        raise BookingValidationError(f"{field} must be at least {minimum}, got {count}")
+    return count
+
+
+def _require_text(data: Dict[str, Any], field: str) -> str:
+    value = data.get(field)
+    if not isinstance(value, str) or not value.strip():
+        raise BookingValidationError(f"{field} is required")
+    return value.strip()
+
+
+@dataclass(**_DATACLASS_OPTIONS)
+class Money:
+    """
+    An amount in integer minor units (e.g. cents) of an ISO 4217 currency.
+    """
+    amount_minor: int
+    currency: str
+
+    @classmethod
+    def parse(cls, value: Union[str, int, float, Dict[str, Any], "Money"], default_currency: str = "EUR") -> "Money":
+        """
+        Build a Money value from a display string like "€350.00", a dict or a number.
+
+        Args:
+            value: Price string, {"amount_minor", "currency"} dict, number of major units or Money
+            default_currency: Currency used when the value does not name one
+
+        Returns:
+            The parsed Money value
+        """
+        if isinstance(value, Money):
+            return value
+        if isinstance(value, dict):
+            amount, currency = value.get("amount_minor"), value.get("currency", default_currency)
+            if amount is None:
+                raise BookingValidationError("amount_minor is required")
+            if isinstance(amount, bool) or (isinstance(amount, float) and not amount.is_integer()):
+                raise BookingValidationError(f"amount_minor must be an integer, got {amount!r}")
+            try:
+                amount_minor = int(amount)
+            except (TypeError, ValueError):
+                raise BookingValidationError(f"amount_minor must be an integer, got {amount!r}")
+            if not isinstance(currency, str) or not currency.strip():
+                raise BookingValidationError(f"currency must be a currency code, got {currency!r}")
+            return cls(amount_minor, currency.strip())
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            exponent = _currency_exponent(default_currency)
+            return cls(int(round(value * 10 ** exponent)), default_currency)
+        if not isinstance(value, str):
+            raise BookingValidationError(f"Invalid price: {value!r}")
+
+        match = _PRICE_PATTERN.match(value)
+        if not match:
+            raise BookingValidationError(f"Invalid price: {value!r}")
+        marker = match.group("prefix") or match.group("suffix")
+        currency = CURRENCY_SYMBOLS.get(marker, marker) if marker else default_currency
+        whole, _, fraction = match.group("amount").replace(",", "").replace(" ", "").partition(".")
+        exponent = _currency_exponent(currency)
+        fraction = (fraction + "0" * exponent)[:exponent]
+        sign = -1 if whole.startswith("-") else 1
+        amount_minor = int(whole.lstrip("-") or "0") * 10 ** exponent + (int(fraction) if fraction else 0)
+        return cls(sign * amount_minor, currency)
+
+    def format(self) -> str:
+        """
+        Return a display string such as "€350.00".
+        """
+        exponent = _currency_exponent(self.currency)
+        amount = f"{self.amount_minor / 10 ** exponent:.{exponent}f}"
+        symbol = _SYMBOL_FOR_CURRENCY.get(self.currency)
+        return f"{symbol}{amount}" if symbol else f"{amount} {self.currency}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"amount_minor": self.amount_minor, "currency": self.currency}
+
+    def __add__(self, other: "Money") -> "Money":
+        if not isinstance(other, Money) or other.currency != self.currency:
+            return NotImplemented
+        return Money(self.amount_minor + other.amount_minor, self.currency)
+
+    def __mul__(self, factor: int) -> "Money":
+        return Money(self.amount_minor * factor, self.currency)
+
+
+class _Model:
+    """
+    Shared JSON helpers for the booking models.
+    """
+    __slots__ = ()
+
+    def to_json(self) -> str:
+        """
+        Serialize the model to compact JSON.
+        """
+        return json.dumps(self.to_dict(), separators=(",", ":"), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, text: Union[str, bytes]):
+        """
+        Deserialize and validate a model from JSON.
+        """
+        return cls.from_dict(json.loads(text))
+
+
+@dataclass(**_DATACLASS_OPTIONS)
+class FlightRequest(_Model):
+    """
+    Structured flight booking request, as produced by the parser.
+    """
+    origin: str
+    destination: str
+    date: datetime.date
+    num_adults: int = 1
+    num_children: int = 0
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FlightRequest":
+        """
+        Validate parsed flight details and build a FlightRequest.
+        """
+        request = cls(
+            origin=_require_text(data, "origin"),
+            destination=_require_text(data, "destination"),
+            date=_to_date(data.get("date"), "date"),
+            num_adults=_to_count(data.get("num_adults", 1), "num_adults", 1),
+            num_children=_to_count(data.get("num_children") or 0, "num_children", 0),
+        )
+        if request.origin.casefold() == request.destination.casefold():
+            raise BookingValidationError("origin and destination must differ")
+        return request
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "origin": self.origin,
+            "destination": self.destination,
+            "date": self.date.isoformat(),
+            "num_adults": self.num_adults,
+            "num_children": self.num_children,
+        }
+
+
+@dataclass(**_DATACLASS_OPTIONS)
+class HotelRequest(_Model):
+    """
+    Structured hotel booking request, as produced by the parser.
+    """
+    location: str
+    check_in_date: datetime.date
+    check_out_date: datetime.date
+    num_adults: int = 1
+    num_children: int = 0
+    room_type: str = "standard"
+
+    @property
+    def nights(self) -> int:
+        return (self.check_out_date - self.check_in_date).days
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HotelRequest":
+        """
+        Validate parsed hotel details and build a HotelRequest.
+        """
+        request = cls(
+            location=_require_text(data, "location"),
+            check_in_date=_to_date(data.get("check_in_date"), "check_in_date"),
+            check_out_date=_to_date(data.get("check_out_date"), "check_out_date"),
+            num_adults=_to_count(data.get("num_adults", 1), "num_adults", 1),
+            num_children=_to_count(data.get("num_children") or 0, "num_children", 0),
+            room_type=(data.get("room_type") or "standard").strip().lower(),
+        )
+        if request.nights < 1:
+            raise BookingValidationError("check_out_date must be after check_in_date")
+        return request
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "location": self.location,
+            "check_in_date": self.check_in_date.isoformat(),
+            "check_out_date": self.check_out_date.isoformat(),
+            "num_adults": self.num_adults,
+            "num_children": self.num_children,
+            "room_type": self.room_type,
+        }
+
+
+@dataclass(**_DATACLASS_OPTIONS)
+class FlightBooking(_Model):
+    """
+    Result of a flight booking on Finnair.
+    """
+    booking_id: str
+    flight_number: str
+    origin: str
+    destination: str
+    date: datetime.date
+    departure_time: str
+    arrival_time: str
+    price: Money
+    status: str
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FlightBooking":
+        """
+        Validate a flight booking result and build a FlightBooking.
+        """
+        return cls(
+            booking_id=_require_text(data, "booking_id"),
+            flight_number=_require_text(data, "flight_number"),
+            origin=_require_text(data, "origin"),
+            destination=_require_text(data, "destination"),
+            date=_to_date(data.get("date"), "date"),
+            departure_time=data.get("departure_time", ""),
+            arrival_time=data.get("arrival_time", ""),
+            price=Money.parse(data.get("price")),
+            status=_require_text(data, "status"),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "booking_id": self.booking_id,
+            "flight_number": self.flight_number,
+            "origin": self.origin,
+            "destination": self.destination,
+            "date": self.date.isoformat(),
+            "departure_time": self.departure_time,
+            "arrival_time": self.arrival_time,
+            "price": self.price.to_dict(),
+            "status": self.status,
+        }
+
+
+@dataclass(**_DATACLASS_OPTIONS)
+class HotelBooking(_Model):
+    """
+    Result of a hotel booking on Booking.com.
+    """
+    booking_id: str
+    hotel_name: str
+    location: str
+    check_in_date: datetime.date
+    check_out_date: datetime.date
+    room_type: str
+    price_per_night: Money
+    total_price: Money
+    status: str
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HotelBooking":
+        """
+        Validate a hotel booking result and build a HotelBooking.
+        """
+        return cls(
+            booking_id=_require_text(data, "booking_id"),
+            hotel_name=_require_text(data, "hotel_name"),
+            location=_require_text(data, "location"),
+            check_in_date=_to_date(data.get("check_in_date"), "check_in_date"),
+            check_out_date=_to_date(data.get("check_out_date"), "check_out_date"),
+            room_type=data.get("room_type") or "standard",
+            price_per_night=Money.parse(data.get("price_per_night")),
+            total_price=Money.parse(data.get("total_price")),
+            status=_require_text(data, "status"),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "booking_id": self.booking_id,
+            "hotel_name": self.hotel_name,
+            "location": self.location,
+            "check_in_date": self.check_in_date.isoformat(),
+            "check_out_date": self.check_out_date.isoformat(),
+            "room_type": self.room_type,
+            "price_per_night": self.price_per_night.to_dict(),
+            "total_price": self.total_price.to_dict(),
+            "status": self.status,
+        }
+
+
+def booking_from_dict(data: Dict[str, Any]) -> Optional[Union[FlightBooking, HotelBooking]]:
+    """
+    Build the matching booking model for a result dictionary.
+
+    Returns:
+        FlightBooking or HotelBooking, or None if the dictionary is neither
+    """
+    if "flight_number" in data:
+        return FlightBooking.from_dict(data)
+    if "hotel_name" in data:
+        return HotelBooking.from_dict(data)
+    return None
@@ -0,0 +1,225 @@
+"""
+Checkpoints of the booking flows, so failed bookings resume where they stopped.
+
+The flows move through fixed steps: search, select, passenger (or guest)
+details, confirm. After each step they save a compact checkpoint under the
+booking's canonical key (see details_key): the last completed step, the chosen
+option, the form state and the page URL, with the details the key was built
+from. For flexible requests those include the date or stay window, while the
+saved details are the exact candidate that was picked. A retry of the same
+booking, in this process or in a restarted one, loads the checkpoint and
+continues after that step instead of searching and selecting again. The saved option is re-verified
+before it is booked. Checkpoints are removed once the booking is confirmed or
+found unavailable, and expire after max_age_seconds. A checkpoint that keeps
+failing is dropped after MAX_ATTEMPTS resumes, so the next attempt starts over.
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Any, Optional, List
+
+from travel_booker.core.store import DEFAULT_DB_PATH
+
+DEFAULT_CHECKPOINT_PATH = os.path.join(os.path.dirname(DEFAULT_DB_PATH), "checkpoints.sqlite3")
+# Chosen fares and rooms go stale; older checkpoints are not resumed
+DEFAULT_MAX_AGE_SECONDS = 6 * 3600
+MAX_ATTEMPTS = 3
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS checkpoints ("
+    " key TEXT PRIMARY KEY,"
+    " kind TEXT NOT NULL,"
+    " step TEXT NOT NULL,"
+    " attempts INTEGER NOT NULL,"
+    " updated_at REAL NOT NULL,"
+    " data TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS checkpoints_updated ON checkpoints (updated_at)",
+)
+
+
+@dataclass
+class Checkpoint:
+    """
+    Progress of one booking after its last completed step.
+    """
+    key: str
+    kind: str
+    step: str
+    details: Dict[str, Any]
+    option: Optional[Dict[str, Any]] = None
+    form: Dict[str, Any] = field(default_factory=dict)
+    url: Optional[str] = None
+    attempts: int = 0
+    updated_at: float = 0.0
+    # Details the booking was started with, flex windows included; `key` is built from them
+    requested: Dict[str, Any] = field(default_factory=dict)
+
+    def booking_details(self) -> Dict[str, Any]:
+        """
+        Return the details that resume this booking under its own key.
+        """
+        return self.requested or self.details
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class CheckpointStore:
+    """
+    Checkpoints by booking key in SQLite, or in memory when no path is given.
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_CHECKPOINT_PATH, max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS):
+        """
+        Args:
+            path: SQLite database file (None keeps checkpoints in memory only)
+            max_age_seconds: Age after which a checkpoint is no longer resumed
+        """
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self._memory: Dict[str, Checkpoint] = {}
+        # One connection for the store's lifetime, used under _lock (a step is saved on every booking step)
+        self._conn: Optional[sqlite3.Connection] = None
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+                try:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute("PRAGMA synchronous=NORMAL")
+                    with conn:
+                        for statement in _SCHEMA:
+                            conn.execute(statement)
+                except sqlite3.Error:
+                    conn.close()
+                    raise
+                self._conn = conn
+            except sqlite3.Error as e:
+                print(f"Checkpoints kept in memory only ({path}): {e}")
+                self.path = None
+
+    @staticmethod
+    def _from_row(row: tuple) -> Checkpoint:
+        key, kind, step, attempts, updated_at, data = row
+        return Checkpoint(key, kind, step, attempts=attempts, updated_at=updated_at, **json.loads(data))
+
+    def save(self, checkpoint: Checkpoint) -> None:
+        """
+        Store a checkpoint, replacing the previous one of the same booking.
+        """
+        checkpoint.updated_at = time.time()
+        with self._lock:
+            if not self.path:
+                self._memory[checkpoint.key] = checkpoint
+                return
+            data = {"details": checkpoint.details, "option": checkpoint.option, "form": checkpoint.form,
+                    "url": checkpoint.url, "requested": checkpoint.requested}
+            try:
+                with self._conn as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO checkpoints (key, kind, step, attempts, updated_at, data)"
+                        " VALUES (?, ?, ?, ?, ?, ?)",
+                        (checkpoint.key, checkpoint.kind, checkpoint.step, checkpoint.attempts, checkpoint.updated_at,
+                         json.dumps(data, separators=(",", ":"), ensure_ascii=False)),
+                    )
+            except sqlite3.Error as e:
+                print(f"Error saving checkpoint: {e}")
+
+    def load(self, key: str) -> Optional[Checkpoint]:
+        """
+        Return the checkpoint of a booking, or None if there is none or it has expired.
+        """
+        with self._lock:
+            if not self.path:
+                checkpoint = self._memory.get(key)
+            else:
+                try:
+                    with self._conn as conn:
+                        row = conn.execute(
+                            "SELECT key, kind, step, attempts, updated_at, data FROM checkpoints WHERE key = ?", (key,)
+                        ).fetchone()
+                except sqlite3.Error as e:
+                    print(f"Error reading checkpoint: {e}")
+                    return None
+                checkpoint = self._from_row(row) if row is not None else None
+        if checkpoint is not None and checkpoint.updated_at < time.time() - self.max_age_seconds:
+            self.clear(key)
+            return None
+        return checkpoint
+
+    def record_failure(self, key: str) -> None:
+        """
+        Count a failed attempt on a booking's checkpoint, dropping it after MAX_ATTEMPTS.
+        """
+        checkpoint = self.load(key)
+        if checkpoint is None:
+            return
+        checkpoint.attempts += 1
+        if checkpoint.attempts >= MAX_ATTEMPTS:
+            self.clear(key)
+        else:
+            self.save(checkpoint)
+
+    def clear(self, key: str) -> None:
+        """
+        Remove the checkpoint of a booking.
+        """
+        with self._lock:
+            if not self.path:
+                self._memory.pop(key, None)
+                return
+            try:
+                with self._conn as conn:
+                    conn.execute("DELETE FROM checkpoints WHERE key = ?", (key,))
+            except sqlite3.Error as e:
+                print(f"Error removing checkpoint: {e}")
+
+    def pending(self) -> List[Checkpoint]:
+        """
+        Return the checkpoints of interrupted bookings that can still be resumed, oldest first.
+        """
+        cutoff = time.time() - self.max_age_seconds
+        with self._lock:
+            if not self.path:
+                return sorted((checkpoint for checkpoint in self._memory.values() if checkpoint.updated_at >= cutoff),
+                              key=lambda checkpoint: checkpoint.updated_at)
+            try:
+                with self._conn as conn:
+                    conn.execute("DELETE FROM checkpoints WHERE updated_at < ?", (cutoff,))
+                    rows = conn.execute(
+                        "SELECT key, kind, step, attempts, updated_at, data FROM checkpoints ORDER BY updated_at"
+                    ).fetchall()
+            except sqlite3.Error as e:
+                print(f"Error reading checkpoints: {e}")
+                return []
+        return [self._from_row(row) for row in rows]
+
+
+_store: Optional[CheckpointStore] = None
+
+
+def get_checkpoint_store() -> Optional[CheckpointStore]:
+    """
+    Return the process-wide checkpoint store, configured from the environment.
+
+    Returns None when TRAVEL_BOOKER_CHECKPOINTS is "0", in which case every
+    attempt starts from the beginning.
+
+    Environment variables:
+        TRAVEL_BOOKER_CHECKPOINTS: Set to "0" to disable checkpoints
+        TRAVEL_BOOKER_CHECKPOINT_PATH: SQLite file shared by all processes
+        TRAVEL_BOOKER_CHECKPOINT_MAX_AGE: Seconds after which a checkpoint is not resumed
+    """
+    global _store
+    if os.getenv("TRAVEL_BOOKER_CHECKPOINTS", "1") == "0":
+        return None
+    if _store is None:
+        _store = CheckpointStore(
+            os.path.expanduser(os.getenv("TRAVEL_BOOKER_CHECKPOINT_PATH", DEFAULT_CHECKPOINT_PATH)),
+            max_age_seconds=float(os.getenv("TRAVEL_BOOKER_CHECKPOINT_MAX_AGE", DEFAULT_MAX_AGE_SECONDS)),
+        )
+    return _store
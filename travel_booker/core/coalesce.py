@@ -0,0 +1,214 @@
+"""
+Single-flight coalescing of identical parse and booking calls.
+
+Concurrent calls with the same key share one execution: the first caller runs
+it and everyone else waits for its result. Threads and event loops can share
+the same in-flight call. Successful results can also be kept for an idempotency
+window, so a repeat that arrives shortly after completion gets the stored
+result instead of running again (e.g. booking the same flight twice). Every
+caller gets a copy of its own, so changing a result never affects other
+callers or later replays.
+"""
+import os
+import copy
+import json
+import time
+import asyncio
+import threading
+import concurrent.futures
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable, Awaitable, Tuple
+
+from travel_booker.core.gazetteer import canonicalize_details
+
+# Seconds a completed booking is replayed to identical repeats (0 disables)
+DEFAULT_IDEMPOTENCY_WINDOW = 30.0
+DEFAULT_MAX_RESULTS = 1024
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.casefold().split())
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def details_key(kind: str, details: Dict[str, Any]) -> str:
+    """
+    Build a coalescing key from booking details, ignoring case, spacing, key
+    order and how places are spelled ("Riika" and "Riga" give the same key).
+
+    Args:
+        kind: Call type, e.g. "flight" or "hotel"
+        details: Structured booking details
+
+    Returns:
+        Key string
+    """
+    return kind + ":" + json.dumps(_normalize(canonicalize_details(details)), sort_keys=True, separators=(",", ":"), default=str)
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls by key and replays recent results.
+    """
+
+    def __init__(self, window_seconds: float = 0.0, max_results: int = DEFAULT_MAX_RESULTS):
+        """
+        Args:
+            window_seconds: How long successful results are replayed after completion (0 disables)
+            max_results: Maximum number of results kept for replay
+        """
+        self.window_seconds = window_seconds
+        self.max_results = max_results
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, concurrent.futures.Future] = {}
+        self._results: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.executions = 0
+        self.shared = 0
+        self.replayed = 0
+
+    def _join(self, key: str) -> Tuple[bool, Any]:
+        """
+        Return (True, future) if the caller must execute, else (False, future or replayed result box).
+        """
+        with self._lock:
+            stored = self._results.get(key)
+            if stored is not None:
+                if stored[0] > time.monotonic():
+                    self.replayed += 1
+                    return False, stored
+                del self._results[key]
+            future = self._inflight.get(key)
+            if future is not None:
+                self.shared += 1
+                return False, future
+            future = self._inflight[key] = concurrent.futures.Future()
+            self.executions += 1
+            return True, future
+
+    def _finish(self, key: str, future: concurrent.futures.Future, result: Any = None,
+                error: Optional[BaseException] = None) -> None:
+        # Followers and replays copy from a snapshot, so the leader may change the result it returns
+        result = copy.deepcopy(result)
+        with self._lock:
+            self._inflight.pop(key, None)
+            if error is None and result is not None and self.window_seconds > 0:
+                self._results[key] = (time.monotonic() + self.window_seconds, result)
+                self._results.move_to_end(key)
+                while len(self._results) > self.max_results:
+                    self._results.popitem(last=False)
+        if error is None:
+            future.set_result(result)
+        elif isinstance(error, (asyncio.CancelledError, KeyboardInterrupt)):
+            future.cancel()
+        else:
+            future.set_exception(error)
+
+    def call(self, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        Run fn() once for all concurrent callers with the same key.
+
+        Args:
+            key: Coalescing key, e.g. from details_key()
+            fn: Function that performs the call
+
+        Returns:
+            The (shared or replayed) result of fn()
+        """
+        while True:
+            leader, joined = self._join(key)
+            if leader:
+                try:
+                    result = fn()
+                except BaseException as e:
+                    self._finish(key, joined, error=e)
+                    raise
+                self._finish(key, joined, result)
+                return result
+            if isinstance(joined, tuple):
+                return copy.deepcopy(joined[1])
+            try:
+                return copy.deepcopy(joined.result())
+            except concurrent.futures.CancelledError:
+                # The leader was cancelled; retry and possibly take over
+                continue
+
+    async def call_async(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await factory() once for all concurrent callers with the same key.
+
+        Takes the same arguments as call(), with a coroutine factory instead of a function.
+        """
+        while True:
+            leader, joined = self._join(key)
+            if leader:
+                try:
+                    result = await factory()
+                except BaseException as e:
+                    self._finish(key, joined, error=e)
+                    raise
+                self._finish(key, joined, result)
+                return result
+            if isinstance(joined, tuple):
+                return copy.deepcopy(joined[1])
+            try:
+                return copy.deepcopy(await asyncio.shield(asyncio.wrap_future(joined)))
+            except asyncio.CancelledError:
+                if not joined.cancelled():
+                    raise
+                # The leader was cancelled, not us; retry and possibly take over
+                continue
+
+    def forget(self, key: str) -> None:
+        """
+        Drop the replayable result for a key.
+        """
+        with self._lock:
+            self._results.pop(key, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Return execution, sharing and replay counters.
+        """
+        with self._lock:
+            return {
+                "executions": self.executions,
+                "shared": self.shared,
+                "replayed": self.replayed,
+                "in_flight": len(self._inflight),
+                "stored_results": len(self._results),
+            }
+
+
+_parse_flights: Optional[SingleFlight] = None
+_booking_flights: Optional[SingleFlight] = None
+
+
+def get_parse_coalescer() -> SingleFlight:
+    """
+    Return the process-wide coalescer for OpenAI parse calls.
+
+    Parses have no replay window of their own; the parse cache serves repeats.
+    """
+    global _parse_flights
+    if _parse_flights is None:
+        _parse_flights = SingleFlight()
+    return _parse_flights
+
+
+def get_booking_coalescer() -> SingleFlight:
+    """
+    Return the process-wide coalescer for bookings.
+
+    The replay window comes from TRAVEL_BOOKER_IDEMPOTENCY_WINDOW (seconds, 0 disables).
+    """
+    global _booking_flights
+    if _booking_flights is None:
+        _booking_flights = SingleFlight(
+            float(os.getenv("TRAVEL_BOOKER_IDEMPOTENCY_WINDOW", DEFAULT_IDEMPOTENCY_WINDOW))
+        )
+    return _booking_flights
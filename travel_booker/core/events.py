@@ -0,0 +1,264 @@
+"""
+Typed progress events of the booking flows.
+
+Each booking run emits StepEvents ("started", "searching", "selecting", ...)
+stamped with time.monotonic(). Callers receive them through an `on_event`
+callback, or as an async iterator with EventStream. Every event also goes to the
+process-wide EventLogSink, if one is configured, which writes JSON lines from a
+background thread so emitting never waits on I/O. Each event records how long
+the run has taken so far. The final event of a run carries the duration of
+every step.
+"""
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import asyncio
+import itertools
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, Callable, TextIO, List
+
+from travel_booker.core.telemetry import get_telemetry
+
+# Steps of the booking flows
+STARTED = "started"
+SEARCHING = "searching"
+SELECTING = "selecting"
+VERIFYING = "verifying"
+PASSENGER_DETAILS = "passenger_details"
+GUEST_DETAILS = "guest_details"
+CONFIRMING = "confirming"
+CONFIRMED = "confirmed"
+UNAVAILABLE = "unavailable"
+FAILED = "failed"
+
+FINAL_STEPS = (CONFIRMED, UNAVAILABLE, FAILED)
+
+# Telemetry stage recorded for the time spent in each step
+STEP_STAGES = {
+    STARTED: "start",
+    SEARCHING: "search",
+    SELECTING: "select",
+    VERIFYING: "verify",
+    PASSENGER_DETAILS: "passenger_details",
+    GUEST_DETAILS: "guest_details",
+    CONFIRMING: "confirm",
+}
+
+_run_ids = itertools.count(1)
+
+
+@dataclass(frozen=True)
+class StepEvent:
+    """
+    One progress step of a booking run.
+    """
+    kind: str
+    run_id: str
+    step: str
+    message: str
+    timestamp: float
+    elapsed: float
+    wall_time: float
+    data: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def is_final(self) -> bool:
+        return self.step in FINAL_STEPS
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "run_id": self.run_id,
+            "step": self.step,
+            "message": self.message,
+            "timestamp": self.timestamp,
+            "elapsed": round(self.elapsed, 6),
+            "wall_time": self.wall_time,
+            "data": self.data,
+        }
+
+
+EventCallback = Callable[[StepEvent], None]
+
+
+def format_event(event: StepEvent) -> str:
+    """
+    Render an event as a single human-readable line.
+    """
+    return f"[{event.kind} {event.run_id} +{event.elapsed:.2f}s] {event.message}"
+
+
+class BookingReporter:
+    """
+    Emits the step events of one booking run.
+    """
+
+    def __init__(self, kind: str, on_event: Optional[EventCallback] = None, site: str = "local"):
+        """
+        Args:
+            kind: Booking type, e.g. "flight" or "hotel"
+            on_event: Callback that receives every event (optional)
+            site: Site the booking runs on, used as the telemetry label
+        """
+        self.kind = kind
+        self.site = site
+        self.run_id = f"{kind}-{next(_run_ids)}"
+        self.on_event = on_event
+        self.started = time.monotonic()
+        self.step_seconds: Dict[str, float] = {}
+        self._current: Optional[str] = None
+        self._current_since = self.started
+
+    def emit(self, step: str, message: str, **data: Any) -> StepEvent:
+        """
+        Emit an event marking the start of a step (or the end of the run for final steps).
+
+        Args:
+            step: Step name, e.g. SEARCHING
+            message: Human-readable progress message
+            data: Extra JSON-serializable details
+
+        Returns:
+            The emitted event
+        """
+        now = time.monotonic()
+        telemetry = get_telemetry()
+        if self._current is not None:
+            self.step_seconds[self._current] = self.step_seconds.get(self._current, 0.0) + now - self._current_since
+            if telemetry.enabled:
+                telemetry.record_span(STEP_STAGES.get(self._current, self._current), self.site, self._current_since,
+                                      now, error=step == FAILED, track=self.run_id)
+        if step in FINAL_STEPS and telemetry.enabled:
+            telemetry.record_span("book", self.site, self.started, now, error=step == FAILED,
+                                  track=self.run_id, args={"outcome": step})
+        self._current, self._current_since = step, now
+        if step in FINAL_STEPS:
+            self._current = None
+            data["step_seconds"] = {name: round(seconds, 6) for name, seconds in self.step_seconds.items()}
+
+        event = StepEvent(self.kind, self.run_id, step, message, now, now - self.started, time.time(), data)
+        if self.on_event is not None:
+            try:
+                self.on_event(event)
+            except Exception as e:
+                print(f"Error in event callback: {e}", file=sys.stderr)
+        sink = get_event_sink()
+        if sink is not None:
+            sink.write(event)
+        return event
+
+
+class EventStream:
+    """
+    Async iterator over the events of one or more booking runs.
+
+    Pass the stream as `on_event` and let it follow the booking task:
+
+        stream = EventStream()
+        task = stream.follow(asyncio.ensure_future(book_flight_async(details, on_event=stream)))
+        async for event in stream:
+            ...
+        result = task.result()
+    """
+
+    _END = object()
+
+    def __init__(self):
+        self._queue: "asyncio.Queue[Any]" = asyncio.Queue()
+
+    def __call__(self, event: StepEvent) -> None:
+        self._queue.put_nowait(event)
+
+    def follow(self, task: "asyncio.Future") -> "asyncio.Future":
+        """
+        Close the stream when the task finishes; returns the task.
+        """
+        task.add_done_callback(lambda _: self.close())
+        return task
+
+    def close(self) -> None:
+        """
+        End iteration after the events already queued.
+        """
+        self._queue.put_nowait(self._END)
+
+    def __aiter__(self) -> "EventStream":
+        return self
+
+    async def __anext__(self) -> StepEvent:
+        event = await self._queue.get()
+        if event is self._END:
+            raise StopAsyncIteration
+        return event
+
+
+class EventLogSink:
+    """
+    Writes events as JSON lines from a background thread.
+
+    write() never blocks: when the buffer is full, events are dropped and counted.
+    """
+
+    def __init__(self, stream: TextIO, max_buffered: int = 10000):
+        self.stream = stream
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[StepEvent]]" = queue.Queue(maxsize=max_buffered)
+        self._thread = threading.Thread(target=self._write_loop, name="event-log-sink", daemon=True)
+        self._thread.start()
+
+    def write(self, event: StepEvent) -> None:
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def _write_loop(self) -> None:
+        while True:
+            event = self._queue.get()
+            if event is None:
+                break
+            lines: List[str] = [json.dumps(event.to_dict(), ensure_ascii=False)]
+            # Write whatever else is buffered in one go
+            while True:
+                try:
+                    event = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if event is None:
+                    self._queue.put(None)
+                    break
+                lines.append(json.dumps(event.to_dict(), ensure_ascii=False))
+            self.stream.write("\n".join(lines) + "\n")
+            self.stream.flush()
+
+    def close(self, timeout: float = 5.0) -> None:
+        """
+        Write the buffered events and stop the writer thread.
+        """
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+
+_sink: Optional[EventLogSink] = None
+_sink_checked = False
+
+
+def get_event_sink() -> Optional[EventLogSink]:
+    """
+    Return the process-wide event log sink, or None if TRAVEL_BOOKER_EVENT_LOG is not set.
+
+    TRAVEL_BOOKER_EVENT_LOG is a JSONL file path, or "-" for stderr.
+    """
+    global _sink, _sink_checked
+    if not _sink_checked:
+        _sink_checked = True
+        path = os.getenv("TRAVEL_BOOKER_EVENT_LOG")
+        if path:
+            stream = sys.stderr if path == "-" else open(os.path.expanduser(path), "a", encoding="utf-8")
+            _sink = EventLogSink(stream)
+            atexit.register(_sink.close)
+    return _sink
@@ -0,0 +1,387 @@
+"""
+Rule-based fast-path parser for common booking requests.
+
+Requests like "Book a flight from Helsinki to Riga on 28.3 for 2 adults" are
+parsed locally with precompiled grammars for cities, dates and traveler
+counts. The city grammar covers every spelling in the gazetteer, so it is
+compiled on the first parse rather than on import. Each parse comes with a
+confidence score so callers only fall back to OpenAI when the local result is
+unreliable.
+"""
+import re
+import datetime
+import functools
+from typing import Dict, Any, Optional, List, Tuple, NamedTuple
+
+from travel_booker.core.gazetteer import COMMON_WORDS, canonical_city, get_gazetteer
+from travel_booker.core.flex import DEFAULT_FLEX_DAYS, DEFAULT_NIGHTS_FLEX
+
+MONTHS = {
+    "jan": 1, "january": 1, "feb": 2, "february": 2, "mar": 3, "march": 3,
+    "apr": 4, "april": 4, "may": 5, "jun": 6, "june": 6, "jul": 7, "july": 7,
+    "aug": 8, "august": 8, "sep": 9, "sept": 9, "september": 9, "oct": 10,
+    "october": 10, "nov": 11, "november": 11, "dec": 12, "december": 12,
+}
+
+WEEKDAYS = {
+    "monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3,
+    "friday": 4, "saturday": 5, "sunday": 6,
+}
+
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+
+ROOM_TYPES = ("standard", "single", "double", "twin", "family", "deluxe", "suite")
+
+
+def _alternation(words) -> str:
+    # Longest first so "new york" wins over shorter overlapping aliases
+    return "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+
+_UNKNOWN_CITY = r"(?:[A-ZÀ-Þ][\w'-]+(?:\s+[A-ZÀ-Þ][\w'-]+)?)"
+_MONTH = rf"(?:{_alternation(MONTHS)})\.?"
+_COUNT = rf"(?:\d+|{_alternation(NUMBER_WORDS)})"
+_PEOPLE_COUNT = rf"(?:\d+|{_alternation(word for word in NUMBER_WORDS if word not in ('a', 'an'))})"
+
+
+class CityGrammar(NamedTuple):
+    """
+    Patterns that match the city names the gazetteer knows.
+    """
+    route: "re.Pattern"
+    city: "re.Pattern"
+    location: "re.Pattern"
+
+
+@functools.lru_cache(maxsize=1)
+def city_grammar() -> CityGrammar:
+    """
+    Compile the city patterns on first use; the alternation of every gazetteer spelling is slow to build.
+    """
+    # Every spelling the gazetteer knows, except place names that are also everyday words ("nice")
+    city = rf"(?:{_alternation(spelling for spelling in get_gazetteer().spellings() if spelling not in COMMON_WORDS)})"
+    return CityGrammar(
+        route=re.compile(
+            rf"\bfrom\s+(?P<origin>{city})\s+to\s+(?P<destination>{city})\b"
+            rf"|\b(?P<origin2>{city})\s*(?:->|→|–|-)\s*(?P<destination2>{city})\b",
+            re.IGNORECASE,
+        ),
+        city=re.compile(rf"\b(?P<city>{city})\b", re.IGNORECASE),
+        location=re.compile(rf"\b(?:in|at)\s+(?P<city>{city})\b", re.IGNORECASE),
+    )
+
+
+UNKNOWN_ROUTE_PATTERN = re.compile(
+    rf"\bfrom\s+(?P<origin>{_UNKNOWN_CITY})\s+to\s+(?P<destination>{_UNKNOWN_CITY})\b"
+)
+UNKNOWN_LOCATION_PATTERN = re.compile(rf"\b(?:in|at)\s+(?P<city>{_UNKNOWN_CITY})\b")
+
+DATE_PATTERN = re.compile(
+    r"\b(?P<iso>(?P<iy>\d{4})-(?P<im>\d{1,2})-(?P<id>\d{1,2}))\b"
+    r"|(?<!at\s)\b(?P<dotted>(?P<dd>\d{1,2})[./](?P<dm>\d{1,2})(?:[./](?P<dy>\d{4}|\d{2}))?)(?!\d)"
+    rf"|\b(?P<named_dm>(?P<nd>\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?(?P<nm>{_MONTH})(?:\s+(?P<ny>\d{{4}}))?)\b"
+    rf"|\b(?P<named_md>(?P<mm>{_MONTH})\s+(?P<md>\d{{1,2}})(?:st|nd|rd|th)?(?:,?\s+(?P<my>\d{{4}}))?)\b"
+    r"|\b(?P<day_after>day\s+after\s+tomorrow)\b"
+    r"|\b(?P<today>today|tonight)\b"
+    r"|\b(?P<tomorrow>tomorrow)\b"
+    rf"|\b(?P<weekday>(?:(?:next|this|on)\s+)?(?P<wd>{_alternation(WEEKDAYS)}))\b"
+    r"|\b(?P<relative>in\s+(?P<rn>\d+|a|one|two|three)\s+(?P<ru>days?|weeks?))\b",
+    re.IGNORECASE,
+)
+
+ADULTS_PATTERN = re.compile(rf"\b(?P<n>{_COUNT})\s+(?:adults?|grown-?ups?)\b", re.IGNORECASE)
+CHILDREN_PATTERN = re.compile(rf"\b(?P<n>{_COUNT})\s+(?:child(?:ren)?|kids?)\b", re.IGNORECASE)
+PEOPLE_PATTERN = re.compile(
+    rf"\bfor\s+(?P<n>{_PEOPLE_COUNT})\s*(?:people|persons?|passengers?|travell?ers?|guests?|pax)?\b"
+    r"(?!\s*(?:nights?|days?|weeks?))",
+    re.IGNORECASE,
+)
+SOLO_PATTERN = re.compile(r"\b(?:for\s+me|alone|solo|myself|just\s+me)\b", re.IGNORECASE)
+NIGHTS_PATTERN = re.compile(rf"\b(?:for\s+)?(?P<n>{_COUNT})\s+nights?\b", re.IGNORECASE)
+# "around 28.3", "28.3 +-2 days", "give or take a day", "flexible dates"
+APPROXIMATE_PATTERN = re.compile(r"\b(?:around|about|approximately|approx\.?|roughly|circa|ca\.)\s*$", re.IGNORECASE)
+FLEX_DAYS_PATTERN = re.compile(
+    rf"(?:±|\+/?-)\s*(?P<n>{_COUNT})\s*days?\b|\bgive\s+or\s+take\s+(?P<n2>{_COUNT})\s+days?\b",
+    re.IGNORECASE,
+)
+FLEXIBLE_PATTERN = re.compile(r"\bflexible\s+(?:on\s+(?:the\s+)?)?dates?\b|\bdates?\s+(?:are|is)\s+flexible\b", re.IGNORECASE)
+NIGHTS_FLEX_PATTERN = re.compile(
+    rf"\b(?:around|about|approximately|roughly)\s+{_COUNT}\s+nights?\b"
+    rf"|\bnights?\s*(?:±|\+/?-)\s*(?P<n>{_COUNT})\b"
+    rf"|\bnights?,?\s+give\s+or\s+take\s+(?P<n2>{_COUNT})(?:\s+nights?)?\b",
+    re.IGNORECASE,
+)
+# Word right before a loosely placed city that tells which end of the route it is
+ORIGIN_MARKER_PATTERN = re.compile(r"\bfrom\s+$", re.IGNORECASE)
+DESTINATION_MARKER_PATTERN = re.compile(r"\b(?:to|into)\s+$", re.IGNORECASE)
+ROOM_PATTERN = re.compile(rf"\b(?P<room>{'|'.join(ROOM_TYPES)})\s+room\b|\b(?P<suite>suite)\b", re.IGNORECASE)
+
+# Weight of each signal in the confidence score
+_DEFAULT_TRAVELERS_PENALTY = 0.9
+_UNKNOWN_CITY_PENALTY = 0.7
+_LOOSE_ROUTE_PENALTY = 0.85
+
+
+def _count(value: str) -> int:
+    value = value.lower()
+    return int(value) if value.isdigit() else NUMBER_WORDS[value]
+
+
+def _known_city(name: str) -> bool:
+    return get_gazetteer().lookup(name) is not None
+
+
+def _route_end(text: str, match: "re.Match") -> Optional[str]:
+    before = text[max(match.start() - 8, 0):match.start()]
+    if ORIGIN_MARKER_PATTERN.search(before):
+        return "origin"
+    if DESTINATION_MARKER_PATTERN.search(before):
+        return "destination"
+    return None
+
+
+def _loose_route(text: str) -> Optional[Tuple[str, str]]:
+    """
+    Return (origin, destination) of the two cities named in a text, if "from" or "to" tells which is which.
+    """
+    cities = list(city_grammar().city.finditer(text))
+    if len(cities) != 2:
+        return None
+    ends = tuple(_route_end(text, city) for city in cities)
+    first, second = (city.group("city") for city in cities)
+    if ends in (("origin", None), (None, "destination"), ("origin", "destination")):
+        return first, second
+    if ends in (("destination", None), (None, "origin"), ("destination", "origin")):
+        return second, first
+    return None
+
+
+def _next_occurrence(month: int, day: int, today: datetime.date) -> datetime.date:
+    # Dates without a year refer to the next time that day comes around
+    candidate = datetime.date(today.year, month, day)
+    if candidate < today:
+        candidate = datetime.date(today.year + 1, month, day)
+    return candidate
+
+
+def _resolve_date(match: "re.Match", today: datetime.date) -> Optional[datetime.date]:
+    groups = match.groupdict()
+    try:
+        if groups["iso"]:
+            return datetime.date(int(groups["iy"]), int(groups["im"]), int(groups["id"]))
+        if groups["dotted"]:
+            day, month, year = int(groups["dd"]), int(groups["dm"]), groups["dy"]
+            if year:
+                return datetime.date(int(year) + (2000 if len(year) == 2 else 0), month, day)
+            return _next_occurrence(month, day, today)
+        if groups["named_dm"] or groups["named_md"]:
+            day = int(groups["nd"] or groups["md"])
+            month = MONTHS[(groups["nm"] or groups["mm"]).lower().rstrip(".")]
+            year = groups["ny"] or groups["my"]
+            if year:
+                return datetime.date(int(year), month, day)
+            return _next_occurrence(month, day, today)
+    except ValueError:
+        # e.g. 31.2 or a time like 10.45 that only looks like a date
+        return None
+    if groups["day_after"]:
+        return today + datetime.timedelta(days=2)
+    if groups["today"]:
+        return today
+    if groups["tomorrow"]:
+        return today + datetime.timedelta(days=1)
+    if groups["weekday"]:
+        # "Friday" and "next Friday" both mean the first Friday after today
+        ahead = (WEEKDAYS[groups["wd"].lower()] - today.weekday()) % 7 or 7
+        return today + datetime.timedelta(days=ahead)
+    if groups["relative"]:
+        amount = _count(groups["rn"])
+        unit_days = 7 if groups["ru"].lower().startswith("week") else 1
+        return today + datetime.timedelta(days=amount * unit_days)
+    return None
+
+
+def extract_dates(request: str, today: Optional[datetime.date] = None) -> List[datetime.date]:
+    """
+    Return all dates mentioned in a request, in order of appearance.
+
+    Args:
+        request: Natural language request string
+        today: Reference date for relative expressions (defaults to today)
+
+    Returns:
+        List of resolved dates
+    """
+    today = today or datetime.date.today()
+    dates = []
+    for match in DATE_PATTERN.finditer(request):
+        resolved = _resolve_date(match, today)
+        if resolved is not None:
+            dates.append(resolved)
+    return dates
+
+
+def _extract_travelers(request: str) -> Tuple[int, int, bool]:
+    """
+    Return (num_adults, num_children, explicit) for a request.
+    """
+    adults = ADULTS_PATTERN.search(request)
+    children = CHILDREN_PATTERN.search(request)
+    num_children = _count(children.group("n")) if children else 0
+    if adults:
+        return _count(adults.group("n")), num_children, True
+    people = PEOPLE_PATTERN.search(request)
+    if people:
+        return max(_count(people.group("n")) - num_children, 1), num_children, True
+    if SOLO_PATTERN.search(request):
+        return 1, num_children, True
+    return 1, num_children, bool(children)
+
+
+def extract_date_flex(request: str) -> int:
+    """
+    Return how many days either side of its date a request accepts (0 unless the date is approximate).
+    """
+    window = FLEX_DAYS_PATTERN.search(request)
+    if window:
+        return _count(window.group("n") or window.group("n2"))
+    for match in DATE_PATTERN.finditer(request):
+        if APPROXIMATE_PATTERN.search(request, 0, match.start()):
+            return DEFAULT_FLEX_DAYS
+    return DEFAULT_FLEX_DAYS if FLEXIBLE_PATTERN.search(request) else 0
+
+
+def extract_nights_flex(request: str) -> int:
+    """
+    Return how many nights shorter or longer a stay may be (0 unless its length is approximate).
+    """
+    window = NIGHTS_FLEX_PATTERN.search(request)
+    if window is None:
+        return 0
+    count = window.group("n") or window.group("n2")
+    return _count(count) if count else DEFAULT_NIGHTS_FLEX
+
+
+def _without_dates(request: str) -> str:
+    # Blank out dates so "28.3 - 2.4" is not mistaken for a route or a count
+    return DATE_PATTERN.sub(lambda match: " " * len(match.group(0)), request)
+
+
+def fast_parse_flight(request: str, today: Optional[datetime.date] = None) -> Dict[str, Any]:
+    """
+    Parse a flight request locally.
+
+    Args:
+        request: Natural language request string
+        today: Reference date for relative expressions (defaults to today)
+
+    Returns:
+        Dictionary with the parsed "details", a "confidence" between 0 and 1
+        and the list of "missing" fields
+    """
+    confidence = 1.0
+    text = _without_dates(request)
+    origin = destination = None
+
+    route = city_grammar().route.search(text)
+    if route:
+        origin = route.group("origin") or route.group("origin2")
+        destination = route.group("destination") or route.group("destination2")
+    else:
+        unknown = UNKNOWN_ROUTE_PATTERN.search(text)
+        if unknown:
+            origin, destination = unknown.group("origin"), unknown.group("destination")
+            if not (_known_city(origin) and _known_city(destination)):
+                confidence *= _UNKNOWN_CITY_PENALTY
+        else:
+            # "to Paris from London": only "from" and "to" say which way the route goes
+            loose = _loose_route(text)
+            if loose is not None:
+                origin, destination = loose
+                confidence *= _LOOSE_ROUTE_PENALTY
+
+    dates = extract_dates(request, today)
+    num_adults, num_children, explicit = _extract_travelers(text)
+    if not explicit:
+        confidence *= _DEFAULT_TRAVELERS_PENALTY
+
+    details = {
+        "origin": canonical_city(origin) if origin else None,
+        "destination": canonical_city(destination) if destination else None,
+        "date": dates[0].isoformat() if dates else None,
+        "num_adults": num_adults,
+        "num_children": num_children,
+        "date_flex_days": extract_date_flex(request),
+    }
+    missing = [field for field in ("origin", "destination", "date") if not details[field]]
+    if missing or details["origin"] == details["destination"]:
+        confidence = 0.0
+    return {"details": details, "confidence": round(confidence, 3), "missing": missing}
+
+
+def fast_parse_hotel(request: str, today: Optional[datetime.date] = None) -> Dict[str, Any]:
+    """
+    Parse a hotel request locally.
+
+    Args:
+        request: Natural language request string
+        today: Reference date for relative expressions (defaults to today)
+
+    Returns:
+        Dictionary with the parsed "details", a "confidence" between 0 and 1
+        and the list of "missing" fields
+    """
+    confidence = 1.0
+    text = _without_dates(request)
+
+    location = None
+    grammar = city_grammar()
+    match = grammar.location.search(text)
+    if match:
+        location = match.group("city")
+    else:
+        cities = [found.group("city") for found in grammar.city.finditer(text)]
+        unknown = UNKNOWN_LOCATION_PATTERN.search(text)
+        if len(cities) == 1:
+            location = cities[0]
+            confidence *= _LOOSE_ROUTE_PENALTY
+        elif unknown:
+            location = unknown.group("city")
+            if not _known_city(location):
+                confidence *= _UNKNOWN_CITY_PENALTY
+
+    dates = extract_dates(request, today)
+    check_in = dates[0] if dates else None
+    check_out = dates[1] if len(dates) > 1 else None
+    nights = NIGHTS_PATTERN.search(text)
+    if check_in and check_out is None and nights:
+        check_out = check_in + datetime.timedelta(days=_count(nights.group("n")))
+    if check_in and check_out and check_out <= check_in:
+        # "28.12 - 2.1" crosses the new year
+        rolled = check_out + datetime.timedelta(days=365)
+        if check_in < rolled <= check_in + datetime.timedelta(days=60):
+            check_out = rolled
+
+    num_adults, num_children, explicit = _extract_travelers(text)
+    if not explicit:
+        confidence *= _DEFAULT_TRAVELERS_PENALTY
+
+    room = ROOM_PATTERN.search(text)
+    room_type = (room.group("room") or room.group("suite")).lower() if room else "standard"
+
+    details = {
+        "location": canonical_city(location) if location else None,
+        "check_in_date": check_in.isoformat() if check_in else None,
+        "check_out_date": check_out.isoformat() if check_out else None,
+        "num_adults": num_adults,
+        "num_children": num_children,
+        "room_type": room_type,
+        "nights_flex": extract_nights_flex(request),
+    }
+    missing = [field for field in ("location", "check_in_date", "check_out_date") if not details[field]]
+    if missing or check_out <= check_in:
+        confidence = 0.0
+    return {"details": details, "confidence": round(confidence, 3), "missing": missing}
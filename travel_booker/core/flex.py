@@ -0,0 +1,155 @@
+"""
+Flexible travel dates: date and length-of-stay windows, ranked by total trip cost.
+
+Requests like "around 28.3" or "about 3 nights" are parsed with a window next
+to their dates: `date_flex_days` on flight details (days either side of the
+date) and `nights_flex` on hotel details (nights shorter or longer than the
+stay). The booking flows search every candidate of the window at once with
+search_candidates(), so a whole window takes about as long as one search, and
+collect the cheapest price of each candidate. The combinations (15 for a
+default trip window) are ranked by the flight price of each date plus the
+hotel total of each stay length that goes with it. Ties go to the candidate
+closest to what was asked for.
+"""
+import asyncio
+import datetime
+from typing import Dict, Any, Optional, List, Callable, Awaitable, Sequence, Tuple, TypeVar
+
+from travel_booker.core.search_cache import MISS, SearchResults, get_search_cache
+
+# Window of an approximate date ("around 28.3") or stay length ("about 3 nights")
+DEFAULT_FLEX_DAYS = 2
+DEFAULT_NIGHTS_FLEX = 1
+MAX_FLEX_DAYS = 3
+MAX_NIGHTS_FLEX = 2
+# Searches of one window run in parallel tabs of the booking's browser session; enough
+# for the 15 stays of a default trip window (5 dates, 3 stay lengths) to load at once
+MAX_PARALLEL_SEARCHES = 16
+
+Request = TypeVar("Request")
+
+
+def _window(details: Optional[Dict[str, Any]], field: str, maximum: int) -> int:
+    try:
+        value = int((details or {}).get(field) or 0)
+    except (TypeError, ValueError):
+        return 0
+    return min(max(value, 0), maximum)
+
+
+def flex_days(details: Optional[Dict[str, Any]]) -> int:
+    """
+    Return how many days either side of its date a flight may depart (0 for an exact date).
+    """
+    return _window(details, "date_flex_days", MAX_FLEX_DAYS)
+
+
+def nights_flex(details: Optional[Dict[str, Any]]) -> int:
+    """
+    Return how many nights shorter or longer a hotel stay may be (0 for an exact stay).
+    """
+    return _window(details, "nights_flex", MAX_NIGHTS_FLEX)
+
+
+def exact_details(details: Dict[str, Any], **changes: Any) -> Dict[str, Any]:
+    """
+    Return booking details without their flex windows, with `changes` applied.
+    """
+    exact = {key: value for key, value in details.items() if key not in ("date_flex_days", "nights_flex")}
+    exact.update(changes)
+    return exact
+
+
+def date_window(date: datetime.date, days: int) -> List[datetime.date]:
+    """
+    Return the dates from `days` before to `days` after a date.
+    """
+    return [date + datetime.timedelta(days=offset) for offset in range(-days, days + 1)]
+
+
+def stay_lengths(nights: int, flex: int) -> List[int]:
+    """
+    Return the stay lengths from `flex` nights shorter to `flex` nights longer, at least one night each.
+    """
+    return [length for length in range(nights - flex, nights + flex + 1) if length >= 1]
+
+
+async def search_candidates(
+    site: str,
+    requests: Sequence[Request],
+    search: Callable[[Request], Awaitable[SearchResults]],
+    refresh: Optional[Callable[[Request], Awaitable[SearchResults]]] = None
+) -> List[Tuple[SearchResults, str]]:
+    """
+    Search every candidate of a window at once, through the search cache.
+
+    Args:
+        site: Site the searches run on, e.g. "finnair"
+        requests: Candidate FlightRequests or HotelRequests
+        search: Runs the search of one candidate in the caller's browser session
+        refresh: Re-runs the search of one candidate in a session of its own,
+            for background refreshes of stale cache entries (defaults to search)
+
+    Returns:
+        Results and how they were served (FRESH, STALE or MISS) for each
+        candidate, in the order of `requests`
+    """
+    cache = get_search_cache()
+    slots = asyncio.Semaphore(MAX_PARALLEL_SEARCHES)
+    refresh = refresh or search
+
+    async def run(request: Request) -> Tuple[SearchResults, str]:
+        async with slots:
+            if cache is None:
+                return await search(request), MISS
+            return await cache.get_or_search(site, request.to_dict(), lambda: search(request),
+                                             refresh=lambda: refresh(request))
+
+    return list(await asyncio.gather(*(run(request) for request in requests)))
+
+
+def cheapest_prices(found: Sequence[Tuple[SearchResults, str]], price_field: str) -> List[Optional[int]]:
+    """
+    Return the cheapest price of each candidate's results (cheapest first), None when it has none.
+    """
+    return [results[0][price_field] if results else None for results, _ in found]
+
+
+def cheapest_combination(
+    flight_prices: Sequence[Optional[int]],
+    hotel_totals: Sequence[Optional[int]],
+    distances: Sequence[int]
+) -> Optional[Tuple[int, int]]:
+    """
+    Pick the date and stay combination with the lowest total trip cost.
+
+    Args:
+        flight_prices: Cheapest flight of each candidate date in minor units
+        hotel_totals: Cheapest stay total of each date and stay length, row by
+            row: len(hotel_totals) // len(flight_prices) stay lengths per date
+        distances: How far each combination is from the requested dates and
+            nights, laid out like hotel_totals
+
+    Returns:
+        (index into hotel_totals, total cost in minor units), or None if no combination can be booked
+    """
+    if not flight_prices or not hotel_totals:
+        return None
+    per_date = len(hotel_totals) // len(flight_prices)
+    priced = [
+        (flight_prices[index // per_date] + total, distance, index)
+        for index, (total, distance) in enumerate(zip(hotel_totals, distances))
+        if total is not None and flight_prices[index // per_date] is not None
+    ]
+    if not priced:
+        return None
+    total, _, index = min(priced)
+    return index, total
+
+
+def cheapest_candidate(prices: Sequence[Optional[int]], distances: Sequence[int]) -> Optional[int]:
+    """
+    Return the index of the cheapest candidate of a one-dimensional window, or None if none can be booked.
+    """
+    best = cheapest_combination(prices, [0] * len(prices), distances)
+    return best[0] if best is not None else None
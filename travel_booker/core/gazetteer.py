@@ -0,0 +1,411 @@
+"""
+Offline gazetteer for resolving free-text city and airport names.
+
+Every place has a canonical name, a country, an IATA city code, its airport
+codes and aliases in other languages ("Riika", "Tukholma", "München", ...).
+All spellings are folded (lowercase, no accents or punctuation) into one
+index:
+
+    exact      dict of folded alias -> place, plus IATA city and airport codes
+    prefix     sorted alias array searched with bisect (a compact stand-in for a trie)
+    fuzzy      trigram postings, with candidates verified by bounded edit distance
+
+resolve() uses only the exact index and caches the answers, so repeated
+lookups take microseconds. Names it does not know are left as they are: a
+fuzzy match is only ever offered as a suggestion (suggest_city()), never
+written into booking details or keys, since a real city missing from the
+gazetteer ("Bari") would otherwise be rewritten into a different one. More places can be loaded from the file named by
+TRAVEL_BOOKER_GAZETTEER, in the same format as PLACES below (one place per
+line: name|country|city code|airport codes|aliases).
+"""
+import os
+import bisect
+import functools
+import unicodedata
+from typing import Dict, Any, Optional, List, Tuple, NamedTuple, Iterable, Set
+
+# name|country|IATA city code|airport codes|aliases
+PLACES = """
+Helsinki|FI|HEL|HEL|helsingfors,helsingistä,helsinkiin,helsingissä
+Tampere|FI|TMP|TMP|tammerfors,tampereelle,tampereelta
+Turku|FI|TKU|TKU|åbo,turkuun,turusta
+Oulu|FI|OUL|OUL|uleåborg,ouluun,oulusta
+Rovaniemi|FI|RVN|RVN|rovaniemelle,rovaniemeltä
+Kuopio|FI|KUO|KUO|kuopioon,kuopiosta
+Vaasa|FI|VAA|VAA|vasa,vaasaan,vaasasta
+Ivalo|FI|IVL|IVL|ivaloon,ivalosta
+Kittilä|FI|KTT|KTT|kittilään,kittilästä,levi
+Joensuu|FI|JOE|JOE|joensuuhun
+Jyväskylä|FI|JYV|JYV|jyväskylään
+Kajaani|FI|KAJ|KAJ|kajana
+Kemi|FI|KEM|KEM|kemi-tornio
+Kuusamo|FI|KAO|KAO|ruka
+Kokkola|FI|KOK|KOK|karleby
+Lappeenranta|FI|LPP|LPP|villmanstrand
+Pori|FI|POR|POR|björneborg
+Savonlinna|FI|SVL|SVL|nyslott
+Mariehamn|FI|MHQ|MHQ|maarianhamina
+Enontekiö|FI|ENF|ENF|enontekis
+Riga|LV|RIX|RIX|rīga,riika,riikaan,riiasta,ryga
+Tallinn|EE|TLL|TLL|tallinna,tallinnaan,tallinnasta,reval
+Vilnius|LT|VNO|VNO|vilna,wilno,vilnaan
+Stockholm|SE|STO|ARN BMA NYO|tukholma,tukholmaan,tukholmasta
+Gothenburg|SE|GOT|GOT|göteborg,göteborgiin,gotemburgo
+Kiruna|SE|KRN|KRN|kiirunan
+Luleå|SE|LLA|LLA|luulaja
+Umeå|SE|UME|UME|uumaja
+Visby|SE|VBY|VBY|
+Oslo|NO|OSL|OSL|osloon,oslosta
+Bergen|NO|BGO|BGO|
+Stavanger|NO|SVG|SVG|
+Trondheim|NO|TRD|TRD|nidaros
+Tromsø|NO|TOS|TOS|tromso,romsa
+Copenhagen|DK|CPH|CPH|kööpenhamina,københavn,kopenhagen,copenhague,köpenhamn
+Billund|DK|BLL|BLL|
+Aarhus|DK|AAR|AAR|århus
+Reykjavik|IS|REK|KEF RKV|reykjavík,reykjavikiin
+London|GB|LON|LHR LGW STN LTN LCY SEN|lontoo,lontooseen,londres,londra
+Manchester|GB|MAN|MAN|
+Edinburgh|GB|EDI|EDI|edinburg,édimbourg
+Dublin|IE|DUB|DUB|baile átha cliath
+Paris|FR|PAR|CDG ORY BVA|pariisi,pariisiin,parigi
+Nice|FR|NCE|NCE|nizza
+Lyon|FR|LYS|LYS|lyons
+Amsterdam|NL|AMS|AMS|amsterdamiin
+Brussels|BE|BRU|BRU CRL|bryssel,brysseliin,bruxelles,brüssel,brussel
+Berlin|DE|BER|BER|berliini,berliiniin
+Munich|DE|MUC|MUC|münchen,muenchen,monaco di baviera
+Frankfurt|DE|FRA|FRA|frankfurt am main
+Hamburg|DE|HAM|HAM|hampuri
+Düsseldorf|DE|DUS|DUS|dusseldorf
+Vienna|AT|VIE|VIE|wien,wieniin,vienne
+Zurich|CH|ZRH|ZRH|zürich,zuerich,zurigo
+Geneva|CH|GVA|GVA|genève,geneve,genf,ginevra
+Prague|CZ|PRG|PRG|praha,prag,prahaan
+Warsaw|PL|WAW|WAW WMI|varsova,warszawa,warschau
+Krakow|PL|KRK|KRK|kraków,krakova,krakau
+Gdansk|PL|GDN|GDN|gdańsk,danzig
+Budapest|HU|BUD|BUD|budapestiin
+Rome|IT|ROM|FCO CIA|rooma,roomaan,roma,rom
+Milan|IT|MIL|MXP LIN BGY|milano,mailand
+Venice|IT|VCE|VCE|venezia,venetsia,venedig
+Florence|IT|FLR|FLR|firenze,florenz
+Naples|IT|NAP|NAP|napoli,neapel
+Madrid|ES|MAD|MAD|madridiin
+Barcelona|ES|BCN|BCN|barcelonaan
+Malaga|ES|AGP|AGP|málaga
+Palma de Mallorca|ES|PMI|PMI|palma,mallorca,majorca
+Tenerife|ES|TCI|TFS TFN|teneriffa
+Las Palmas|ES|LPA|LPA|gran canaria,kanariansaaret
+Lisbon|PT|LIS|LIS|lisboa,lissabon,lissaboniin
+Porto|PT|OPO|OPO|oporto
+Athens|GR|ATH|ATH|ateena,ateenaan,athina,athen
+Split|HR|SPU|SPU|
+Dubrovnik|HR|DBV|DBV|
+Larnaca|CY|LCA|LCA|larnaka
+Istanbul|TR|IST|IST SAW|istanbuliin,konstantinopol
+Antalya|TR|AYT|AYT|
+Tel Aviv|IL|TLV|TLV|tel aviv-yafo
+Cairo|EG|CAI|CAI|kairo
+Marrakesh|MA|RAK|RAK|marrakech,marrakeš
+Cape Town|ZA|CPT|CPT|kapkaupunki,kaapunki
+Dubai|AE|DXB|DXB DWC|dubaihin
+Doha|QA|DOH|DOH|
+New Delhi|IN|DEL|DEL|delhi,uusi delhi
+Mumbai|IN|BOM|BOM|bombay
+Bangkok|TH|BKK|BKK DMK|bangkokiin
+Phuket|TH|HKT|HKT|
+Singapore|SG|SIN|SIN|singapuri
+Denpasar|ID|DPS|DPS|bali
+Beijing|CN|BJS|PEK PKX|peking
+Shanghai|CN|SHA|PVG SHA|shanghaihin
+Hong Kong|HK|HKG|HKG|hongkong
+Seoul|KR|SEL|ICN GMP|soul
+Tokyo|JP|TYO|NRT HND|tokio,tokioon
+Osaka|JP|OSA|KIX ITM|
+Sydney|AU|SYD|SYD|
+New York|US|NYC|JFK EWR LGA|nyc,new york city,nueva york,new yorkiin
+Boston|US|BOS|BOS|
+Washington|US|WAS|IAD DCA|washington dc,washington d.c.
+Chicago|US|CHI|ORD MDW|
+Miami|US|MIA|MIA|
+Los Angeles|US|LAX|LAX|
+San Francisco|US|SFO|SFO|
+Toronto|CA|YTO|YYZ|
+Montreal|CA|YMQ|YUL|montréal
+"""
+
+# Place names that are also everyday words; find_in_text() skips them
+COMMON_WORDS = frozenset({"nice", "split", "soul", "levi"})
+
+# Fuzzy matching only applies to names of at least this many letters
+MIN_FUZZY_LENGTH = 4
+RESOLVE_CACHE_SIZE = 4096
+
+
+class Place(NamedTuple):
+    """
+    A city with its IATA city code and airport codes.
+    """
+    name: str
+    country: str
+    code: str
+    airports: Tuple[str, ...]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "country": self.country, "code": self.code, "airports": list(self.airports)}
+
+
+def fold(text: str) -> str:
+    """
+    Fold a name for matching: lowercase, no accents, punctuation turned into spaces.
+    """
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    letters = "".join(
+        " " if not (char.isalnum() or char.isspace()) else char
+        for char in decomposed if not unicodedata.combining(char)
+    )
+    return " ".join(letters.replace("ø", "o").replace("æ", "ae").replace("ß", "ss").split())
+
+
+def _trigrams(folded: str) -> List[str]:
+    padded = f"^{folded}$"
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Levenshtein distance of a and b, or limit + 1 as soon as it is known to exceed limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def _parse_places(text: str) -> Iterable[Tuple[Place, List[str]]]:
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        fields = (line.split("|") + [""] * 5)[:5]
+        name, country, code, airports, aliases = (field.strip() for field in fields)
+        place = Place(name, country.upper(), code.upper(), tuple(airport.upper() for airport in airports.split()))
+        yield place, [name] + [alias for alias in aliases.split(",") if alias.strip()]
+
+
+class Gazetteer:
+    """
+    In-memory index of places by name, alias and IATA code.
+    """
+
+    def __init__(self, places_text: str = PLACES):
+        """
+        Args:
+            places_text: Place lines in the PLACES format
+        """
+        self.places: List[Place] = []
+        self._by_alias: Dict[str, Place] = {}
+        self._by_code: Dict[str, Place] = {}
+        self._spellings: Set[str] = set()
+        self._max_words = 1
+        self._add(places_text)
+        self.resolve = functools.lru_cache(maxsize=RESOLVE_CACHE_SIZE)(self._resolve)
+
+    def _add(self, places_text: str) -> None:
+        for place, aliases in _parse_places(places_text):
+            self.places.append(place)
+            for alias in aliases:
+                folded = fold(alias)
+                if folded:
+                    self._spellings.update((" ".join(alias.lower().split()), folded))
+                    # The first place listed for an alias wins
+                    self._by_alias.setdefault(folded, place)
+                    self._max_words = max(self._max_words, len(folded.split()))
+            for code in (place.code,) + place.airports:
+                self._by_code.setdefault(code, place)
+
+        self._sorted_aliases = sorted(self._by_alias)
+        self._alias_list = list(self._by_alias)
+        self._postings: Dict[str, List[int]] = {}
+        for index, alias in enumerate(self._alias_list):
+            for gram in set(_trigrams(alias)):
+                self._postings.setdefault(gram, []).append(index)
+
+    def load(self, path: str) -> None:
+        """
+        Add the places of a file in the PLACES format.
+        """
+        with open(path, encoding="utf-8") as f:
+            self._add(f.read())
+        self.resolve.cache_clear()
+
+    def lookup(self, name: str) -> Optional[Place]:
+        """
+        Return the place with exactly this name, alias or IATA code (after folding), or None.
+        """
+        folded = fold(name)
+        place = self._by_alias.get(folded)
+        if place is None and len(folded) == 3 and folded.isalpha():
+            place = self._by_code.get(folded.upper())
+        return place
+
+    def complete(self, prefix: str, limit: int = 10) -> List[Place]:
+        """
+        Return distinct places with a name or alias starting with the prefix.
+        """
+        folded = fold(prefix)
+        if not folded:
+            return []
+        start = bisect.bisect_left(self._sorted_aliases, folded)
+        places: List[Place] = []
+        for alias in self._sorted_aliases[start:]:
+            if not alias.startswith(folded) or len(places) >= limit:
+                break
+            place = self._by_alias[alias]
+            if place not in places:
+                places.append(place)
+        return places
+
+    def fuzzy(self, name: str, max_distance: Optional[int] = None) -> Optional[Place]:
+        """
+        Return the place whose name or alias is closest to a misspelled name, or None.
+
+        Args:
+            name: Free-text name, e.g. "Helsinky"
+            max_distance: Largest accepted edit distance (defaults to 1, or 2 for names of 7+ letters)
+        """
+        folded = fold(name)
+        if len(folded) < MIN_FUZZY_LENGTH:
+            return None
+        if max_distance is None:
+            max_distance = 1 if len(folded) < 7 else 2
+
+        shared: Dict[int, int] = {}
+        for gram in set(_trigrams(folded)):
+            for index in self._postings.get(gram, ()):
+                shared[index] = shared.get(index, 0) + 1
+        best: Optional[Tuple[int, int]] = None
+        # Only verify the aliases sharing the most trigrams
+        for index in sorted(shared, key=lambda index: -shared[index])[:20]:
+            distance = _edit_distance(folded, self._alias_list[index], max_distance)
+            if distance <= max_distance and (best is None or distance < best[0]):
+                best = (distance, index)
+        return self._by_alias[self._alias_list[best[1]]] if best else None
+
+    def _resolve(self, name: str) -> Optional[Place]:
+        return self.lookup(name)
+
+    def spellings(self) -> List[str]:
+        """
+        Return every name and alias as written (lowercase) and folded, for building grammars.
+        """
+        return sorted(self._spellings)
+
+    def find_in_text(self, text: str) -> List[Place]:
+        """
+        Return the places named in a text, in order of appearance (exact names and aliases only).
+        """
+        words = fold(text).split()
+        found: List[Place] = []
+        i = 0
+        while i < len(words):
+            for size in range(min(self._max_words, len(words) - i), 0, -1):
+                alias = " ".join(words[i:i + size])
+                place = None if alias in COMMON_WORDS else self._by_alias.get(alias)
+                if place is not None:
+                    found.append(place)
+                    i += size
+                    break
+            else:
+                i += 1
+        return found
+
+
+_gazetteer: Optional[Gazetteer] = None
+
+# Detail fields that name a place
+PLACE_FIELDS = ("origin", "destination", "location")
+
+
+def get_gazetteer() -> Gazetteer:
+    """
+    Return the process-wide gazetteer, with the extra places of TRAVEL_BOOKER_GAZETTEER if set.
+    """
+    global _gazetteer
+    if _gazetteer is None:
+        gazetteer = Gazetteer()
+        extra = os.getenv("TRAVEL_BOOKER_GAZETTEER")
+        if extra:
+            try:
+                gazetteer.load(os.path.expanduser(extra))
+            except OSError as e:
+                print(f"Error loading gazetteer {extra}: {e}")
+        _gazetteer = gazetteer
+    return _gazetteer
+
+
+def resolve_place(name: Optional[str]) -> Optional[Place]:
+    """
+    Resolve a city name, alias or IATA code exactly; unknown names give None.
+    """
+    if not name or not isinstance(name, str):
+        return None
+    return get_gazetteer().resolve(name)
+
+
+def canonical_city(name: str) -> str:
+    """
+    Return the canonical city name for a name, alias or IATA code; unknown names are returned unchanged.
+    """
+    place = resolve_place(name)
+    return place.name if place else name
+
+
+def suggest_city(name: Optional[str]) -> Optional[str]:
+    """
+    Return the known city closest to a name the gazetteer does not know, for "did you mean" messages.
+    """
+    if not name or not isinstance(name, str) or resolve_place(name) is not None:
+        return None
+    place = get_gazetteer().fuzzy(name)
+    return place.name if place else None
+
+
+def iata_code(name: Optional[str]) -> Optional[str]:
+    """
+    Return the IATA city code of a place name, or None if it is unknown.
+    """
+    place = resolve_place(name)
+    return place.code if place else None
+
+
+def same_place(a: Optional[str], b: Optional[str]) -> bool:
+    """
+    Return True if two names refer to the same place (or are equal ignoring case, if unknown).
+    """
+    if not a or not b:
+        return False
+    place_a, place_b = resolve_place(a), resolve_place(b)
+    if place_a is not None and place_b is not None:
+        return place_a == place_b
+    return fold(a) == fold(b)
+
+
+def canonicalize_details(details: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return a copy of booking details with origin, destination and location replaced by canonical names.
+    """
+    canonical = dict(details)
+    for field in PLACE_FIELDS:
+        value = canonical.get(field)
+        if isinstance(value, str):
+            canonical[field] = canonical_city(value)
+    return canonical
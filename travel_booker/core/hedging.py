@@ -0,0 +1,362 @@
+"""
+Latency-budgeted remote calls: hedging, jittered retries and a circuit breaker.
+
+A call gets an overall deadline. If an attempt has not answered by the time
+most attempts have (a configurable percentile of recent latencies), a
+duplicate "hedge" attempt is started and whichever answers first wins. Failed
+attempts are retried with full-jitter exponential backoff while the deadline
+allows. After several consecutive failures the circuit breaker opens and calls
+fail immediately with CircuitOpenError until the reset period has passed, so
+callers can fall back to local answers instead of waiting.
+"""
+import time
+import random
+import asyncio
+import threading
+import concurrent.futures
+from typing import Dict, Any, Optional, Callable, Awaitable, Tuple, Type
+
+from travel_booker.utils.stats import LatencyHistogram
+
+DEFAULT_DEADLINE_SECONDS = 20.0
+DEFAULT_RETRIES = 2
+DEFAULT_HEDGE_PERCENTILE = 95.0
+# Hedge delay used until enough latencies have been recorded
+DEFAULT_INITIAL_HEDGE_DELAY = 2.0
+MIN_HEDGE_SAMPLES = 20
+DEFAULT_BACKOFF_BASE = 0.2
+DEFAULT_BACKOFF_MAX = 2.0
+DEFAULT_BREAKER_FAILURES = 5
+DEFAULT_BREAKER_RESET_SECONDS = 30.0
+
+_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    Raised when a call is rejected because the circuit breaker is open.
+    """
+
+
+def _get_executor() -> concurrent.futures.ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(max_workers=16, thread_name_prefix="hedged-call")
+    return _executor
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    Opens after `failure_threshold` consecutive failures. Once `reset_seconds`
+    have passed, a single probe call is let through (half-open) while other
+    calls are still rejected: its success closes the breaker, its failure opens
+    it for another reset period. A probe that never reports back is replaced
+    after another reset period. Safe to share between threads.
+    """
+
+    def __init__(self, failure_threshold: int = DEFAULT_BREAKER_FAILURES,
+                 reset_seconds: float = DEFAULT_BREAKER_RESET_SECONDS):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        # When the half-open probe in flight was let through
+        self._probe_started: Optional[float] = None
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at < self.reset_seconds:
+                return "open"
+            return "half_open"
+
+    def allow(self) -> bool:
+        """
+        Return True if a call may be attempted now.
+
+        While half-open, only the caller that gets the probe is allowed; it must
+        report back with record_success(), record_failure() or release().
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at < self.reset_seconds:
+                return False
+            if self._probe_started is not None and now - self._probe_started < self.reset_seconds:
+                return False
+            self._probe_started = now
+            return True
+
+    def release(self) -> None:
+        """
+        End a probe whose outcome says nothing about the service, letting the next call probe.
+        """
+        with self._lock:
+            self._probe_started = None
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_started = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._probe_started = None
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    self.trips += 1
+                self._opened_at = time.monotonic()
+
+
+class HedgedCaller:
+    """
+    Runs calls under a deadline with hedging, retries and a circuit breaker.
+
+    Calls are given as factories that take the remaining time budget in
+    seconds, so each attempt can pass it on as its own request timeout.
+    Counters and latency histograms are guarded by a lock, as blocking calls
+    come from many threads at once.
+    """
+
+    def __init__(
+        self,
+        deadline_seconds: float = DEFAULT_DEADLINE_SECONDS,
+        retries: int = DEFAULT_RETRIES,
+        hedge_percentile: float = DEFAULT_HEDGE_PERCENTILE,
+        initial_hedge_delay: float = DEFAULT_INITIAL_HEDGE_DELAY,
+        backoff_base: float = DEFAULT_BACKOFF_BASE,
+        backoff_max: float = DEFAULT_BACKOFF_MAX,
+        breaker: Optional[CircuitBreaker] = None,
+        give_up_on: Tuple[Type[BaseException], ...] = (),
+    ):
+        """
+        Args:
+            deadline_seconds: Time budget of a whole call, including retries
+            retries: Retries after the first failed attempt
+            hedge_percentile: Attempt-latency percentile after which a hedge is sent (0 disables hedging)
+            initial_hedge_delay: Hedge delay used until enough latencies are recorded
+            backoff_base: First retry backoff cap in seconds (doubles per retry)
+            backoff_max: Upper bound of the retry backoff in seconds
+            breaker: Circuit breaker shared by all calls (a default one if omitted)
+            give_up_on: Exception types that are raised immediately without retry
+        """
+        self.deadline_seconds = deadline_seconds
+        self.retries = max(0, retries)
+        self.hedge_percentile = hedge_percentile
+        self.initial_hedge_delay = initial_hedge_delay
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.give_up_on = give_up_on
+        # End-to-end call latency, and single-attempt latency used for the hedge delay
+        self.latencies = LatencyHistogram()
+        self.attempt_latencies = LatencyHistogram()
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self.retried = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        """
+        Return how long to wait for an attempt before hedging it, or None if hedging is off.
+        """
+        if self.hedge_percentile <= 0:
+            return None
+        with self._lock:
+            if self.attempt_latencies.count < MIN_HEDGE_SAMPLES:
+                return self.initial_hedge_delay
+            return self.attempt_latencies.percentile(self.hedge_percentile)
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _check_breaker(self) -> None:
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise CircuitOpenError("Circuit breaker is open after repeated failures")
+
+    def _succeeded(self, started: float, attempt_started: float) -> None:
+        now = time.monotonic()
+        self.breaker.record_success()
+        with self._lock:
+            self.attempt_latencies.record(now - attempt_started)
+            self.latencies.record(now - started)
+
+    async def call_async(self, factory: Callable[[float], Awaitable[Any]]) -> Any:
+        """
+        Await factory(timeout) under the deadline, hedging and retrying as needed.
+
+        Args:
+            factory: Coroutine function taking the remaining time budget in seconds
+
+        Returns:
+            Result of the first successful attempt
+        """
+        self._count("calls")
+        started = time.monotonic()
+        deadline = started + self.deadline_seconds
+        for attempt in range(self.retries + 1):
+            self._check_breaker()
+            attempt_started = time.monotonic()
+            try:
+                result = await self._attempt_async(factory, attempt_started, deadline)
+            except self.give_up_on:
+                self.breaker.release()
+                self._count("failures")
+                raise
+            except Exception as e:
+                self.breaker.record_failure()
+                backoff = self._backoff(attempt)
+                if attempt == self.retries or time.monotonic() + backoff >= deadline:
+                    self._count("failures")
+                    raise
+                print(f"Retrying after error: {e}")
+                self._count("retried")
+                await asyncio.sleep(backoff)
+                continue
+            self._succeeded(started, attempt_started)
+            return result
+
+    async def _attempt_async(self, factory: Callable[[float], Awaitable[Any]], attempt_started: float,
+                             deadline: float) -> Any:
+        delay = self.hedge_delay()
+        hedge_at = attempt_started + delay if delay is not None else None
+        primary = asyncio.ensure_future(factory(deadline - attempt_started))
+        pending = {primary}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                now = time.monotonic()
+                wait_until = min(hedge_at, deadline) if hedge_at is not None else deadline
+                done, pending = await asyncio.wait(pending, timeout=max(0.0, wait_until - now),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+                if done:
+                    continue
+                if hedge_at is not None and time.monotonic() < deadline:
+                    # The attempt is slower than usual: race a duplicate against it
+                    self._count("hedges")
+                    hedge_at = None
+                    pending.add(asyncio.ensure_future(factory(deadline - time.monotonic())))
+                    continue
+                raise TimeoutError(f"No response within {self.deadline_seconds:.1f}s")
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def call(self, fn: Callable[[float], Any]) -> Any:
+        """
+        Blocking counterpart of call_async; attempts run on a shared thread pool.
+
+        Args:
+            fn: Function taking the remaining time budget in seconds
+
+        Returns:
+            Result of the first successful attempt
+        """
+        self._count("calls")
+        started = time.monotonic()
+        deadline = started + self.deadline_seconds
+        for attempt in range(self.retries + 1):
+            self._check_breaker()
+            attempt_started = time.monotonic()
+            try:
+                result = self._attempt(fn, attempt_started, deadline)
+            except self.give_up_on:
+                self.breaker.release()
+                self._count("failures")
+                raise
+            except Exception as e:
+                self.breaker.record_failure()
+                backoff = self._backoff(attempt)
+                if attempt == self.retries or time.monotonic() + backoff >= deadline:
+                    self._count("failures")
+                    raise
+                print(f"Retrying after error: {e}")
+                self._count("retried")
+                time.sleep(backoff)
+                continue
+            self._succeeded(started, attempt_started)
+            return result
+
+    def _attempt(self, fn: Callable[[float], Any], attempt_started: float, deadline: float) -> Any:
+        executor = _get_executor()
+        delay = self.hedge_delay()
+        hedge_at = attempt_started + delay if delay is not None else None
+        primary = executor.submit(fn, deadline - attempt_started)
+        pending = {primary}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                now = time.monotonic()
+                wait_until = min(hedge_at, deadline) if hedge_at is not None else deadline
+                done, pending = concurrent.futures.wait(pending, timeout=max(0.0, wait_until - now),
+                                                        return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        if future is not primary:
+                            self._count("hedge_wins")
+                        return future.result()
+                    error = future.exception()
+                if done:
+                    continue
+                if hedge_at is not None and time.monotonic() < deadline:
+                    self._count("hedges")
+                    hedge_at = None
+                    pending.add(executor.submit(fn, deadline - time.monotonic()))
+                    continue
+                raise TimeoutError(f"No response within {self.deadline_seconds:.1f}s")
+            raise error
+        finally:
+            # Running attempts cannot be interrupted; their own timeout bounds them
+            for future in pending:
+                future.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Return call counters, latency percentiles and the breaker state.
+        """
+        hedge_delay = self.hedge_delay()
+        with self._lock:
+            latency = self.latencies.summary()
+            counters = {
+                "calls": self.calls,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "retries": self.retried,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+            }
+        return {
+            **counters,
+            "hedge_delay_seconds": hedge_delay,
+            "p50_seconds": latency["p50"],
+            "p99_seconds": latency["p99"],
+            "max_seconds": latency["max"],
+            "breaker_state": self.breaker.state,
+            "breaker_trips": self.breaker.trips,
+        }
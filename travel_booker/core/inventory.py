@@ -0,0 +1,244 @@
+"""
+Local flight inventory built from fare and schedule snapshots.
+
+Snapshots are CSV files with one row per flight:
+
+    flight_number,origin,destination,date,departure_time,arrival_time,price_minor,currency,seats
+    AY1071,Helsinki,Riga,2023-03-28,09:30,11:45,35000,EUR,12
+
+Rows are grouped by (origin, destination, date) into compact columnar
+arrays that are pre-sorted by price and by departure time, so "cheapest /
+earliest N flights" queries are simple slices. Delta snapshots can be applied
+incrementally; only the routes they touch are rebuilt.
+"""
+import os
+import csv
+from array import array
+from typing import Dict, Any, Optional, List, Iterable, Tuple
+
+RouteKey = Tuple[str, str, str]
+
+SNAPSHOT_FIELDS = (
+    "flight_number", "origin", "destination", "date", "departure_time",
+    "arrival_time", "price_minor", "currency", "seats",
+)
+
+
+def _route_key(origin: str, destination: str, date: str) -> RouteKey:
+    return (" ".join(origin.casefold().split()), " ".join(destination.casefold().split()), date)
+
+
+def _minutes(hhmm: str) -> int:
+    hours, _, minutes = hhmm.partition(":")
+    return int(hours) * 60 + int(minutes or 0)
+
+
+class _RouteDay:
+    """
+    Columnar flights of one route on one day, with price and departure orderings.
+    """
+    __slots__ = (
+        "flight_numbers", "origin", "destination", "departures", "arrivals",
+        "prices", "currencies", "seats", "by_price", "by_departure",
+    )
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.origin = rows[0]["origin"]
+        self.destination = rows[0]["destination"]
+        self.flight_numbers = [row["flight_number"] for row in rows]
+        self.departures = array("H", (_minutes(row["departure_time"]) for row in rows))
+        self.arrivals = array("H", (_minutes(row["arrival_time"]) for row in rows))
+        self.prices = array("q", (int(row["price_minor"]) for row in rows))
+        self.currencies = [row.get("currency") or "EUR" for row in rows]
+        self.seats = array("H", (int(row.get("seats") or 0) for row in rows))
+        indices = range(len(rows))
+        self.by_price = array("H", sorted(indices, key=lambda i: (self.prices[i], self.departures[i])))
+        self.by_departure = array("H", sorted(indices, key=lambda i: (self.departures[i], self.prices[i])))
+
+    def rows(self) -> List[Dict[str, Any]]:
+        return [self.row(i) for i in range(len(self.flight_numbers))]
+
+    def row(self, i: int) -> Dict[str, Any]:
+        return {
+            "flight_number": self.flight_numbers[i],
+            "origin": self.origin,
+            "destination": self.destination,
+            "departure_time": f"{self.departures[i] // 60:02d}:{self.departures[i] % 60:02d}",
+            "arrival_time": f"{self.arrivals[i] // 60:02d}:{self.arrivals[i] % 60:02d}",
+            "price_minor": self.prices[i],
+            "currency": self.currencies[i],
+            "seats": self.seats[i],
+        }
+
+
+class FlightInventory:
+    """
+    In-memory index of flight snapshots keyed by (origin, destination, date).
+    """
+
+    def __init__(self):
+        self._routes: Dict[RouteKey, _RouteDay] = {}
+        self._snapshot_mtimes: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return sum(len(route.flight_numbers) for route in self._routes.values())
+
+    @staticmethod
+    def _read_rows(path: str) -> Iterable[Dict[str, Any]]:
+        with open(path, newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+
+    def load(self, path: str) -> int:
+        """
+        Replace the whole inventory with a full snapshot file.
+
+        Args:
+            path: CSV snapshot path
+
+        Returns:
+            Number of flights loaded
+        """
+        grouped: Dict[RouteKey, List[Dict[str, Any]]] = {}
+        for row in self._read_rows(path):
+            if int(row.get("seats") or 0) <= 0:
+                continue
+            grouped.setdefault(_route_key(row["origin"], row["destination"], row["date"]), []).append(row)
+        self._routes = {key: _RouteDay(rows) for key, rows in grouped.items()}
+        self._snapshot_mtimes[path] = os.path.getmtime(path)
+        return len(self)
+
+    def apply_delta(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """
+        Upsert changed flights; rows with zero seats remove the flight.
+
+        Only the routes touched by the delta are rebuilt.
+
+        Args:
+            rows: Snapshot rows (same columns as a full snapshot)
+
+        Returns:
+            Number of routes rebuilt
+        """
+        changes: Dict[RouteKey, Dict[str, Dict[str, Any]]] = {}
+        for row in rows:
+            key = _route_key(row["origin"], row["destination"], row["date"])
+            changes.setdefault(key, {})[row["flight_number"]] = row
+
+        for key, changed in changes.items():
+            current = self._routes.get(key)
+            merged = {row["flight_number"]: row for row in current.rows()} if current else {}
+            for flight_number, row in changed.items():
+                if int(row.get("seats") or 0) <= 0:
+                    merged.pop(flight_number, None)
+                else:
+                    merged[flight_number] = row
+            if merged:
+                self._routes[key] = _RouteDay(list(merged.values()))
+            else:
+                self._routes.pop(key, None)
+        return len(changes)
+
+    def refresh(self, path: str) -> int:
+        """
+        Apply a delta snapshot file if it changed since it was last applied.
+
+        Args:
+            path: CSV delta snapshot path
+
+        Returns:
+            Number of routes rebuilt (0 if the file is unchanged)
+        """
+        mtime = os.path.getmtime(path)
+        if self._snapshot_mtimes.get(path) == mtime:
+            return 0
+        rebuilt = self.apply_delta(self._read_rows(path))
+        self._snapshot_mtimes[path] = mtime
+        return rebuilt
+
+    def _query(self, origin: str, destination: str, date: str, order: str, limit: int,
+               max_price_minor: Optional[int]) -> List[Dict[str, Any]]:
+        route = self._routes.get(_route_key(origin, destination, date))
+        if route is None:
+            return []
+        results = []
+        for i in getattr(route, order):
+            if max_price_minor is not None and route.prices[i] > max_price_minor:
+                if order == "by_price":
+                    break
+                continue
+            row = route.row(i)
+            row["date"] = date
+            results.append(row)
+            if len(results) >= limit:
+                break
+        return results
+
+    def cheapest(self, origin: str, destination: str, date: str, limit: int = 5,
+                 max_price_minor: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Return up to `limit` flights on a route and date, cheapest first.
+
+        Args:
+            origin: Departure city
+            destination: Arrival city
+            date: Departure date in YYYY-MM-DD format
+            limit: Maximum number of flights to return
+            max_price_minor: Optional upper price bound in minor units
+
+        Returns:
+            List of flight dictionaries
+        """
+        return self._query(origin, destination, date, "by_price", limit, max_price_minor)
+
+    def earliest(self, origin: str, destination: str, date: str, limit: int = 5,
+                 max_price_minor: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Return up to `limit` flights on a route and date, earliest departure first.
+
+        Takes the same arguments as cheapest().
+        """
+        return self._query(origin, destination, date, "by_departure", limit, max_price_minor)
+
+    def flight(self, origin: str, destination: str, date: str, flight_number: str) -> Optional[Dict[str, Any]]:
+        """
+        Return one flight on a route and date, or None if it is gone or sold out.
+        """
+        route = self._routes.get(_route_key(origin, destination, date))
+        if route is None or flight_number not in route.flight_numbers:
+            return None
+        row = route.row(route.flight_numbers.index(flight_number))
+        if row["seats"] <= 0:
+            return None
+        row["date"] = date
+        return row
+
+    def has_route(self, origin: str, destination: str, date: str) -> bool:
+        """
+        Return True if any flight with free seats exists on the route and date.
+        """
+        return _route_key(origin, destination, date) in self._routes
+
+
+_inventory: Optional[FlightInventory] = None
+
+
+def get_flight_inventory() -> Optional[FlightInventory]:
+    """
+    Return the process-wide inventory, loaded from TRAVEL_BOOKER_FLIGHT_SNAPSHOT.
+
+    Returns None when no snapshot is configured, in which case the booking
+    flow searches the website directly. If TRAVEL_BOOKER_FLIGHT_SNAPSHOT_DELTA
+    is set, that delta file is re-applied whenever it changes.
+    """
+    global _inventory
+    snapshot = os.getenv("TRAVEL_BOOKER_FLIGHT_SNAPSHOT")
+    if not snapshot:
+        return None
+    if _inventory is None:
+        inventory = FlightInventory()
+        inventory.load(snapshot)
+        _inventory = inventory
+    delta = os.getenv("TRAVEL_BOOKER_FLIGHT_SNAPSHOT_DELTA")
+    if delta and os.path.exists(delta):
+        _inventory.refresh(delta)
+    return _inventory
@@ -0,0 +1,297 @@
+"""
+Two-tier cache for parsed booking requests.
+
+Parsed results are kept in an in-process LRU and in an on-disk SQLite store
+so repeated requests skip the OpenAI round trip, even across CLI runs.
+Entries are keyed by the normalized request text, the model name and hashes
+of the system prompt and response format, so editing a prompt or a response
+schema invalidates its entries.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "travel_booker")
+DEFAULT_MEMORY_ENTRIES = 1024
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_DISK_BYTES = 32 * 1024 * 1024
+
+
+def normalize_request(request: str) -> str:
+    """
+    Normalize request text so trivially different spellings share a cache entry.
+
+    Args:
+        request: Natural language request string
+
+    Returns:
+        Case-folded request with unicode and whitespace normalized
+    """
+    text = unicodedata.normalize("NFKC", request)
+    return " ".join(text.casefold().split())
+
+
+def prompt_hash(system_prompt: str) -> str:
+    """
+    Return a short, stable hash of a system prompt.
+    """
+    return hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16]
+
+
+def schema_hash(response_format: Optional[Dict[str, Any]]) -> str:
+    """
+    Return a short, stable hash of a response format and its JSON schema ("" for None).
+    """
+    if response_format is None:
+        return ""
+    return prompt_hash(json.dumps(response_format, sort_keys=True, separators=(",", ":")))
+
+
+def make_key(request: str, model: str, system_prompt: str, response_format: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Build the cache key for a request parsed with the given model, prompt and response format.
+
+    Args:
+        request: Natural language request string
+        model: Name of the OpenAI model used for parsing
+        system_prompt: System prompt sent with the request
+        response_format: Response format sent with the request, including its JSON schema
+
+    Returns:
+        Hex digest identifying the cache entry
+    """
+    raw = "\x1f".join((normalize_request(request), model, prompt_hash(system_prompt), schema_hash(response_format)))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ParseCache:
+    """
+    In-process LRU backed by an on-disk store with TTL and size-based eviction.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES,
+    ):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disk_bytes = 0
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "expired": 0,
+            "evictions": 0,
+        }
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._conn is not None or not self.path:
+            return self._conn
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS parse_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL,"
+                " size INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS parse_cache_accessed ON parse_cache (accessed_at)"
+            )
+            row = conn.execute("SELECT COALESCE(SUM(size), 0) FROM parse_cache").fetchone()
+            self._disk_bytes = row[0]
+            self._conn = conn
+        except sqlite3.Error as e:
+            print(f"Parse cache disabled on disk ({self.path}): {e}")
+            self.path = None
+        return self._conn
+
+    def _remember(self, key: str, value: str, expires_at: float) -> None:
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached parse result.
+
+        Args:
+            key: Cache key from make_key
+
+        Returns:
+            A fresh copy of the cached dictionary or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return json.loads(value)
+                del self._memory[key]
+
+            conn = self._connect()
+            if conn is not None:
+                try:
+                    row = conn.execute(
+                        "SELECT value, expires_at FROM parse_cache WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row is not None and row[1] > now:
+                        conn.execute(
+                            "UPDATE parse_cache SET accessed_at = ? WHERE key = ?", (now, key)
+                        )
+                        self._remember(key, row[0], row[1])
+                        self.stats["disk_hits"] += 1
+                        return json.loads(row[0])
+                    if row is not None:
+                        self._delete(conn, key)
+                        self.stats["expired"] += 1
+                except sqlite3.Error as e:
+                    print(f"Parse cache read failed: {e}")
+
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, key: str, result: Dict[str, Any]) -> None:
+        """
+        Store a parse result in both tiers.
+
+        Args:
+            key: Cache key from make_key
+            result: Parsed booking details to cache
+        """
+        value = json.dumps(result, separators=(",", ":"), sort_keys=True)
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        with self._lock:
+            self._remember(key, value, expires_at)
+            self.stats["stores"] += 1
+
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                self._delete(conn, key)
+                size = len(key) + len(value)
+                conn.execute(
+                    "INSERT INTO parse_cache (key, value, expires_at, accessed_at, size)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (key, value, expires_at, now, size),
+                )
+                self._disk_bytes += size
+                if self._disk_bytes > self.max_disk_bytes:
+                    self._evict(conn, now)
+            except sqlite3.Error as e:
+                print(f"Parse cache write failed: {e}")
+
+    def _delete(self, conn: sqlite3.Connection, key: str) -> None:
+        row = conn.execute("SELECT size FROM parse_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return
+        conn.execute("DELETE FROM parse_cache WHERE key = ?", (key,))
+        self._disk_bytes -= row[0]
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        # Drop expired entries first, then least recently used ones down to 90% of the budget
+        cursor = conn.execute("DELETE FROM parse_cache WHERE expires_at <= ?", (now,))
+        self.stats["expired"] += max(cursor.rowcount, 0)
+        self._disk_bytes = conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM parse_cache"
+        ).fetchone()[0]
+
+        target = int(self.max_disk_bytes * 0.9)
+        if self._disk_bytes <= target:
+            return
+        freed = 0
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM parse_cache ORDER BY accessed_at"):
+            if self._disk_bytes - freed <= target:
+                break
+            victims.append((key,))
+            freed += size
+        conn.executemany("DELETE FROM parse_cache WHERE key = ?", victims)
+        self._disk_bytes -= freed
+        self.stats["evictions"] += len(victims)
+        for (key,) in victims:
+            self._memory.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Remove all entries from both tiers.
+        """
+        with self._lock:
+            self._memory.clear()
+            conn = self._connect()
+            if conn is not None:
+                conn.execute("DELETE FROM parse_cache")
+            self._disk_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Return hit/miss counters and current cache sizes.
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats["hits"] = stats["memory_hits"] + stats["disk_hits"]
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+            stats["memory_entries"] = len(self._memory)
+            stats["disk_bytes"] = self._disk_bytes
+            return stats
+
+
+_cache: Optional[ParseCache] = None
+
+
+def get_parse_cache() -> ParseCache:
+    """
+    Return the process-wide parse cache, configured from the environment.
+
+    Environment variables:
+        TRAVEL_BOOKER_CACHE_DIR: Directory for the on-disk store
+        TRAVEL_BOOKER_PARSE_CACHE: Set to "0" to keep the cache in memory only
+        TRAVEL_BOOKER_PARSE_CACHE_TTL: Entry lifetime in seconds
+        TRAVEL_BOOKER_PARSE_CACHE_MAX_BYTES: Size budget for the on-disk store
+    """
+    global _cache
+    if _cache is None:
+        path = None
+        if os.getenv("TRAVEL_BOOKER_PARSE_CACHE", "1") != "0":
+            cache_dir = os.getenv("TRAVEL_BOOKER_CACHE_DIR", DEFAULT_CACHE_DIR)
+            path = os.path.join(cache_dir, "parse_cache.sqlite3")
+        _cache = ParseCache(
+            path=path,
+            ttl_seconds=float(os.getenv("TRAVEL_BOOKER_PARSE_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+            max_disk_bytes=int(os.getenv("TRAVEL_BOOKER_PARSE_CACHE_MAX_BYTES", DEFAULT_MAX_DISK_BYTES)),
+        )
+    return _cache
+
+
+def cache_stats() -> Dict[str, Any]:
+    """
+    Return hit/miss counters for the process-wide parse cache.
+    """
+    return get_parse_cache().get_stats()
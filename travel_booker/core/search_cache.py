@@ -0,0 +1,258 @@
+"""
+Cache of site search results with per-site TTLs and stale-while-revalidate.
+
+The search step is the slowest part of a booking, and the same searches (one
+route and date, one city and stay) come up again and again. Results are kept
+in memory under the canonical search parameters (see details_key) and each
+site has two lifetimes: within the fresh TTL a hit is served as is, and within
+the stale TTL the hit is served too, but the search is also rerun in the
+background to refresh the entry. Past that, the search runs again, with
+concurrent misses for the same key sharing one search. Entries are evicted
+least recently used first once the cache is over its memory budget.
+
+Cached options may be out of date, so the booking flows re-verify only the
+option they choose before confirming and invalidate the entry when it changed.
+Site TTLs can be overridden with TRAVEL_BOOKER_SEARCH_TTLS, a JSON object
+mapping site names to [fresh, stale] seconds:
+
+    TRAVEL_BOOKER_SEARCH_TTLS='{"finnair": [60, 300]}'
+"""
+import os
+import json
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Callable, Awaitable, Tuple, Set
+
+from travel_booker.core.coalesce import SingleFlight, details_key
+
+# Seconds results stay fresh and, after that, servable while being refreshed
+SITE_TTLS: Dict[str, Tuple[float, float]] = {
+    # Fares and seat counts move quickly
+    "finnair": (120.0, 600.0),
+    "booking.com": (600.0, 3600.0),
+}
+DEFAULT_TTLS = (300.0, 900.0)
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+# How a lookup was served
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+SearchResults = List[Dict[str, Any]]
+
+
+class SearchCache:
+    """
+    Thread-safe, memory-bounded LRU of search results with stale-while-revalidate.
+    """
+
+    def __init__(self, ttls: Optional[Dict[str, Tuple[float, float]]] = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                 default_ttls: Tuple[float, float] = DEFAULT_TTLS):
+        """
+        Args:
+            ttls: (fresh, stale) seconds per site (defaults to SITE_TTLS)
+            max_bytes: Memory budget for the serialized results of all entries
+            default_ttls: (fresh, stale) seconds for sites without their own
+        """
+        self.ttls = dict(SITE_TTLS if ttls is None else ttls)
+        self.default_ttls = default_ttls
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> (serialized results, fresh until, stale until)
+        self._entries: "OrderedDict[str, Tuple[str, float, float]]" = OrderedDict()
+        self._bytes = 0
+        self._searches = SingleFlight()
+        self._refreshing: Set[str] = set()
+        # Keeps background refreshes alive until they finish
+        self._tasks: Set["asyncio.Task[Any]"] = set()
+        self.stats = {
+            "fresh_hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "refresh_failures": 0,
+            "invalidations": 0,
+            "evictions": 0,
+        }
+
+    def site_ttls(self, site: str) -> Tuple[float, float]:
+        """
+        Return the (fresh, stale) seconds of a site.
+        """
+        return self.ttls.get(site, self.default_ttls)
+
+    def _lookup(self, key: str) -> Tuple[str, Optional[SearchResults]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, fresh_until, stale_until = entry
+                if now < stale_until:
+                    self._entries.move_to_end(key)
+                    state = FRESH if now < fresh_until else STALE
+                    self.stats[f"{state}_hits"] += 1
+                    return state, json.loads(value)
+                self._drop(key)
+            self.stats["misses"] += 1
+            return MISS, None
+
+    def _drop(self, key: str) -> None:
+        value = self._entries.pop(key)[0]
+        self._bytes -= len(value)
+
+    def put(self, site: str, params: Dict[str, Any], results: SearchResults) -> None:
+        """
+        Store the results of a search, evicting least recently used entries over the memory budget.
+        """
+        self._store(details_key(site, params), site, results)
+
+    def _store(self, key: str, site: str, results: SearchResults) -> None:
+        value = json.dumps(results, separators=(",", ":"), default=str)
+        fresh, stale = self.site_ttls(site)
+        now = time.monotonic()
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            if len(value) > self.max_bytes:
+                return
+            self._entries[key] = (value, now + fresh, now + max(fresh, stale))
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+
+    def invalidate(self, site: str, params: Dict[str, Any]) -> None:
+        """
+        Drop the cached results of a search, e.g. when a chosen option failed re-verification.
+        """
+        key = details_key(site, params)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+                self.stats["invalidations"] += 1
+
+    async def _search(self, key: str, site: str, search: Callable[[], Awaitable[SearchResults]]) -> SearchResults:
+        async def run() -> SearchResults:
+            results = await search()
+            self._store(key, site, results)
+            return results
+
+        return await self._searches.call_async(key, run)
+
+    def _refresh(self, key: str, site: str, refresh: Callable[[], Awaitable[SearchResults]]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            self.stats["refreshes"] += 1
+
+        async def run() -> None:
+            try:
+                await self._search(key, site, refresh)
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                # The stale entry keeps being served until it expires
+                self.stats["refresh_failures"] += 1
+                print(f"Error refreshing {site} search results: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        task = asyncio.ensure_future(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def get_or_search(
+        self,
+        site: str,
+        params: Dict[str, Any],
+        search: Callable[[], Awaitable[SearchResults]],
+        refresh: Optional[Callable[[], Awaitable[SearchResults]]] = None
+    ) -> Tuple[SearchResults, str]:
+        """
+        Return cached results for a search, running it on a miss.
+
+        Args:
+            site: Site the search runs on, e.g. "finnair"
+            params: Canonical search parameters
+            search: Coroutine factory running the search in the caller's browser session
+            refresh: Coroutine factory for background refreshes of stale results,
+                which must not rely on the caller's session (defaults to search)
+
+        Returns:
+            Search results and how they were served (FRESH, STALE or MISS)
+        """
+        key = details_key(site, params)
+        state, results = self._lookup(key)
+        if state == STALE:
+            self._refresh(key, site, refresh or search)
+        if results is not None:
+            return results, state
+        return await self._search(key, site, search), MISS
+
+    def clear(self) -> None:
+        """
+        Remove all entries.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Return hit/miss and refresh counters and the current size of the cache.
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats["hits"] = stats["fresh_hits"] + stats["stale_hits"]
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+            stats["refreshing"] = len(self._refreshing)
+            return stats
+
+
+_cache: Optional[SearchCache] = None
+
+
+def get_search_cache() -> Optional[SearchCache]:
+    """
+    Return the process-wide search cache, configured from the environment.
+
+    Returns None when TRAVEL_BOOKER_SEARCH_CACHE is "0", in which case every
+    booking searches the site.
+
+    Environment variables:
+        TRAVEL_BOOKER_SEARCH_CACHE: Set to "0" to disable the cache
+        TRAVEL_BOOKER_SEARCH_TTLS: JSON object of [fresh, stale] seconds per site
+        TRAVEL_BOOKER_SEARCH_CACHE_MAX_BYTES: Memory budget for cached results
+    """
+    global _cache
+    if os.getenv("TRAVEL_BOOKER_SEARCH_CACHE", "1") == "0":
+        return None
+    if _cache is None:
+        ttls = dict(SITE_TTLS)
+        overrides = os.getenv("TRAVEL_BOOKER_SEARCH_TTLS")
+        if overrides:
+            try:
+                ttls.update({site: (float(values[0]), float(values[1])) for site, values in json.loads(overrides).items()})
+            except (ValueError, TypeError, IndexError, AttributeError) as e:
+                print(f"Error reading TRAVEL_BOOKER_SEARCH_TTLS: {e}")
+        _cache = SearchCache(
+            ttls,
+            max_bytes=int(os.getenv("TRAVEL_BOOKER_SEARCH_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+        )
+    return _cache
+
+
+def search_cache_stats() -> Optional[Dict[str, Any]]:
+    """
+    Return counters of the process-wide search cache, or None when it is disabled.
+    """
+    cache = get_search_cache()
+    return cache.get_stats() if cache is not None else None
@@ -0,0 +1,259 @@
+"""
+Durable booking store on SQLite.
+
+Booking results are queued by `save()` and written by a background thread
+that group-commits whole batches in a single transaction, so the booking path
+never waits on disk. The database runs in WAL mode, which lets queries read
+while the writer commits.
+"""
+import os
+import json
+import time
+import queue
+import sqlite3
+import atexit
+import threading
+from contextlib import closing
+from typing import Dict, Any, Optional, Iterator, Tuple
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser("~"), ".local", "share", "travel_booker", "bookings.sqlite3")
+DEFAULT_BATCH_SIZE = 512
+DEFAULT_PAGE_SIZE = 50
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS bookings ("
+    " booking_id TEXT PRIMARY KEY,"
+    " kind TEXT NOT NULL,"
+    " status TEXT NOT NULL,"
+    " start_date TEXT,"
+    " end_date TEXT,"
+    " destination TEXT,"
+    " created_at REAL NOT NULL,"
+    " data TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS bookings_status ON bookings (status, created_at)",
+    "CREATE INDEX IF NOT EXISTS bookings_start_date ON bookings (start_date)",
+    "CREATE INDEX IF NOT EXISTS bookings_destination ON bookings (destination COLLATE NOCASE, start_date)",
+    "CREATE INDEX IF NOT EXISTS bookings_created ON bookings (created_at, booking_id)",
+)
+
+_STOP = object()
+
+
+def _row_for(booking: Dict[str, Any], created_at: float) -> Tuple:
+    """
+    Flatten a flight or hotel booking result into the indexed columns.
+    """
+    if "hotel_name" in booking:
+        kind = "hotel"
+        destination = booking.get("location")
+        start_date, end_date = booking.get("check_in_date"), booking.get("check_out_date")
+    else:
+        kind = "flight"
+        destination = booking.get("destination")
+        start_date = end_date = booking.get("date")
+    return (
+        booking["booking_id"], kind, booking.get("status", "unknown"), start_date, end_date,
+        destination, created_at, json.dumps(booking, separators=(",", ":"), ensure_ascii=False),
+    )
+
+
+class BookingStore:
+    """
+    SQLite-backed store of booking results with asynchronous batched writes.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB_PATH, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            for statement in _SCHEMA:
+                conn.execute(statement)
+
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        self.written = 0
+        self.commits = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _ensure_writer(self) -> None:
+        if self._writer is not None:
+            return
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="booking-store-writer", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self) -> None:
+        conn = self._connect()
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            # Group-commit whatever else is already queued
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            rows = []
+            for item in batch:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    continue
+                else:
+                    rows.append(item)
+            if rows:
+                try:
+                    with conn:
+                        conn.executemany(
+                            "INSERT OR REPLACE INTO bookings"
+                            " (booking_id, kind, status, start_date, end_date, destination, created_at, data)"
+                            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            rows,
+                        )
+                    self.written += len(rows)
+                    self.commits += 1
+                except sqlite3.Error as e:
+                    print(f"Error saving {len(rows)} bookings: {e}")
+            # Flush markers are released only after everything queued before them is committed
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+        conn.close()
+
+    def save(self, booking: Dict[str, Any]) -> None:
+        """
+        Queue a booking result for writing; returns immediately.
+
+        Args:
+            booking: Booking result dictionary from book_flight / book_hotel
+        """
+        if not booking or not booking.get("booking_id"):
+            return
+        self._ensure_writer()
+        self._queue.put(_row_for(booking, time.time()))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every booking queued so far is committed.
+
+        Returns:
+            True if the queue was flushed within the timeout
+        """
+        if self._writer is None:
+            return True
+        marker = threading.Event()
+        self._queue.put(marker)
+        return marker.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """
+        Flush pending writes and stop the writer thread.
+        """
+        if self._writer is None:
+            return
+        self._queue.put(_STOP)
+        self._writer.join(timeout)
+        self._writer = None
+
+    def get(self, booking_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return one booking by ID, or None if it is not stored.
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT data FROM bookings WHERE booking_id = ?", (booking_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def query(
+        self,
+        status: Optional[str] = None,
+        destination: Optional[str] = None,
+        kind: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Return one page of bookings, newest first.
+
+        Args:
+            status: Only bookings with this status
+            destination: Only bookings to this destination/location (case-insensitive)
+            kind: "flight" or "hotel"
+            date_from: Only bookings starting on or after this YYYY-MM-DD date
+            date_to: Only bookings starting on or before this YYYY-MM-DD date
+            limit: Page size
+            cursor: "next_cursor" value of the previous page
+
+        Returns:
+            Dictionary with the page "items" and a "next_cursor" (None on the last page)
+        """
+        clauses, params = [], []
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if destination:
+            clauses.append("destination = ? COLLATE NOCASE")
+            params.append(destination)
+        if kind:
+            clauses.append("kind = ?")
+            params.append(kind)
+        if date_from:
+            clauses.append("start_date >= ?")
+            params.append(date_from)
+        if date_to:
+            clauses.append("start_date <= ?")
+            params.append(date_to)
+        if cursor:
+            # Keyset pagination: continue strictly after the last row of the previous page
+            created_at, _, booking_id = cursor.partition(":")
+            clauses.append("(created_at < ? OR (created_at = ? AND booking_id < ?))")
+            params.extend([float(created_at), float(created_at), booking_id])
+
+        sql = "SELECT created_at, booking_id, data FROM bookings"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY created_at DESC, booking_id DESC LIMIT ?"
+        params.append(limit)
+
+        with closing(self._connect()) as conn:
+            rows = conn.execute(sql, params).fetchall()
+        next_cursor = f"{rows[-1][0]!r}:{rows[-1][1]}" if len(rows) == limit else None
+        return {"items": [json.loads(row[2]) for row in rows], "next_cursor": next_cursor}
+
+    def iter_bookings(self, page_size: int = 500, **filters: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Stream all bookings matching the filters of query(), newest first, page by page.
+        """
+        cursor = None
+        while True:
+            page = self.query(limit=page_size, cursor=cursor, **filters)
+            yield from page["items"]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return
+
+
+_store: Optional[BookingStore] = None
+
+
+def get_booking_store() -> BookingStore:
+    """
+    Return the process-wide booking store at TRAVEL_BOOKER_DB_PATH.
+
+    Pending writes are flushed when the process exits.
+    """
+    global _store
+    if _store is None:
+        _store = BookingStore(os.path.expanduser(os.getenv("TRAVEL_BOOKER_DB_PATH", DEFAULT_DB_PATH)))
+        atexit.register(_store.close)
+    return _store
@@ -0,0 +1,293 @@
+"""
+Metrics and tracing for the parse and booking stages.
+
+Spans time a stage (parse, search, select, passenger_details, confirm, ...)
+on a site (openai, fast_path, finnair, booking.com, ...). Each span feeds a
+latency histogram and call/error counters per (stage, site). OpenAI token
+usage and cost are counted per call. Metrics are exported in Prometheus text format, to
+a file at exit or from a local /metrics endpoint. Spans can also be recorded
+as a Chrome trace (chrome://tracing, Perfetto).
+
+Telemetry is off unless one of TRAVEL_BOOKER_METRICS_FILE,
+TRAVEL_BOOKER_METRICS_PORT or TRAVEL_BOOKER_TRACE_FILE is set. When it is off,
+span() returns a shared no-op object and record calls return immediately.
+"""
+import os
+import json
+import time
+import atexit
+import threading
+from typing import Dict, Any, Optional, List, Tuple
+
+from travel_booker.utils.stats import LatencyHistogram
+
+# Bucket boundaries of the exported histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (50, 100, 200, 400, 800, 1600, 3200, 6400)
+
+MAX_TRACE_EVENTS = 200000
+
+StageKey = Tuple[str, str]
+
+
+class _Span:
+    """
+    Times one stage; the site and error can be set while the span is open.
+    """
+    __slots__ = ("telemetry", "stage", "site", "track", "args", "error", "started")
+
+    def __init__(self, telemetry: "Telemetry", stage: str, site: str, track: Optional[str], args: Dict[str, Any]):
+        self.telemetry = telemetry
+        self.stage = stage
+        self.site = site
+        self.track = track
+        self.args = args
+        self.error = False
+
+    def __enter__(self) -> "_Span":
+        self.started = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.telemetry.record_span(
+            self.stage, self.site, self.started, time.monotonic(),
+            error=self.error or exc_type is not None, track=self.track, args=self.args
+        )
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        # Lets callers set span.site / span.error without checking whether telemetry is on
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: Any) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+class Telemetry:
+    """
+    Registry of stage latencies, error counts, token usage and trace events.
+    """
+
+    def __init__(self, enabled: bool = True, trace: bool = False):
+        """
+        Args:
+            enabled: Record metrics; when False every call is a no-op
+            trace: Also keep span events for a Chrome trace dump
+        """
+        self.enabled = enabled
+        self.trace = enabled and trace
+        self._lock = threading.Lock()
+        self._origin = time.monotonic()
+        self._latencies: Dict[StageKey, LatencyHistogram] = {}
+        self._errors: Dict[StageKey, int] = {}
+        self._tokens: Dict[Tuple[str, str, str], int] = {}
+        self._token_calls: Dict[StageKey, List[int]] = {}
+        self._cost: Dict[StageKey, float] = {}
+        self._trace_events: List[Dict[str, Any]] = []
+        self.dropped_trace_events = 0
+
+    def span(self, stage: str, site: str = "local", track: Optional[str] = None, **args: Any):
+        """
+        Return a context manager timing one stage.
+
+        Args:
+            stage: Stage name, e.g. "parse" or "search"
+            site: Site or backend the stage ran against (can be changed inside the block)
+            track: Trace row to draw the span on, e.g. a booking run ID (defaults to the thread)
+            args: Extra details shown in the trace
+
+        Returns:
+            Span context manager (a shared no-op when telemetry is disabled)
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _Span(self, stage, site, track, args)
+
+    def record_span(self, stage: str, site: str, started: float, ended: float, error: bool = False,
+                    track: Optional[str] = None, args: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Record a finished stage measured with time.monotonic() timestamps (as used by step events).
+        """
+        if not self.enabled:
+            return
+        key = (stage, site)
+        with self._lock:
+            histogram = self._latencies.get(key)
+            if histogram is None:
+                histogram = self._latencies[key] = LatencyHistogram()
+            histogram.record(ended - started)
+            if error:
+                self._errors[key] = self._errors.get(key, 0) + 1
+            if self.trace:
+                if len(self._trace_events) >= MAX_TRACE_EVENTS:
+                    self.dropped_trace_events += 1
+                    return
+                event_args = dict(args or {})
+                if error:
+                    event_args["error"] = True
+                self._trace_events.append({
+                    "name": stage,
+                    "cat": site,
+                    "ph": "X",
+                    "ts": round((started - self._origin) * 1e6, 3),
+                    "dur": round((ended - started) * 1e6, 3),
+                    "pid": os.getpid(),
+                    "tid": track or threading.current_thread().name,
+                    "args": event_args,
+                })
+
+    def record_tokens(self, stage: str, site: str, prompt_tokens: int, completion_tokens: int,
+                      cost_usd: float = 0.0) -> None:
+        """
+        Count the tokens and USD cost of one model call.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._cost[(stage, site)] = self._cost.get((stage, site), 0.0) + cost_usd
+            for kind, count in (("prompt", prompt_tokens), ("completion", completion_tokens)):
+                token_key = (stage, site, kind)
+                self._tokens[token_key] = self._tokens.get(token_key, 0) + count
+            buckets = self._token_calls.get((stage, site))
+            if buckets is None:
+                buckets = self._token_calls[(stage, site)] = [0] * (len(TOKEN_BUCKETS) + 1)
+            total = prompt_tokens + completion_tokens
+            index = next((i for i, bound in enumerate(TOKEN_BUCKETS) if total <= bound), len(TOKEN_BUCKETS))
+            buckets[index] += 1
+
+    def prometheus(self) -> str:
+        """
+        Return all metrics in the Prometheus text exposition format.
+        """
+        lines = [
+            "# HELP travel_booker_stage_seconds Latency of parse and booking stages.",
+            "# TYPE travel_booker_stage_seconds histogram",
+        ]
+        with self._lock:
+            for (stage, site), histogram in sorted(self._latencies.items()):
+                labels = _labels(stage=stage, site=site)
+                for bound in LATENCY_BUCKETS:
+                    lines.append(f'travel_booker_stage_seconds_bucket{{{labels},le="{bound}"}} '
+                                 f"{histogram.count_at_or_below(bound)}")
+                lines.append(f'travel_booker_stage_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"travel_booker_stage_seconds_sum{{{labels}}} {histogram.total}")
+                lines.append(f"travel_booker_stage_seconds_count{{{labels}}} {histogram.count}")
+
+            lines.append("# HELP travel_booker_stage_errors_total Failed parse and booking stages.")
+            lines.append("# TYPE travel_booker_stage_errors_total counter")
+            for (stage, site) in sorted(self._latencies):
+                lines.append(f"travel_booker_stage_errors_total{{{_labels(stage=stage, site=site)}}} "
+                             f"{self._errors.get((stage, site), 0)}")
+
+            lines.append("# HELP travel_booker_tokens_total Model tokens used.")
+            lines.append("# TYPE travel_booker_tokens_total counter")
+            for (stage, site, kind), count in sorted(self._tokens.items()):
+                lines.append(f"travel_booker_tokens_total{{{_labels(stage=stage, site=site, type=kind)}}} {count}")
+
+            lines.append("# HELP travel_booker_tokens_per_call Tokens used per model call.")
+            lines.append("# TYPE travel_booker_tokens_per_call histogram")
+            for (stage, site), buckets in sorted(self._token_calls.items()):
+                labels = _labels(stage=stage, site=site)
+                cumulative = 0
+                for bound, count in zip(TOKEN_BUCKETS, buckets):
+                    cumulative += count
+                    lines.append(f'travel_booker_tokens_per_call_bucket{{{labels},le="{bound}"}} {cumulative}')
+                calls = sum(buckets)
+                total = self._tokens.get((stage, site, "prompt"), 0) + self._tokens.get((stage, site, "completion"), 0)
+                lines.append(f'travel_booker_tokens_per_call_bucket{{{labels},le="+Inf"}} {calls}')
+                lines.append(f"travel_booker_tokens_per_call_sum{{{labels}}} {total}")
+                lines.append(f"travel_booker_tokens_per_call_count{{{labels}}} {calls}")
+
+            lines.append("# HELP travel_booker_cost_usd_total Estimated model cost in US dollars.")
+            lines.append("# TYPE travel_booker_cost_usd_total counter")
+            for (stage, site), cost in sorted(self._cost.items()):
+                lines.append(f"travel_booker_cost_usd_total{{{_labels(stage=stage, site=site)}}} {cost:.6f}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """
+        Write the Prometheus text export to a file (atomically, for node_exporter's textfile collector).
+        """
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(self.prometheus())
+        os.replace(temporary, path)
+
+    def write_chrome_trace(self, path: str) -> None:
+        """
+        Write the recorded spans as Chrome trace JSON.
+        """
+        with self._lock:
+            trace = {"traceEvents": list(self._trace_events), "displayTimeUnit": "ms"}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(trace, f)
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> None:
+        """
+        Serve the Prometheus export at http://host:port/metrics from a daemon thread.
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        telemetry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = telemetry.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="metrics-endpoint", daemon=True).start()
+
+
+_telemetry: Optional[Telemetry] = None
+
+
+def get_telemetry() -> Telemetry:
+    """
+    Return the process-wide telemetry, configured from the environment on first use.
+
+    TRAVEL_BOOKER_METRICS_FILE: Prometheus text file written at exit
+    TRAVEL_BOOKER_METRICS_PORT: Port of a local /metrics endpoint
+    TRAVEL_BOOKER_TRACE_FILE: Chrome trace JSON file written at exit
+    """
+    global _telemetry
+    if _telemetry is None:
+        metrics_file = os.getenv("TRAVEL_BOOKER_METRICS_FILE")
+        metrics_port = os.getenv("TRAVEL_BOOKER_METRICS_PORT")
+        trace_file = os.getenv("TRAVEL_BOOKER_TRACE_FILE")
+        telemetry = Telemetry(enabled=bool(metrics_file or metrics_port or trace_file), trace=bool(trace_file))
+        if metrics_file:
+            atexit.register(telemetry.write_prometheus, os.path.expanduser(metrics_file))
+        if trace_file:
+            atexit.register(telemetry.write_chrome_trace, os.path.expanduser(trace_file))
+        if metrics_port:
+            telemetry.serve(int(metrics_port))
+        _telemetry = telemetry
+    return _telemetry
@@ -0,0 +1,185 @@
+"""
+Dependency graph of the flights and hotel stays of a trip.
+
+parse_trip_request() extracts every flight leg and hotel stay of a request in
+one completion. build_trip_plan() turns that into PlanNodes: a stay without a
+check-in date waits for the flight that arrives in its city and checks in on
+that flight's arrival date, and a leg without a date departs on the check-out
+date of the stay in its origin city. Everything else is independent, so the
+executor (see travel_booker.browser_automation.trip_booker) can book it in
+parallel.
+"""
+import datetime
+from dataclasses import dataclass, field
+from typing import Dict, Any, List
+
+from travel_booker.core.gazetteer import same_place
+
+
+class TripPlanError(ValueError):
+    """
+    Raised when a parsed trip cannot be turned into a bookable plan.
+    """
+
+
+@dataclass
+class PlanNode:
+    """
+    One booking of a trip and the bookings it waits for.
+    """
+    node_id: str
+    kind: str
+    details: Dict[str, Any]
+    depends_on: List[str] = field(default_factory=list)
+    # Detail fields filled in from the result of another node: field -> node ID
+    derived: Dict[str, str] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "node_id": self.node_id,
+            "kind": self.kind,
+            "details": dict(self.details),
+            "depends_on": list(self.depends_on),
+            "derived": dict(self.derived),
+        }
+
+
+class TripPlan:
+    """
+    Bookings of a trip in dependency order.
+    """
+
+    def __init__(self, nodes: List[PlanNode]):
+        self.nodes: Dict[str, PlanNode] = {node.node_id: node for node in nodes}
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        for node in self.nodes.values():
+            unknown = [dependency for dependency in node.depends_on if dependency not in self.nodes]
+            if unknown:
+                raise TripPlanError(f"{node.node_id} depends on unknown bookings: {', '.join(unknown)}")
+        waiting = {node_id: len(node.depends_on) for node_id, node in self.nodes.items()}
+        ready = [node_id for node_id, count in waiting.items() if count == 0]
+        order = []
+        while ready:
+            node_id = ready.pop(0)
+            order.append(node_id)
+            for other in self.nodes.values():
+                if node_id in other.depends_on:
+                    waiting[other.node_id] -= 1
+                    if waiting[other.node_id] == 0:
+                        ready.append(other.node_id)
+        if len(order) != len(self.nodes):
+            raise TripPlanError("Trip bookings depend on each other in a cycle")
+        return order
+
+    def ready(self, done: List[str]) -> List[PlanNode]:
+        """
+        Return the nodes not in `done` whose dependencies all are.
+        """
+        finished = set(done)
+        return [
+            self.nodes[node_id] for node_id in self.order
+            if node_id not in finished and all(dependency in finished for dependency in self.nodes[node_id].depends_on)
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"order": list(self.order), "nodes": [self.nodes[node_id].to_dict() for node_id in self.order]}
+
+
+def arrival_date(flight: Dict[str, Any]) -> str:
+    """
+    Return the arrival date of a flight booking; overnight flights land the day after departure.
+    """
+    date = datetime.date.fromisoformat(flight["date"])
+    departure, arrival = flight.get("departure_time"), flight.get("arrival_time")
+    if departure and arrival and arrival < departure:
+        date += datetime.timedelta(days=1)
+    return date.isoformat()
+
+
+def build_trip_plan(trip: Dict[str, Any]) -> TripPlan:
+    """
+    Build the booking graph of a parsed trip.
+
+    Args:
+        trip: Parsed trip with "legs" (flight details) and "stays" (hotel
+            details; "check_in_date" and "check_out_date" may be missing, and
+            "nights" may stand in for the check-out date)
+
+    Returns:
+        TripPlan with one node per leg ("leg-1", ...) and per stay ("stay-1", ...)
+    """
+    legs = [dict(leg) for leg in trip.get("legs") or [] if isinstance(leg, dict)]
+    stays = [dict(stay) for stay in trip.get("stays") or [] if isinstance(stay, dict)]
+    if not legs and not stays:
+        raise TripPlanError("The trip has no flights or hotel stays")
+
+    # Stays default to the travellers of the first flight
+    travellers = {"num_adults": legs[0].get("num_adults") or 1, "num_children": legs[0].get("num_children") or 0} if legs else {}
+    leg_nodes = [PlanNode(f"leg-{index}", "flight", leg) for index, leg in enumerate(legs, 1)]
+    stay_nodes = []
+    claimed_legs = set()
+    for index, stay in enumerate(stays, 1):
+        for key, value in travellers.items():
+            stay.setdefault(key, value)
+        node = PlanNode(f"stay-{index}", "hotel", stay)
+        location = stay.get("location")
+        if not location:
+            raise TripPlanError(f"Hotel stay {index} has no location")
+
+        arriving = None
+        if not stay.get("check_in_date"):
+            arriving = next((leg for leg in leg_nodes
+                             if leg.node_id not in claimed_legs and same_place(leg.details.get("destination"), location)), None)
+            if arriving is None:
+                raise TripPlanError(f"The stay in {location} has no check-in date and no flight arrives there")
+            claimed_legs.add(arriving.node_id)
+            node.depends_on.append(arriving.node_id)
+            node.derived["check_in_date"] = arriving.node_id
+
+        if not stay.get("check_out_date") and not stay.get("nights"):
+            # Check out on the day of the next flight out of the city
+            start = leg_nodes.index(arriving) + 1 if arriving is not None else 0
+            departing = next((leg for leg in leg_nodes[start:] if same_place(leg.details.get("origin"), location)), None)
+            if departing is None or not departing.details.get("date"):
+                raise TripPlanError(f"The stay in {location} has no check-out date or number of nights")
+            stay["check_out_date"] = departing.details["date"]
+        stay_nodes.append(node)
+
+    for index, leg in enumerate(leg_nodes):
+        if leg.details.get("date"):
+            continue
+        origin = leg.details.get("origin")
+        # Depart when the last stay in the origin city ends
+        previous = next((stay for stay in reversed(stay_nodes) if same_place(stay.details.get("location"), origin)), None)
+        if previous is None:
+            raise TripPlanError(f"The flight from {origin or 'an unknown city'} has no date and no stay ends there")
+        leg.depends_on.append(previous.node_id)
+        leg.derived["date"] = previous.node_id
+
+    return TripPlan(leg_nodes + stay_nodes)
+
+
+def resolve_details(node: PlanNode, results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Return a node's booking details with the derived fields filled in from finished bookings.
+
+    Args:
+        node: Plan node whose dependencies have all been booked
+        results: Booking results by node ID
+
+    Returns:
+        Details ready for book_flight_async / book_hotel_async
+    """
+    details = dict(node.details)
+    for name, source in node.derived.items():
+        if name == "check_in_date":
+            details[name] = arrival_date(results[source])
+        elif name == "date":
+            details[name] = results[source]["check_out_date"]
+    nights = details.pop("nights", None)
+    if node.kind == "hotel" and nights and not details.get("check_out_date"):
+        check_in = datetime.date.fromisoformat(details["check_in_date"])
+        details["check_out_date"] = (check_in + datetime.timedelta(days=int(nights))).isoformat()
+    return details
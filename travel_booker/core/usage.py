@@ -0,0 +1,117 @@
+"""
+Token and cost accounting of model calls.
+
+Every OpenAI parse call records its prompt and completion tokens here, per
+request type and model, and is priced with MODEL_PRICES. Prices can be
+overridden (or added for other models) with TRAVEL_BOOKER_MODEL_PRICES, a JSON
+object mapping model names to [input, output] USD per million tokens:
+
+    TRAVEL_BOOKER_MODEL_PRICES='{"gpt-4o-mini": [0.15, 0.6]}'
+"""
+import os
+import json
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+# List prices in USD per million (input, output) tokens
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+
+
+class UsageLedger:
+    """
+    Thread-safe running totals of tokens and cost per request type and model.
+    """
+
+    def __init__(self, prices: Optional[Dict[str, Tuple[float, float]]] = None):
+        """
+        Args:
+            prices: USD per million (input, output) tokens by model (defaults to MODEL_PRICES)
+        """
+        self.prices = dict(MODEL_PRICES if prices is None else prices)
+        self._lock = threading.Lock()
+        self._totals: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    def price(self, model: str) -> Optional[Tuple[float, float]]:
+        """
+        Return the prices of a model; dated snapshots ("gpt-4o-mini-2024-07-18") use their base model's.
+        """
+        if model in self.prices:
+            return self.prices[model]
+        matches = [name for name in self.prices if model.startswith(f"{name}-")]
+        return self.prices[max(matches, key=len)] if matches else None
+
+    def cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+        """
+        Return the USD cost of a call, or None for models without a known price.
+        """
+        price = self.price(model)
+        if price is None:
+            return None
+        return (prompt_tokens * price[0] + completion_tokens * price[1]) / 1_000_000
+
+    def record(self, kind: str, model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+        """
+        Add one call to the totals.
+
+        Args:
+            kind: Request type, e.g. "flight", "hotel" or "trip"
+            model: Model the call was made with
+            prompt_tokens: Input tokens of the call
+            completion_tokens: Output tokens of the call
+
+        Returns:
+            USD cost of the call, or None if the model has no known price
+        """
+        cost = self.cost(model, prompt_tokens, completion_tokens)
+        with self._lock:
+            totals = self._totals.get((kind, model))
+            if totals is None:
+                totals = self._totals[(kind, model)] = {
+                    "calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0, "unpriced_calls": 0,
+                }
+            totals["calls"] += 1
+            totals["prompt_tokens"] += prompt_tokens
+            totals["completion_tokens"] += completion_tokens
+            if cost is None:
+                totals["unpriced_calls"] += 1
+            else:
+                totals["cost_usd"] += cost
+        return cost
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Return overall totals and a breakdown per request type and model.
+        """
+        with self._lock:
+            breakdown = [dict(totals, kind=kind, model=model) for (kind, model), totals in sorted(self._totals.items())]
+        summary = {key: sum(entry[key] for entry in breakdown)
+                   for key in ("calls", "prompt_tokens", "completion_tokens", "cost_usd", "unpriced_calls")}
+        summary["by_type"] = breakdown
+        return summary
+
+
+_ledger: Optional[UsageLedger] = None
+
+
+def get_usage_ledger() -> UsageLedger:
+    """
+    Return the process-wide usage ledger, with price overrides from TRAVEL_BOOKER_MODEL_PRICES.
+    """
+    global _ledger
+    if _ledger is None:
+        prices = dict(MODEL_PRICES)
+        overrides = os.getenv("TRAVEL_BOOKER_MODEL_PRICES")
+        if overrides:
+            try:
+                prices.update({model: (float(rates[0]), float(rates[1])) for model, rates in json.loads(overrides).items()})
+            except (ValueError, TypeError, IndexError, AttributeError) as e:
+                print(f"Error reading TRAVEL_BOOKER_MODEL_PRICES: {e}")
+        _ledger = UsageLedger(prices)
+    return _ledger
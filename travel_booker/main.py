@@ -5,7 +5,7 @@ Travel Booker MVP - Main Entry Point
 import os
 import sys
 import typer
-import importlib
+import importlib.util
 from typing import Optional
 from dotenv import load_dotenv
 
@@ -26,10 +26,8 @@ def setup_environment():
         typer.echo("  export OPENAI_API_KEY=your-api-key")
         return False
 
-    # Check if browser-use is installed
-    try:
-        importlib.import_module('browser_use')
-    except ImportError:
+    # Check if browser-use is installed without paying for importing it
+    if importlib.util.find_spec('browser_use') is None:
         typer.echo("Error: browser-use package is not installed.")
         typer.echo("Please install it using:")
         typer.echo("  pip install browser-use")
@@ -37,6 +35,32 @@ def setup_environment():
 
     return True
 
+def render_event(event) -> None:
+    """
+    Print a booking step event, with per-step timings once the booking finishes
+    """
+    from travel_booker.core.events import format_event
+
+    typer.echo(format_event(event))
+    step_seconds = event.data.get("step_seconds")
+    if event.is_final and step_seconds:
+        timings = ", ".join(f"{step} {seconds:.2f}s" for step, seconds in step_seconds.items())
+        typer.echo(f"Step timings: {timings}")
+
+def echo_parse_usage(err: bool = False) -> None:
+    """
+    Print the tokens and estimated cost of the OpenAI parse calls made so far
+    """
+    from travel_booker.core.ai_parser import parse_usage_stats
+
+    usage = parse_usage_stats()
+    if usage["calls"]:
+        typer.echo(
+            f"OpenAI parsing: {usage['calls']} calls, {usage['prompt_tokens']} prompt + "
+            f"{usage['completion_tokens']} completion tokens, ~${usage['cost_usd']:.5f}",
+            err=err
+        )
+
 @app.command()
 def book_flight(
     request: Optional[str] = typer.Argument(
@@ -49,6 +73,7 @@ def book_flight(
     """
     from travel_booker.core.ai_parser import parse_flight_request
     from travel_booker.browser_automation.flight_booker import book_flight
+    from travel_booker.core.store import get_booking_store
 
     # If no request provided via argument, prompt for it
     if not request:
@@ -56,13 +81,15 @@ def book_flight(
 
     # Parse the flight booking request
     booking_details = parse_flight_request(request)
+    echo_parse_usage()
     if not booking_details:
         typer.echo("Failed to parse flight booking request.")
         return
 
     # Book the flight
-    result = book_flight(booking_details)
+    result = book_flight(booking_details, on_event=render_event)
     if result:
+        get_booking_store().save(result)
         typer.echo("Flight booking completed successfully!")
         typer.echo(f"Details: {result}")
     else:
@@ -80,6 +107,7 @@ def book_hotel(
     """
     from travel_booker.core.ai_parser import parse_hotel_request
     from travel_booker.browser_automation.hotel_booker import book_hotel
+    from travel_booker.core.store import get_booking_store
 
     # If no request provided via argument, prompt for it
     if not request:
@@ -87,24 +115,236 @@ def book_hotel(
 
     # Parse the hotel booking request
     booking_details = parse_hotel_request(request)
+    echo_parse_usage()
     if not booking_details:
         typer.echo("Failed to parse hotel booking request.")
         return
 
     # Book the hotel
-    result = book_hotel(booking_details)
+    result = book_hotel(booking_details, on_event=render_event)
     if result:
+        get_booking_store().save(result)
         typer.echo("Hotel booking completed successfully!")
         typer.echo(f"Details: {result}")
     else:
         typer.echo("Hotel booking failed.")
 
+@app.command()
+def book_trip(
+    request: Optional[str] = typer.Argument(
+        None,
+        help="Natural language description of the whole trip (flights and hotel stays)"
+    ),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Only show the booking plan, do not book")
+):
+    """
+    Plan and book a multi-leg trip, booking independent flights and stays in parallel
+    """
+    import json
+    from travel_booker.browser_automation.trip_booker import plan_trip
+    from travel_booker.core.store import get_booking_store
+
+    if not request:
+        request = typer.prompt("Please describe your trip")
+
+    outcome = plan_trip(request, on_event=render_event, dry_run=dry_run)
+    echo_parse_usage()
+    if outcome is None:
+        typer.echo("Failed to parse trip request.")
+        return
+    if outcome["plan"] is None:
+        typer.echo(f"Could not plan the trip: {outcome['error']}")
+        return
+
+    for node in outcome["plan"]["nodes"]:
+        after = f" (after {', '.join(node['depends_on'])})" if node["depends_on"] else ""
+        typer.echo(f"{node['node_id']}: {node['kind']} {json.dumps(node['details'], ensure_ascii=False)}{after}")
+    if dry_run:
+        return
+
+    store = get_booking_store()
+    for result in outcome["results"].values():
+        store.save(result)
+    for node_id, node in outcome["nodes"].items():
+        booking_id = outcome["results"].get(node_id, {}).get("booking_id")
+        typer.echo(f"{node_id}: {node['status']}" + (f" ({booking_id})" if booking_id else ""))
+    if outcome["status"] == "confirmed":
+        typer.echo(f"Trip booked successfully in {outcome['elapsed_seconds']:.2f}s!")
+    else:
+        typer.echo("Trip booking failed; bookings confirmed before the failure were kept.")
+
+@app.command()
+def batch(
+    input_path: str = typer.Argument(
+        "-",
+        help="JSONL file of requests (one {\"type\", \"request\"} object per line), or - for stdin"
+    ),
+    output: str = typer.Option("-", "--output", "-o", help="JSONL file for results, or - for stdout"),
+    workers: int = typer.Option(8, "--workers", "-w", help="Number of requests processed concurrently"),
+    request_type: str = typer.Option("flight", "--type", help="Request type for lines that do not set one"),
+    parse_only: bool = typer.Option(False, "--parse-only", help="Only parse requests, do not book them"),
+    verbose: bool = typer.Option(False, "--verbose", "-v", help="Show booking progress events on stderr"),
+    processes: int = typer.Option(0, "--processes", help="Worker processes to spread bookings over (0 to book in this process)"),
+    pool_size: int = typer.Option(2, "--pool-size", help="Warm browser contexts per worker process (0 to book without a pool)"),
+    worker_memory: Optional[float] = typer.Option(None, "--worker-memory", help="MB of memory after which a worker process is replaced")
+):
+    """
+    Parse and book a stream of requests from a JSONL file
+    """
+    import asyncio
+    import contextlib
+    from travel_booker.cli.batch import run_batch, open_streams
+    from travel_booker.core.store import get_booking_store
+
+    store = None if parse_only else get_booking_store()
+    input_stream, output_stream = open_streams(input_path, output)
+
+    async def run():
+        if processes <= 0:
+            return await run_batch(input_stream, output_stream, workers, request_type, parse_only, store,
+                                   on_event=render_event if verbose else None)
+        from travel_booker.browser_automation.process_pool import ProcessBookingExecutor
+
+        async with ProcessBookingExecutor(processes, pool_size, max_memory_mb=worker_memory) as executor:
+            return await run_batch(input_stream, output_stream, workers, request_type, parse_only, store,
+                                   on_event=render_event if verbose else None, executor=executor)
+
+    try:
+        # Keep progress messages out of the JSONL results
+        with contextlib.redirect_stdout(sys.stderr):
+            summary = asyncio.run(run())
+    finally:
+        if input_stream is not sys.stdin:
+            input_stream.close()
+        if output_stream is not sys.stdout:
+            output_stream.close()
+
+    typer.echo(
+        f"Processed {summary['completed']} requests ({summary['failed']} failed) "
+        f"in {summary['elapsed_seconds']:.2f}s: {summary['throughput_per_second']:.1f} req/s, "
+        f"p50 {summary['p50_seconds'] * 1000:.1f} ms, p95 {summary['p95_seconds'] * 1000:.1f} ms",
+        err=True
+    )
+    echo_parse_usage(err=True)
+
+@app.command()
+def history(
+    status: Optional[str] = typer.Option(None, "--status", help="Only bookings with this status"),
+    destination: Optional[str] = typer.Option(None, "--destination", "-d", help="Only bookings to this city"),
+    booking_type: Optional[str] = typer.Option(None, "--type", help="Only flight or hotel bookings"),
+    since: Optional[str] = typer.Option(None, "--since", help="Only bookings starting on or after YYYY-MM-DD"),
+    until: Optional[str] = typer.Option(None, "--until", help="Only bookings starting on or before YYYY-MM-DD"),
+    limit: int = typer.Option(20, "--limit", "-n", help="Maximum number of bookings to show (0 for all)"),
+    as_json: bool = typer.Option(False, "--json", help="Print one JSON booking per line")
+):
+    """
+    Show past bookings, newest first
+    """
+    import json
+    import itertools
+    from travel_booker.core.store import get_booking_store
+
+    bookings = get_booking_store().iter_bookings(
+        status=status, destination=destination, kind=booking_type, date_from=since, date_to=until
+    )
+    if limit > 0:
+        bookings = itertools.islice(bookings, limit)
+
+    shown = 0
+    for booking in bookings:
+        shown += 1
+        if as_json:
+            typer.echo(json.dumps(booking, ensure_ascii=False))
+        elif "hotel_name" in booking:
+            typer.echo(
+                f"{booking['booking_id']}  hotel   {booking['check_in_date']} -> {booking['check_out_date']}  "
+                f"{booking['hotel_name']}, {booking['location']}  [{booking['status']}]"
+            )
+        else:
+            typer.echo(
+                f"{booking['booking_id']}  flight  {booking['date']}  {booking['flight_number']} "
+                f"{booking['origin']} -> {booking['destination']}  [{booking['status']}]"
+            )
+    if not shown and not as_json:
+        typer.echo("No bookings found.")
+
+@app.command()
+def resume(
+    list_only: bool = typer.Option(False, "--list", help="Only list interrupted bookings, do not resume them")
+):
+    """
+    Resume bookings that were interrupted after their selection step
+    """
+    import asyncio
+    from travel_booker.browser_automation.trip_booker import BOOKERS
+    from travel_booker.core.checkpoint import get_checkpoint_store
+    from travel_booker.core.store import get_booking_store
+
+    checkpoints = get_checkpoint_store()
+    pending = checkpoints.pending() if checkpoints is not None else []
+    if not pending:
+        typer.echo("No interrupted bookings.")
+        return
+    for checkpoint in pending:
+        typer.echo(f"{checkpoint.kind} after {checkpoint.step} (attempt {checkpoint.attempts + 1}): "
+                   f"{', '.join(str(value) for value in checkpoint.details.values())}")
+    if list_only:
+        return
+
+    async def resume_all():
+        return await asyncio.gather(*(
+            # Flexible bookings are keyed by their window, not by the candidate that was picked
+            BOOKERS[checkpoint.kind](checkpoint.booking_details(), on_event=render_event) for checkpoint in pending
+        ))
+
+    results = asyncio.run(resume_all())
+    store = get_booking_store()
+    for result in results:
+        store.save(result)
+    resumed = sum(1 for result in results if result)
+    typer.echo(f"Resumed {resumed} of {len(pending)} bookings.")
+
+@app.command()
+def serve(
+    host: str = typer.Option("127.0.0.1", "--host", help="Interface to listen on"),
+    port: int = typer.Option(8080, "--port", "-p", help="Port to listen on"),
+    workers: int = typer.Option(8, "--workers", "-w", help="Number of requests processed concurrently"),
+    queue_size: int = typer.Option(64, "--queue-size", help="Requests that may wait for a worker before new ones get 429"),
+    pool_size: int = typer.Option(2, "--pool-size", help="Warm browser contexts, per worker process with --processes (0 to book without a pool)"),
+    timeout: float = typer.Option(120.0, "--timeout", help="Seconds a request waits for its result before getting 504"),
+    grace: float = typer.Option(30.0, "--grace", help="Seconds to finish running requests on shutdown"),
+    processes: int = typer.Option(0, "--processes", help="Worker processes to spread bookings over (0 to book in this process)"),
+    worker_memory: Optional[float] = typer.Option(None, "--worker-memory", help="MB of memory after which a worker process is replaced")
+):
+    """
+    Run an HTTP service with parse, book and status endpoints
+    """
+    import asyncio
+    from travel_booker.cli.serve import BookingService, run_service
+    from travel_booker.browser_automation.browser_pool import BrowserPool
+    from travel_booker.core.store import get_booking_store
+
+    from travel_booker.browser_automation.process_pool import ProcessBookingExecutor
+
+    executor = ProcessBookingExecutor(processes, pool_size, max_memory_mb=worker_memory) if processes > 0 else None
+    service = BookingService(
+        host=host, port=port, workers=workers, queue_size=queue_size,
+        pool=BrowserPool(size=pool_size) if pool_size > 0 and executor is None else None,
+        store=get_booking_store(), timeout_seconds=timeout, grace_seconds=grace, executor=executor
+    )
+    try:
+        asyncio.run(run_service(service))
+    except KeyboardInterrupt:
+        # Event loops without signal handlers (Windows) get here on Ctrl+C
+        pass
+    typer.echo("Service stopped.", err=True)
+
 def main():
     """
     Main entry point for the application
     """
-    # Check environment setup
-    if not setup_environment():
+    # Check environment setup (help output needs neither the API key nor browser-use)
+    if "--help" not in sys.argv[1:] and sys.argv[1:2] != ["history"] and not setup_environment():
         sys.exit(1)
     
     # Run the CLI app
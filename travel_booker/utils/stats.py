@@ -0,0 +1,80 @@
+"""
+Constant-memory latency statistics.
+"""
+import math
+from typing import Dict, Any, List
+
+# Bucket boundaries grow by 5% from 1 microsecond, which bounds percentile error to 5%
+_MIN_SECONDS = 1e-6
+_GROWTH = 1.05
+_LOG_GROWTH = math.log(_GROWTH)
+_NUM_BUCKETS = int(math.log(1e4 / _MIN_SECONDS) / _LOG_GROWTH) + 2
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram with a fixed memory footprint.
+
+    Suitable for recording millions of samples, e.g. in streaming batch runs.
+    """
+
+    def __init__(self):
+        self.counts: List[int] = [0] * _NUM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        """
+        Add one latency sample in seconds.
+        """
+        if seconds <= _MIN_SECONDS:
+            index = 0
+        else:
+            index = min(int(math.log(seconds / _MIN_SECONDS) / _LOG_GROWTH) + 1, _NUM_BUCKETS - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q: float) -> float:
+        """
+        Return the q-th percentile (0-100) in seconds, or 0.0 without samples.
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * q / 100))
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                upper = _MIN_SECONDS * _GROWTH ** index
+                return min(max(upper, self.min), self.max)
+        return self.max
+
+    def count_at_or_below(self, seconds: float) -> int:
+        """
+        Return how many samples fall in buckets whose upper bound is at most `seconds`.
+
+        Used to export the histogram with coarser, fixed bucket boundaries.
+        """
+        if seconds < _MIN_SECONDS:
+            return 0
+        last = min(int(math.log(seconds / _MIN_SECONDS) / _LOG_GROWTH + 1e-9), _NUM_BUCKETS - 1)
+        return sum(self.counts[:last + 1])
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Return count, mean, min, max and the usual percentiles in seconds.
+        """
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }